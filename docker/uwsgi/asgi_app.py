@@ -0,0 +1,7 @@
+"""Wrapper for ASGI application.
+
+Use with `rdap.async_urls` URL configuration, e.g. `ROOT_URLCONF=rdap.async_urls uvicorn asgi_app:application`.
+"""
+from django.core.asgi import get_asgi_application
+
+application = get_asgi_application()
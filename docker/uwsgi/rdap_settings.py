@@ -35,7 +35,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
 ]
 
-ROOT_URLCONF = 'rdap.urls'
+ROOT_URLCONF = env.str('ROOT_URLCONF', default='rdap.urls')
 
 ###############################################################################
 # Email settings
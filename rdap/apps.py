@@ -17,9 +17,60 @@
 # along with FRED.  If not, see <https://www.gnu.org/licenses/>.
 #
 """AppConfig definition."""
+import logging
+from functools import partial
+from typing import Any, Callable, List
+
 from django.apps import AppConfig
 
-from .settings import RDAP_SETTINGS
+from .clients import ClientPool, LoadBalancer, warm_up
+from .settings import CONTACT_CLIENT_POOL, DOMAIN_CLIENT_POOL, KEYSET_CLIENT_POOL, NSSET_CLIENT_POOL, RDAP_SETTINGS
+
+# Handle of a nonexistent object used by warm-up calls.
+WARM_UP_HANDLE = 'rdap-warm-up.invalid'
+
+
+def _get_clients(pool: ClientPool) -> List[Any]:
+    """Return all clients of the pool including clients of all endpoints."""
+    if isinstance(pool, LoadBalancer):
+        return [client for endpoint in pool.clients for client in endpoint.clients]
+    return list(pool.clients)
+
+
+def warm_up_registry() -> None:
+    """Establish channels to the registry and report the duration."""
+    calls: List[Callable[[], Any]] = []
+    for pool, method in ((CONTACT_CLIENT_POOL, 'get_contact_id'), (DOMAIN_CLIENT_POOL, 'get_domain_id'),
+                         (KEYSET_CLIENT_POOL, 'get_keyset_id'), (NSSET_CLIENT_POOL, 'get_nsset_id')):
+        calls.extend(partial(getattr(client, method), WARM_UP_HANDLE) for client in _get_clients(pool))
+    duration = warm_up(calls)
+    logging.info('Registry channels warmed up in %.3f seconds.', duration)
+
+
+def warm_up_worker() -> None:
+    """Warm up the registry channels in a server worker, if enabled.
+
+    Hook for servers other than uWSGI, e.g. `post_worker_init` of gunicorn.
+    """
+    if RDAP_SETTINGS.REGISTRY_WARM_UP:
+        warm_up_registry()
+
+
+def _schedule_warm_up() -> None:
+    """Warm up the registry channels in the uWSGI worker process.
+
+    Other processes, e.g. management commands, don't warm up. Other servers may use `warm_up_worker` hook.
+    """
+    try:
+        import uwsgi
+    except ImportError:
+        return
+    if not uwsgi.worker_id():
+        # Application is loaded by the uWSGI master, channels may only be used after fork.
+        from uwsgidecorators import postfork
+        postfork(warm_up_registry)
+    else:
+        warm_up_registry()
 
 
 class RdapAppConfig(AppConfig):
@@ -28,12 +79,7 @@ class RdapAppConfig(AppConfig):
     name = 'rdap'
 
     def ready(self) -> None:
-        from rdap.views import LOGGER
-
-        from .constants import LOGGER_SERVICE, LogEntryType, LogResult
-
         RDAP_SETTINGS.check()
 
-        LOGGER.client.register_service(LOGGER_SERVICE, handle='rdap_')
-        LOGGER.client.register_log_entry_types(LOGGER_SERVICE, LogEntryType)
-        LOGGER.client.register_results(LOGGER_SERVICE, LogResult)
+        if RDAP_SETTINGS.REGISTRY_WARM_UP:
+            _schedule_warm_up()
@@ -0,0 +1,58 @@
+#
+# Copyright (C) 2022  CZ.NIC, z. s. p. o.
+#
+# This file is part of FRED.
+#
+# FRED is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# FRED is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with FRED.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""URL configuration with asynchronous object views for ASGI deployments."""
+from django.urls import path, re_path
+
+from rdap.rdap_rest.rdap_utils import ObjectClassName
+from rdap.rdap_rest.whois import (get_contact_by_handle_async, get_domain_by_handle_async, get_keyset_by_handle_async,
+                                  get_nameserver_by_handle_async, get_nsset_by_handle_async)
+from rdap.views import AsyncFqdnObjectView, AsyncObjectView, HelpView, UnsupportedView
+
+from .constants import LogEntryType
+
+urlpatterns = [
+    path('entity/<handle>',
+         AsyncObjectView.as_view(getter=get_contact_by_handle_async, request_type=LogEntryType.ENTITY_LOOKUP,
+                                 object_class=ObjectClassName.ENTITY),
+         name='entity-detail'),
+    path('domain/<handle>',
+         AsyncFqdnObjectView.as_view(getter=get_domain_by_handle_async, request_type=LogEntryType.DOMAIN_LOOKUP,
+                                     object_class=ObjectClassName.DOMAIN),
+         name='domain-detail'),
+    path('nameserver/<handle>',
+         AsyncFqdnObjectView.as_view(getter=get_nameserver_by_handle_async,
+                                     request_type=LogEntryType.NAMESERVER_LOOKUP,
+                                     object_class=ObjectClassName.NAMESERVER),
+         name='nameserver-detail'),
+    path('fred_nsset/<handle>',
+         AsyncObjectView.as_view(getter=get_nsset_by_handle_async, request_type=LogEntryType.NSSET_LOOKUP,
+                                 object_class=ObjectClassName.NSSET),
+         name='nsset-detail'),
+    path('fred_keyset/<handle>',
+         AsyncObjectView.as_view(getter=get_keyset_by_handle_async, request_type=LogEntryType.KEYSET_LOOKUP,
+                                 object_class=ObjectClassName.KEYSET),
+         name='keyset-detail'),
+    re_path(r'^autnum/.+$', UnsupportedView.as_view()),
+    re_path(r'^ip/.+$', UnsupportedView.as_view()),
+    path('domains', UnsupportedView.as_view()),
+    path('nameservers', UnsupportedView.as_view()),
+    path('entities', UnsupportedView.as_view()),
+    path('help', HelpView.as_view(), name='help'),
+    re_path(r'.*', UnsupportedView.as_view(status=400)),
+]
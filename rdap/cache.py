@@ -0,0 +1,286 @@
+#
+# Copyright (C) 2022  CZ.NIC, z. s. p. o.
+#
+# This file is part of FRED.
+#
+# FRED is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# FRED is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with FRED.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""RDAP caches."""
+import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from time import monotonic, sleep
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional, Set, Tuple
+
+from django.core.cache import BaseCache
+
+
+class CacheEntry(NamedTuple):
+    """Cached value.
+
+    @ivar value: The cached value.
+    @ivar stale: Whether the value is past its timeout and should be refreshed.
+    """
+
+    value: Any
+    stale: bool
+
+
+class LruCache(object):
+    """Thread safe in-process cache with LRU eviction and per-entry timeout.
+
+    Entries may be kept for an additional stale timeout, during which they're only returned by `get_entry`.
+    Expired entries may be kept until they're evicted, they're only returned by `get_expired`.
+
+    @ivar maxsize: Maximal number of entries, cache is disabled if not positive.
+    @ivar keep_expired: Whether to keep expired entries.
+    @ivar hits: Number of cache hits.
+    @ivar misses: Number of cache misses.
+    """
+
+    def __init__(self, maxsize: int, keep_expired: bool = False):
+        self.maxsize = maxsize
+        self.keep_expired = keep_expired
+        self.hits = 0
+        self.misses = 0
+        self._data: 'OrderedDict[Hashable, Tuple[float, float, Any]]' = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _get(self, key: Hashable, allow_stale: bool) -> Optional[CacheEntry]:
+        with self._lock:
+            try:
+                fresh_until, expires_at, value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            now = monotonic()
+            if expires_at <= now:
+                if not self.keep_expired:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            stale = fresh_until <= now
+            if stale and not allow_stale:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return CacheEntry(value, stale)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a cached value or default, if the key is not cached or has expired."""
+        entry = self._get(key, allow_stale=False)
+        return default if entry is None else entry.value
+
+    def get_entry(self, key: Hashable) -> Optional[CacheEntry]:
+        """Return a cache entry, including stale entries, or `None`, if the key is not cached or has expired."""
+        return self._get(key, allow_stale=True)
+
+    def get_expired(self, key: Hashable) -> Any:
+        """Return a cached value including expired values kept in the cache, or `None`, if the key is not cached."""
+        with self._lock:
+            try:
+                return self._data[key][2]
+            except KeyError:
+                return None
+
+    def set(self, key: Hashable, value: Any, timeout: float, stale_timeout: float = 0) -> None:
+        """Store a value for timeout seconds and evict the least recently used entries over the limit.
+
+        Value is kept for additional stale timeout seconds, while it can be refreshed.
+        """
+        if self.maxsize <= 0 or timeout <= 0:
+            return
+        with self._lock:
+            now = monotonic()
+            self._data[key] = (now + timeout, now + timeout + max(stale_timeout, 0), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """Remove a key from the cache."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries and reset the statistics."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class BackgroundRefresher(object):
+    """Runs cache refreshes in background threads, at most one refresh for each key at a time.
+
+    @ivar max_workers: Maximal number of threads.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Set[Hashable] = set()
+        self._lock = Lock()
+
+    def submit(self, key: Hashable, func: Callable[[], Any]) -> bool:
+        """Schedule a refresh of the key, unless it's already pending.
+
+        @return: Whether the refresh was scheduled.
+        """
+        with self._lock:
+            if key in self._pending:
+                return False
+            # Executor is created lazily to start the threads only in the worker processes.
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max(self.max_workers, 1), thread_name_prefix='rdap-refresh')
+            self._pending.add(key)
+        self._executor.submit(self._run, key, func)
+        return True
+
+    def _run(self, key: Hashable, func: Callable[[], Any]) -> None:
+        try:
+            func()
+        except Exception as error:
+            logging.warning('Refresh of %s failed: %s', key, error)
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+
+class SingleFlight(object):
+    """Coalesces concurrent calls with the same key, so only the first caller calls the function.
+
+    Other callers wait for and share its result or exception.
+
+    @ivar coalesced: Number of calls, which were coalesced.
+    """
+
+    def __init__(self) -> None:
+        self.coalesced = 0
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = Lock()
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """Call the function or wait for the result of a call already in progress."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = self._calls[key] = Future()
+                leader = True
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight(object):
+    """Coalesces concurrent coroutines with the same key, so only the first caller awaits the function.
+
+    Other callers wait for and share its result or exception.
+    If the first caller is cancelled, one of the waiting callers takes over the call.
+    Single flight may only be used within a single event loop.
+
+    @ivar coalesced: Number of calls, which were coalesced.
+    """
+
+    def __init__(self) -> None:
+        self.coalesced = 0
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Await the function or wait for the result of a call already in progress."""
+        future = self._calls.get(key)
+        while future is not None:
+            # Wait doesn't cancel the shared call, if a waiting caller is cancelled.
+            await asyncio.wait((future, ))
+            if not future.cancelled():
+                self.coalesced += 1
+                return future.result()
+            # The first caller was cancelled, the next waiting caller takes over the call.
+            future = self._calls.get(key)
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as error:
+            future.set_exception(error)
+            # Mark the exception as retrieved, there may be no other callers.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+
+def shared_single_flight(cache: BaseCache, key: str, timeout: float, func: Callable[[], Any],
+                         poll_interval: float = 0.05) -> Any:
+    """Call the function only in one of the processes sharing the cache.
+
+    The function is expected to store its result in the cache under the key.
+    Other processes wait for the result to appear in the cache.
+    If the result doesn't appear in timeout seconds or the cache fails, the function is called anyway.
+    """
+    lock_key = '{}:lock'.format(key)
+    try:
+        locked = cache.add(lock_key, True, timeout)
+    except Exception as error:
+        logging.warning('Shared cache lock failed: %s', error)
+        return func()
+
+    if locked:
+        try:
+            return func()
+        finally:
+            try:
+                cache.delete(lock_key)
+            except Exception as error:
+                logging.warning('Shared cache unlock failed: %s', error)
+
+    deadline = monotonic() + timeout
+    try:
+        while monotonic() < deadline:
+            sleep(poll_interval)
+            result = cache.get(key)
+            if result is not None:
+                return result
+            if cache.get(lock_key) is None:
+                # The other process has finished without result.
+                break
+    except Exception as error:
+        logging.warning('Shared cache get failed: %s', error)
+    return func()
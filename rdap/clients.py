@@ -0,0 +1,1110 @@
+#
+# Copyright (C) 2022  CZ.NIC, z. s. p. o.
+#
+# This file is part of FRED.
+#
+# FRED is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# FRED is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with FRED.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Proxies of registry clients."""
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import wraps
+from threading import Condition, Lock, Thread
+from time import monotonic
+from typing import (AbstractSet, Any, Awaitable, Callable, Deque, Dict, Hashable, Iterable, Iterator, List, Optional,
+                    Sequence, Tuple, TypeVar, cast)
+
+from regal.exceptions import ObjectDoesNotExist
+
+from .cache import LruCache
+
+
+class IdCacheProxy(object):
+    """Registry client proxy which caches results of `get_*_id` methods.
+
+    A cached identifier is dropped when any other method reports the object doesn't exist.
+    The identifier is then resolved again and the method is retried once with a new identifier,
+    since the object may have been deleted and registered again.
+    Both synchronous and asynchronous clients are supported.
+
+    @ivar client: The wrapped client.
+    @ivar cache: Cache of the identifiers.
+    @ivar timeout: Number of seconds the identifiers are cached for.
+    """
+
+    def __init__(self, client: Any, cache: LruCache, timeout: int):
+        self.client = client
+        self.cache = cache
+        self.timeout = timeout
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.client, name)
+        if not callable(attr):
+            return attr
+        if asyncio.iscoroutinefunction(attr):
+            if name.startswith('get_') and name.endswith('_id'):
+                return self._wrap_get_id_async(name, attr)
+            return self._wrap_other_async(attr)
+        if name.startswith('get_') and name.endswith('_id'):
+            return self._wrap_get_id(name, attr)
+        return self._wrap_other(attr)
+
+    def _wrap_get_id(self, name: str, method: Callable) -> Callable:
+        @wraps(method)
+        def get_id(handle: str) -> Any:
+            key = (name, handle.lower())
+            object_id = self.cache.get(key)
+            if object_id is None:
+                object_id = method(handle)
+                self.cache.set(key, object_id, self.timeout)
+                self.cache.set(('reverse', object_id), (name, handle), self.timeout)
+            return object_id
+        return get_id
+
+    def _wrap_get_id_async(self, name: str, method: Callable) -> Callable:
+        @wraps(method)
+        async def get_id(handle: str) -> Any:
+            key = (name, handle.lower())
+            object_id = self.cache.get(key)
+            if object_id is None:
+                object_id = await method(handle)
+                self.cache.set(key, object_id, self.timeout)
+                self.cache.set(('reverse', object_id), (name, handle), self.timeout)
+            return object_id
+        return get_id
+
+    def _wrap_other(self, method: Callable) -> Callable:
+        @wraps(method)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return method(*args, **kwargs)
+            except ObjectDoesNotExist:
+                lookup = self._invalidate(args[0]) if args and isinstance(args[0], str) else None
+                if lookup is None:
+                    raise
+                name, handle = lookup
+                object_id = getattr(self, name)(handle)
+                if object_id == args[0]:
+                    raise
+            return method(object_id, *args[1:], **kwargs)
+        return wrapper
+
+    def _wrap_other_async(self, method: Callable) -> Callable:
+        @wraps(method)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return await method(*args, **kwargs)
+            except ObjectDoesNotExist:
+                lookup = self._invalidate(args[0]) if args and isinstance(args[0], str) else None
+                if lookup is None:
+                    raise
+                name, handle = lookup
+                object_id = await getattr(self, name)(handle)
+                if object_id == args[0]:
+                    raise
+            return await method(object_id, *args[1:], **kwargs)
+        return wrapper
+
+    def _invalidate(self, object_id: str) -> Optional[Tuple[str, str]]:
+        """Drop cached identifier and return the name of the `get_*_id` method and the handle it was cached for."""
+        lookup = self.cache.get(('reverse', object_id))
+        if lookup is not None:
+            name, handle = lookup
+            self.cache.delete((name, handle.lower()))
+            self.cache.delete(('reverse', object_id))
+        return cast(Optional[Tuple[str, str]], lookup)
+
+
+class ContactHandleProxy(object):
+    """Contact client proxy which resolves contact handles from identifiers using a cache.
+
+    Contact handle never changes for a contact identifier, so the cache may be used safely.
+
+    @ivar client: The wrapped client.
+    @ivar cache: Cache of the contact handles.
+    @ivar timeout: Number of seconds the handles are cached for.
+    """
+
+    def __init__(self, client: Any, cache: LruCache, timeout: int):
+        self.client = client
+        self.cache = cache
+        self.timeout = timeout
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    def get_contact_handle(self, contact_id: str) -> str:
+        """Return a handle of the contact."""
+        handle = self.cache.get(contact_id)
+        if handle is None:
+            handle = self.client.get_contact_info(contact_id).contact_handle
+            self.cache.set(contact_id, handle, self.timeout)
+        return cast(str, handle)
+
+
+class AsyncContactHandleProxy(ContactHandleProxy):
+    """Asynchronous contact client proxy which resolves contact handles from identifiers using a cache."""
+
+    async def get_contact_handle(self, contact_id: str) -> str:  # type: ignore[override]
+        """Return a handle of the contact."""
+        handle = self.cache.get(contact_id)
+        if handle is None:
+            handle = (await self.client.get_contact_info(contact_id)).contact_handle
+            self.cache.set(contact_id, handle, self.timeout)
+        return cast(str, handle)
+
+
+class RequestMemo(object):
+    """Memo of backend calls made while rendering a single response.
+
+    @ivar saved: Number of backend calls served from the memo.
+    """
+
+    def __init__(self) -> None:
+        self.saved = 0
+        self._calls: Dict[Hashable, Any] = {}
+        self._lock = Lock()
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return a memoized call or create a new one.
+
+        @return: The memoized call and whether it was created.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                return call, False
+            call = self._calls[key] = factory()
+            return call, True
+
+    def discard(self, key: Hashable) -> None:
+        """Remove an unfinished call from the memo, so it's created again by the next caller."""
+        with self._lock:
+            del self._calls[key]
+
+    def count_saved(self) -> None:
+        """Count a backend call served from the memo."""
+        with self._lock:
+            self.saved += 1
+
+
+_REQUEST_MEMO: ContextVar[Optional[RequestMemo]] = ContextVar('rdap_request_memo', default=None)
+
+
+@contextmanager
+def request_memo() -> Iterator[RequestMemo]:
+    """Memoize backend calls made through `RequestMemoProxy` within the context."""
+    memo = RequestMemo()
+    token = _REQUEST_MEMO.set(memo)
+    try:
+        yield memo
+    finally:
+        _REQUEST_MEMO.reset(token)
+
+
+class RequestMemoProxy(object):
+    """Registry client proxy which serves identical calls only once within `request_memo` context.
+
+    Both results and exceptions are memoized. Calls outside of the context are passed to the client.
+    Both synchronous and asynchronous clients are supported.
+    If the first asynchronous call is cancelled, one of the waiting calls takes over.
+
+    @ivar client: The wrapped client.
+    @ivar saved: Total number of calls served from memos.
+    """
+
+    def __init__(self, client: Any):
+        self.client = client
+        self.saved = 0
+        self._lock = Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.client, name)
+        if not callable(attr):
+            return attr
+        if asyncio.iscoroutinefunction(attr):
+            return self._wrap_async(name, attr)
+        return self._wrap(name, attr)
+
+    def _get_key(self, name: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Optional[Hashable]:
+        key = (id(self), name, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _count_saved(self, memo: RequestMemo) -> None:
+        memo.count_saved()
+        with self._lock:
+            self.saved += 1
+
+    def _wrap(self, name: str, method: Callable) -> Callable:
+        @wraps(method)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            memo = _REQUEST_MEMO.get()
+            key = self._get_key(name, args, kwargs)
+            if memo is None or key is None:
+                return method(*args, **kwargs)
+
+            future, created = memo.get_or_create(key, Future)
+            if not created:
+                self._count_saved(memo)
+                return future.result()
+            try:
+                result = method(*args, **kwargs)
+            except Exception as error:
+                future.set_exception(error)
+                raise
+            future.set_result(result)
+            return result
+        return wrapper
+
+    def _wrap_async(self, name: str, method: Callable) -> Callable:
+        @wraps(method)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            memo = _REQUEST_MEMO.get()
+            key = self._get_key(name, args, kwargs)
+            if memo is None or key is None:
+                return await method(*args, **kwargs)
+
+            while True:
+                future, created = memo.get_or_create(key, asyncio.get_running_loop().create_future)
+                if created:
+                    break
+                # Wait doesn't cancel the shared call, if a waiting caller is cancelled.
+                await asyncio.wait((future, ))
+                if not future.cancelled():
+                    self._count_saved(memo)
+                    return future.result()
+                # The first caller was cancelled, the next waiting caller takes over the call.
+
+            try:
+                result = await method(*args, **kwargs)
+            except asyncio.CancelledError:
+                memo.discard(key)
+                future.cancel()
+                raise
+            except Exception as error:
+                future.set_exception(error)
+                # Mark the exception as retrieved, there may be no other callers.
+                future.exception()
+                raise
+            future.set_result(result)
+            return result
+        return wrapper
+
+
+class DeadlineExceeded(Exception):
+    """Deadline of the request has been exceeded."""
+
+
+_DEADLINE: ContextVar[Optional[float]] = ContextVar('rdap_deadline', default=None)
+
+
+@contextmanager
+def request_deadline(timeout: Optional[float]) -> Iterator[None]:
+    """Limit the time of backend calls made through `DeadlineProxy` within the context.
+
+    @param timeout: Number of seconds for all backend calls, calls are not limited if not set.
+    """
+    token = _DEADLINE.set(None if timeout is None else monotonic() + timeout)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Return the number of seconds remaining to the deadline or `None`, if there's no deadline.
+
+    @raise DeadlineExceeded: If the deadline has been exceeded.
+    """
+    deadline = _DEADLINE.get()
+    if deadline is None:
+        return None
+    remaining = deadline - monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded()
+    return remaining
+
+
+class DeadlineProxy(object):
+    """Registry client proxy which limits calls by the time remaining to the `request_deadline`.
+
+    Asynchronous calls are cancelled, when the deadline is exceeded.
+    Synchronous calls can't be cancelled, they are made in a thread pool and abandoned, when the deadline is exceeded.
+
+    @ivar client: The wrapped client.
+    @ivar max_workers: Maximal number of threads for synchronous calls.
+    """
+
+    def __init__(self, client: Any, max_workers: int):
+        self.client = client
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.client, name)
+        if not callable(attr):
+            return attr
+        if asyncio.iscoroutinefunction(attr):
+            return self._wrap_async(attr)
+        return self._wrap(attr)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            # Executor is created lazily to start the threads only in the worker processes.
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max(self.max_workers, 1), thread_name_prefix='rdap-deadline')
+            return self._executor
+
+    def _wrap(self, method: Callable) -> Callable:
+        @wraps(method)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            remaining = remaining_time()
+            if remaining is None:
+                return method(*args, **kwargs)
+            future = self._get_executor().submit(copy_context().run, method, *args, **kwargs)
+            try:
+                return future.result(remaining)
+            except FutureTimeoutError as error:
+                future.cancel()
+                raise DeadlineExceeded() from error
+        return wrapper
+
+    def _wrap_async(self, method: Callable) -> Callable:
+        @wraps(method)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            remaining = remaining_time()
+            try:
+                return await asyncio.wait_for(method(*args, **kwargs), remaining)
+            except asyncio.TimeoutError as error:
+                raise DeadlineExceeded() from error
+        return wrapper
+
+
+class CircuitOpen(Exception):
+    """Circuit breaker is open, the call wasn't made.
+
+    @ivar retry_after: Number of seconds until the circuit breaker allows calls again.
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker(object):
+    """Circuit breaker which stops calls to a failing backend.
+
+    The breaker opens, when the rate of failed calls among the recent calls reaches the threshold.
+    Calls slower than the slow call threshold are considered failed as well.
+    After the open timeout, the breaker is half-open and lets a limited number of probe calls through.
+    The breaker closes, if all the probes succeed, and opens again, if any of them fails.
+
+    @ivar window: Number of recent calls evaluated, breaker is disabled if not positive.
+    @ivar failure_rate: Rate of failed calls which opens the breaker.
+    @ivar slow_call: Number of seconds after which a call is considered failed, if set.
+    @ivar open_timeout: Number of seconds the breaker stays open.
+    @ivar half_open_calls: Number of probe calls in the half-open state.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, window: int, failure_rate: float, slow_call: Optional[float] = None, open_timeout: float = 30,
+                 half_open_calls: int = 1):
+        self.window = window
+        self.failure_rate = failure_rate
+        self.slow_call = slow_call
+        self.open_timeout = open_timeout
+        self.half_open_calls = max(half_open_calls, 1)
+        self.state = self.CLOSED
+        self._results: Deque[bool] = deque(maxlen=max(window, 1))
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self._lock = Lock()
+
+    def before_call(self) -> bool:
+        """Check whether a call is allowed.
+
+        @return: Whether the call is a probe of the half-open breaker.
+        @raise CircuitOpen: If the call is not allowed.
+        """
+        if self.window <= 0:
+            return False
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.open_timeout - monotonic()
+                if remaining > 0:
+                    raise CircuitOpen(remaining)
+                logging.info('Circuit breaker is half-open.')
+                self.state = self.HALF_OPEN
+                self._probes = 0
+                self._probe_successes = 0
+            if self.state == self.HALF_OPEN:
+                if self._probes >= self.half_open_calls:
+                    raise CircuitOpen(self.open_timeout)
+                self._probes += 1
+                return True
+            return False
+
+    def record(self, success: bool, duration: float, probe: bool = False) -> None:
+        """Record a result of a call."""
+        if self.window <= 0:
+            return
+        if self.slow_call is not None and duration > self.slow_call:
+            success = False
+        with self._lock:
+            if probe:
+                if self.state != self.HALF_OPEN:
+                    return
+                if not success:
+                    self._open()
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_calls:
+                    logging.info('Circuit breaker is closed.')
+                    self.state = self.CLOSED
+                    self._results.clear()
+                return
+            if self.state != self.CLOSED:
+                return
+            self._results.append(success)
+            if len(self._results) >= self.window:
+                failures = self._results.count(False)
+                if failures / len(self._results) >= self.failure_rate:
+                    self._open()
+
+    def _open(self) -> None:
+        logging.warning('Circuit breaker is open.')
+        self.state = self.OPEN
+        self._opened_at = monotonic()
+        self._results.clear()
+
+
+class CircuitBreakerProxy(object):
+    """Registry client proxy which guards calls by a circuit breaker.
+
+    Calls raising errors other than `ObjectDoesNotExist` are considered failed.
+    Both synchronous and asynchronous clients are supported.
+
+    @ivar client: The wrapped client.
+    @ivar breaker: The circuit breaker, it may be shared by several clients.
+    """
+
+    def __init__(self, client: Any, breaker: CircuitBreaker):
+        self.client = client
+        self.breaker = breaker
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.client, name)
+        if not callable(attr):
+            return attr
+        if asyncio.iscoroutinefunction(attr):
+            return self._wrap_async(attr)
+        return self._wrap(attr)
+
+    def _wrap(self, method: Callable) -> Callable:
+        @wraps(method)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            probe = self.breaker.before_call()
+            start = monotonic()
+            success = False
+            try:
+                result = method(*args, **kwargs)
+                success = True
+                return result
+            except ObjectDoesNotExist:
+                success = True
+                raise
+            finally:
+                self.breaker.record(success, monotonic() - start, probe)
+        return wrapper
+
+    def _wrap_async(self, method: Callable) -> Callable:
+        @wraps(method)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            probe = self.breaker.before_call()
+            start = monotonic()
+            success = False
+            try:
+                result = await method(*args, **kwargs)
+                success = True
+                return result
+            except ObjectDoesNotExist:
+                success = True
+                raise
+            finally:
+                self.breaker.record(success, monotonic() - start, probe)
+        return wrapper
+
+
+# Positional and sorted keyword arguments of a batched call.
+_BatchKey = Tuple[Tuple[Any, ...], Tuple[Tuple[str, Any], ...]]
+
+
+class BatchingProxy(object):
+    """Registry client proxy which collects concurrent calls of a method from all requests into batches.
+
+    A batch is dispatched when the window elapses or the batch reaches the maximal size.
+    Registry doesn't provide batch calls, so identical calls in a batch share a single call
+    and the others are made as a parallel burst of bounded size.
+    Calls are identical, if they have equal arguments, keyword arguments must be hashable as well.
+
+    Calls can be batched only if they're made concurrently, i.e. from threaded workers or from the backend executor.
+    Otherwise every call just waits for the window to elapse.
+
+    @ivar client: The wrapped client.
+    @ivar method: Name of the batched method.
+    @ivar window: Maximal number of seconds a call waits for the batch, batching is disabled if not positive.
+    @ivar max_size: Maximal number of distinct calls in a batch.
+    @ivar max_workers: Maximal number of parallel calls in a burst.
+    @ivar batches: Number of dispatched batches.
+    @ivar saved: Number of calls served by an identical call in the batch.
+    """
+
+    def __init__(self, client: Any, method: str, window: float, max_size: int, max_workers: int):
+        self.client = client
+        self.method = method
+        self.window = window
+        self.max_size = max_size
+        self.max_workers = max_workers
+        self.batches = 0
+        self.saved = 0
+        self._pending: Dict[_BatchKey, Future] = {}
+        self._condition = Condition()
+        self._dispatcher: Optional[Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.client, name)
+        if name != self.method or self.window <= 0:
+            return attr
+
+        @wraps(attr)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return self._submit((args, tuple(sorted(kwargs.items())))).result()
+        return wrapper
+
+    def _submit(self, key: _BatchKey) -> Future:
+        with self._condition:
+            # Dispatcher is started lazily to start the thread only in the worker processes.
+            if self._dispatcher is None:
+                self._executor = ThreadPoolExecutor(max(self.max_workers, 1), thread_name_prefix='rdap-batch')
+                self._dispatcher = Thread(target=self._run, name='rdap-batch-dispatcher', daemon=True)
+                self._dispatcher.start()
+            future = self._pending.get(key)
+            if future is not None:
+                self.saved += 1
+                return future
+            future = self._pending[key] = Future()
+            self._condition.notify()
+            return future
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                deadline = monotonic() + self.window
+                while len(self._pending) < self.max_size:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch, self._pending = self._pending, {}
+                self.batches += 1
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: Dict[_BatchKey, Future]) -> None:
+        method = getattr(self.client, self.method)
+        for key, future in batch.items():
+            cast(ThreadPoolExecutor, self._executor).submit(self._call, method, key, future)
+
+    def _call(self, method: Callable, key: _BatchKey, future: Future) -> None:
+        args, kwargs = key
+        try:
+            result = method(*args, **dict(kwargs))
+        except BaseException as error:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+def channel_options(index: int, keepalive_time: Optional[int] = None,
+                    keepalive_timeout: Optional[int] = None) -> List[Tuple[str, Any]]:
+    """Return gRPC options for a channel in the pool.
+
+    Channels with equal options and credentials share a connection, so clients of all services with the same index
+    share a single connection to the registry.
+
+    @param index: Index of the channel in the pool.
+    @param keepalive_time: Number of seconds between keepalive pings, keepalive is disabled if not set.
+    @param keepalive_timeout: Number of seconds to wait for a keepalive ping acknowledgement.
+    """
+    options: List[Tuple[str, Any]] = [('rdap.channel_index', index)]
+    if keepalive_time:
+        options.append(('grpc.keepalive_time_ms', keepalive_time * 1000))
+        options.append(('grpc.keepalive_permit_without_calls', 1))
+    if keepalive_timeout:
+        options.append(('grpc.keepalive_timeout_ms', keepalive_timeout * 1000))
+    return options
+
+
+class _HedgeBudget(object):
+    """Number of hedged calls remaining to a request."""
+
+    def __init__(self, max_hedges: int):
+        self.remaining = max_hedges
+        self._lock = Lock()
+
+    def take(self) -> bool:
+        """Take a hedged call from the budget and return whether it was available."""
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+_HEDGE_BUDGET: ContextVar[Optional[_HedgeBudget]] = ContextVar('rdap_hedge_budget', default=None)
+
+
+@contextmanager
+def hedge_budget(max_hedges: int) -> Iterator[None]:
+    """Allow at most max hedged calls made through `ClientPool` within the context."""
+    token = _HEDGE_BUDGET.set(_HedgeBudget(max_hedges))
+    try:
+        yield
+    finally:
+        _HEDGE_BUDGET.reset(token)
+
+
+class HedgingPolicy(object):
+    """Policy of hedged calls, i.e. duplicate calls made when the original call is slow.
+
+    Call is hedged if it doesn't finish within a percentile of the recent durations of the method.
+
+    @ivar percentile: Percentile of the durations used as a hedging delay.
+    @ivar min_samples: Minimal number of recent durations required to hedge calls of a method.
+    @ivar max_samples: Maximal number of recent durations kept for each method.
+    @ivar max_workers: Maximal number of threads for synchronous calls.
+    @ivar hedges: Number of hedged calls.
+    """
+
+    def __init__(self, percentile: float, min_samples: int = 100, max_samples: int = 1000, max_workers: int = 10):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.max_workers = max_workers
+        self.hedges = 0
+        self._samples: Dict[str, Deque[float]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Number of threads reserved by synchronous calls.
+        self._reserved = 0
+        self._lock = Lock()
+
+    def record(self, name: str, duration: float) -> None:
+        """Record a duration of a call of the method."""
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.max_samples)
+            samples.append(duration)
+
+    def get_delay(self, name: str) -> Optional[float]:
+        """Return a hedging delay of the method or `None`, if there are not enough durations."""
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if not samples or len(samples) < self.min_samples:
+            return None
+        return samples[min(int(len(samples) * self.percentile), len(samples) - 1)]
+
+    def take(self) -> bool:
+        """Take a hedged call from the budget of the current request and return whether it was available."""
+        budget = _HEDGE_BUDGET.get()
+        if budget is None or not budget.take():
+            return False
+        with self._lock:
+            self.hedges += 1
+        return True
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        """Return an executor for synchronous calls."""
+        with self._lock:
+            # Executor is created lazily to start the threads only in the worker processes.
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max(self.max_workers, 1), thread_name_prefix='rdap-hedge')
+            return self._executor
+
+    def reserve(self) -> bool:
+        """Reserve an executor thread for a synchronous call and return whether it was available.
+
+        Calls are never queued in the executor, so the hedging delay doesn't include a time spent in the queue.
+        """
+        with self._lock:
+            if self._reserved >= self.max_workers:
+                return False
+            self._reserved += 1
+            return True
+
+    def release(self) -> None:
+        """Release a reserved executor thread."""
+        with self._lock:
+            self._reserved -= 1
+
+    def submit(self, func: Callable, *args: Any) -> Future:
+        """Submit a call to a reserved executor thread."""
+        def _run() -> Any:
+            try:
+                return func(*args)
+            finally:
+                self.release()
+        return self.get_executor().submit(copy_context().run, _run)
+
+
+_F = TypeVar('_F', Future, asyncio.Future)
+
+
+def _get_first_result(done: AbstractSet[_F], pending: AbstractSet[_F]) -> Optional[_F]:
+    """Return a finished call with the result of hedged calls or `None`, if the other calls should be awaited.
+
+    Successful calls are preferred, the call isn't hedged if the object doesn't exist.
+    Error is returned only if all the calls have failed.
+    """
+    for future in done:
+        error = future.exception()
+        if error is None or isinstance(error, ObjectDoesNotExist):
+            return future
+    if pending:
+        return None
+    return next(iter(done))
+
+
+class ClientPool(object):
+    """Registry client proxy which distributes calls among a pool of clients in a round-robin fashion.
+
+    Clients with the maximal number of calls in progress are skipped, the least busy client is used if all are busy.
+    If a hedging policy is set, slow `get_*` calls are duplicated to another client and the first successful result
+    is used.
+    Both synchronous and asynchronous clients are supported.
+
+    @ivar clients: The pooled clients.
+    @ivar max_calls: Maximal number of concurrent calls of a client, unlimited if not set.
+    @ivar hedging: Policy of hedged calls, calls are not hedged if not set.
+    """
+
+    def __init__(self, clients: Sequence[Any], max_calls: Optional[int] = None,
+                 hedging: Optional[HedgingPolicy] = None):
+        if not clients:
+            raise ValueError('Client pool may not be empty.')
+        self.clients = clients
+        self.max_calls = max_calls
+        self.hedging = hedging
+        self._calls = [0] * len(clients)
+        self._next = 0
+        self._lock = Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.clients[0], name)
+        if not callable(attr):
+            return attr
+        if asyncio.iscoroutinefunction(attr):
+            return self._wrap_async(name, attr)
+        return self._wrap(name, attr)
+
+    def _acquire(self, exclude: Optional[int] = None) -> int:
+        """Select a client for a call and return its index.
+
+        @param exclude: Index of a client which should not be selected, if possible.
+        """
+        with self._lock:
+            size = len(self.clients)
+            candidates = [(self._next + offset) % size for offset in range(size)]
+            if exclude is not None and size > 1:
+                candidates.remove(exclude)
+            if self.max_calls:
+                free = [i for i in candidates if self._calls[i] < self.max_calls]
+                index = free[0] if free else min(candidates, key=self._calls.__getitem__)
+            else:
+                index = candidates[0]
+            self._next = (index + 1) % size
+            self._calls[index] += 1
+            return index
+
+    def _release(self, index: int) -> None:
+        with self._lock:
+            self._calls[index] -= 1
+
+    def _get_hedging_delay(self, name: str) -> Optional[float]:
+        """Return a hedging delay or `None`, if the call should not be hedged."""
+        budget = _HEDGE_BUDGET.get()
+        if self.hedging is None or not name.startswith('get_') or budget is None or budget.remaining <= 0:
+            return None
+        return self.hedging.get_delay(name)
+
+    def _call(self, index: int, name: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+        start = monotonic()
+        try:
+            return getattr(self.clients[index], name)(*args, **kwargs)
+        finally:
+            self._release(index)
+            if self.hedging is not None:
+                self.hedging.record(name, monotonic() - start)
+
+    async def _call_async(self, index: int, name: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+        start = monotonic()
+        try:
+            return await getattr(self.clients[index], name)(*args, **kwargs)
+        finally:
+            self._release(index)
+            if self.hedging is not None:
+                self.hedging.record(name, monotonic() - start)
+
+    def _wrap(self, name: str, method: Callable) -> Callable:
+        @wraps(method)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            delay = self._get_hedging_delay(name)
+            hedging = cast(HedgingPolicy, self.hedging)
+            if delay is None or not hedging.reserve():
+                return self._call(self._acquire(), name, args, kwargs)
+
+            index = self._acquire()
+            futures = [hedging.submit(self._call, index, name, args, kwargs)]
+            done, _ = wait(futures, delay)
+            if not done and hedging.reserve():
+                if hedging.take():
+                    futures.append(hedging.submit(self._call, self._acquire(exclude=index), name, args, kwargs))
+                else:
+                    hedging.release()
+            # The slower call can't be cancelled, its result is dropped.
+            pending = set(futures)
+            while True:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                future = _get_first_result(done, pending)
+                if future is not None:
+                    return future.result()
+        return wrapper
+
+    def _wrap_async(self, name: str, method: Callable) -> Callable:
+        @wraps(method)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            delay = self._get_hedging_delay(name)
+            if delay is None:
+                return await self._call_async(self._acquire(), name, args, kwargs)
+
+            hedging = cast(HedgingPolicy, self.hedging)
+            index = self._acquire()
+            tasks = [asyncio.ensure_future(self._call_async(index, name, args, kwargs))]
+            try:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and hedging.take():
+                    tasks.append(asyncio.ensure_future(
+                        self._call_async(self._acquire(exclude=index), name, args, kwargs)))
+                pending = set(tasks)
+                while True:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    finished = _get_first_result(done, pending)
+                    if finished is not None:
+                        break
+            finally:
+                for task in tasks:
+                    task.cancel()
+                # Wait for the cancelled calls to release their clients.
+                await asyncio.gather(*tasks, return_exceptions=True)
+            return finished.result()
+        return wrapper
+
+
+class LoadBalancer(ClientPool):
+    """Registry client proxy which balances calls among pools of clients of several registry endpoints.
+
+    Calls are made through the endpoint with the least calls in progress.
+    Endpoint is ejected for a period of time, if its calls fail several times in a row.
+    If all endpoints are ejected, calls are balanced among all of them.
+    Calls raising `ObjectDoesNotExist` are considered successful.
+
+    @ivar clients: The client pools of the endpoints.
+    @ivar max_failures: Number of consecutive failed calls, which eject an endpoint.
+    @ivar ejection_time: Number of seconds an endpoint is ejected.
+    """
+
+    def __init__(self, clients: Sequence[ClientPool], max_failures: int = 5, ejection_time: float = 30,
+                 hedging: Optional[HedgingPolicy] = None):
+        super().__init__(clients, hedging=hedging)
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self._failures = [0] * len(clients)
+        self._ejected_until = [0.0] * len(clients)
+
+    def _acquire(self, exclude: Optional[int] = None) -> int:
+        with self._lock:
+            size = len(self.clients)
+            candidates = [(self._next + offset) % size for offset in range(size)]
+            if exclude is not None and size > 1:
+                candidates.remove(exclude)
+            now = monotonic()
+            healthy = [i for i in candidates if self._ejected_until[i] <= now]
+            index = min(healthy or candidates, key=self._calls.__getitem__)
+            self._next = (index + 1) % size
+            self._calls[index] += 1
+            return index
+
+    def _record(self, index: int, success: bool) -> None:
+        """Record a result of a call and eject the endpoint, if necessary."""
+        with self._lock:
+            if success:
+                self._failures[index] = 0
+                return
+            self._failures[index] += 1
+            if self._failures[index] >= self.max_failures:
+                self._failures[index] = 0
+                self._ejected_until[index] = monotonic() + self.ejection_time
+                logging.warning('Registry endpoint %s ejected for %s seconds.', index, self.ejection_time)
+
+    def _call(self, index: int, name: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+        try:
+            result = super()._call(index, name, args, kwargs)
+        except ObjectDoesNotExist:
+            self._record(index, True)
+            raise
+        except Exception:
+            self._record(index, False)
+            raise
+        self._record(index, True)
+        return result
+
+    async def _call_async(self, index: int, name: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+        try:
+            result = await super()._call_async(index, name, args, kwargs)
+        except ObjectDoesNotExist:
+            self._record(index, True)
+            raise
+        except Exception:
+            self._record(index, False)
+            raise
+        self._record(index, True)
+        return result
+
+
+class _DeferredCall(object):
+    """Backend call made when its result is requested for the first time."""
+
+    def __init__(self, func: Callable[..., Any], args: Sequence[Any]):
+        self._func = func
+        self._args = args
+        self._done = False
+        self._result: Any = None
+        self._error: Optional[Exception] = None
+
+    def __call__(self) -> Any:
+        if not self._done:
+            try:
+                self._result = self._func(*self._args)
+            except Exception as error:
+                self._error = error
+            self._done = True
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class BackendExecutor(object):
+    """Runs independent backend calls concurrently in a thread pool.
+
+    If disabled, calls are deferred until their results are requested, so they are made in the order of requests.
+
+    @ivar max_workers: Maximal number of threads, executor is disabled if not positive.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = Lock()
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> Callable[[], Any]:
+        """Schedule a backend call.
+
+        @return: Callable which returns the result of the call or raises its exception.
+        """
+        if self.max_workers <= 0:
+            return _DeferredCall(func, args)
+        with self._lock:
+            # Executor is created lazily to start the threads only in the worker processes.
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='rdap-backend')
+        # Run the call in a copy of the current context, e.g. to share the request memo.
+        return self._executor.submit(copy_context().run, func, *args).result
+
+    def map(self, func: Callable[..., Any], args: Iterable[Hashable]) -> List[Callable[[], Any]]:
+        """Schedule a backend call for each argument, repeated arguments share a single call.
+
+        @return: Callables which return the results in the order of the arguments.
+        """
+        args = list(args)
+        calls = {arg: self.submit(func, arg) for arg in dict.fromkeys(args)}
+        return [calls[arg] for arg in args]
+
+
+def warm_up(calls: Iterable[Callable[[], Any]]) -> float:
+    """Make cheap calls concurrently to establish channels to the registry.
+
+    Objects are not expected to exist, other errors are logged.
+
+    @return: Duration of the warm-up in seconds.
+    """
+    start = monotonic()
+    calls = list(calls)
+    if calls:
+        with ThreadPoolExecutor(len(calls), thread_name_prefix='rdap-warm-up') as executor:
+            for future in [executor.submit(call) for call in calls]:
+                try:
+                    future.result()
+                except ObjectDoesNotExist:
+                    pass
+                except Exception as error:
+                    logging.warning('Warm-up call failed: %s', error)
+    return monotonic() - start
+
+
+async def gather_unique(func: Callable[..., Awaitable[Any]], args: Iterable[Hashable]) -> List[Any]:
+    """Await backend calls for each argument concurrently, repeated arguments share a single call.
+
+    @return: Results in the order of the arguments.
+    """
+    args = list(args)
+    unique_args = list(dict.fromkeys(args))
+    results = dict(zip(unique_args, await asyncio.gather(*(func(arg) for arg in unique_args))))
+    return [results[arg] for arg in args]
+
+
+def resolved(result: Any) -> Callable[[], Any]:
+    """Return callable which returns the result of a finished backend call or raises its exception.
+
+    The callable is compatible with `BackendExecutor.submit`, e.g. for results of `asyncio.gather`.
+    """
+    def _result() -> Any:
+        if isinstance(result, BaseException):
+            raise result
+        return result
+    return _result
@@ -30,6 +30,7 @@ class LogResult(str, Enum):
     NOT_FOUND = 'NotFound'
     BAD_REQUEST = 'BadRequest'
     INTERNAL_SERVER_ERROR = 'InternalServerError'
+    TOO_MANY_REQUESTS = 'TooManyRequests'
 
 
 @unique
@@ -0,0 +1,143 @@
+#
+# Copyright (C) 2022  CZ.NIC, z. s. p. o.
+#
+# This file is part of FRED.
+#
+# FRED is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# FRED is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with FRED.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Membership filters."""
+import hashlib
+import logging
+import math
+import os
+from threading import Lock, Thread
+from time import monotonic
+from typing import Iterable, List, Optional, cast
+
+import idna
+
+
+class BloomFilter(object):
+    """Bloom filter of strings.
+
+    The filter may return false positives, but never false negatives.
+
+    @ivar size: Number of bits in the filter.
+    @ivar hash_count: Number of hashes for each item.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _indexes(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:], 'big')
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str) -> None:
+        """Add an item to the filter."""
+        for index in self._indexes(item):
+            self._bits[index // 8] |= 1 << (index % 8)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[index // 8] & (1 << (index % 8)) for index in self._indexes(item))
+
+
+def normalize_dns_host(fqdn: str) -> str:
+    """Return normalized DNS host name.
+
+    Internationalized names are encoded to A-labels, same as the names looked up.
+    """
+    fqdn = fqdn.strip().lower().rstrip('.')
+    if fqdn.isascii():
+        return fqdn
+    try:
+        return idna.encode(fqdn).decode()
+    except UnicodeError:
+        # Invalid names can't be looked up anyway.
+        return fqdn
+
+
+class DnsHostFilter(object):
+    """Filter of DNS hosts loaded from a file with one host name per line.
+
+    The filter is rebuilt in a background thread when the file is modified.
+    If the file is not set or can't be loaded, the filter contains all hosts.
+    A file without any hosts is considered broken, e.g. not completely written, and the previous filter is kept.
+
+    @ivar path: Path to the file with DNS hosts.
+    @ivar interval: Minimal number of seconds between checks of the file modification.
+    @ivar error_rate: Desired rate of false positives.
+    """
+
+    def __init__(self, path: Optional[str], interval: float = 300, error_rate: float = 0.01):
+        self.path = path
+        self.interval = interval
+        self.error_rate = error_rate
+        self._filter: Optional[BloomFilter] = None
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._lock = Lock()
+        self._loader: Optional[Thread] = None
+
+    def _load(self) -> None:
+        """Rebuild the filter if the file was modified."""
+        path = cast(str, self.path)
+        try:
+            mtime = os.stat(path).st_mtime
+            if mtime == self._mtime:
+                return
+            with open(path, encoding='utf-8') as file:
+                hosts: List[str] = [normalize_dns_host(line) for line in file]
+        except OSError as error:
+            logging.warning('Failed to load DNS hosts from %s: %s', path, error)
+            self._filter = None
+            self._mtime = None
+            return
+        hosts = [h for h in hosts if h]
+        if not hosts:
+            logging.warning('No DNS hosts found in %s, the file is ignored.', path)
+            return
+        bloom = BloomFilter(len(hosts), self.error_rate)
+        for host in hosts:
+            bloom.add(host)
+        self._filter = bloom
+        self._mtime = mtime
+        logging.info('Loaded %d DNS hosts from %s', len(hosts), path)
+
+    def refresh(self) -> None:
+        """Check the file for modifications in a background thread, if the check interval has passed."""
+        if self.path is None or monotonic() < self._next_check or not self._lock.acquire(blocking=False):
+            return
+        self._next_check = monotonic() + self.interval
+        self._loader = Thread(target=self._run_load, name='rdap-dns-host-filter', daemon=True)
+        self._loader.start()
+
+    def _run_load(self) -> None:
+        try:
+            self._load()
+        finally:
+            self._lock.release()
+
+    def __contains__(self, fqdn: str) -> bool:
+        self.refresh()
+        bloom = self._filter
+        if bloom is None:
+            return True
+        return normalize_dns_host(fqdn) in bloom
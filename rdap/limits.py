@@ -0,0 +1,205 @@
+#
+# Copyright (C) 2022  CZ.NIC, z. s. p. o.
+#
+# This file is part of FRED.
+#
+# FRED is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# FRED is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with FRED.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Limits of request processing."""
+import logging
+from contextlib import suppress
+from functools import lru_cache
+from ipaddress import ip_address, ip_network
+from math import ceil
+from threading import Lock
+from time import monotonic, time
+from typing import Any, Callable, List, Optional, Tuple, cast
+
+from django.core.cache import BaseCache, caches
+
+
+@lru_cache(maxsize=None)
+def _get_uwsgi() -> Any:
+    """Return the uWSGI module or `None` outside of uWSGI."""
+    try:
+        import uwsgi
+    except ImportError:
+        return None
+    return uwsgi
+
+
+def get_uwsgi_load() -> int:
+    """Return the number of requests processed by other uWSGI workers or waiting in the uWSGI listen queue.
+
+    Return zero outside of uWSGI.
+    """
+    uwsgi = _get_uwsgi()
+    if uwsgi is None:
+        return 0
+    worker_id = uwsgi.worker_id()
+    busy = sum(1 for worker in uwsgi.workers() if worker['id'] != worker_id and worker['status'] == 'busy')
+    return busy + cast(int, uwsgi.listen_queue())
+
+
+class ConcurrencyLimiter(object):
+    """Adaptive limit of requests processed concurrently.
+
+    The limit is adjusted by the AIMD algorithm - it's increased by one for each limit of successful requests and
+    decreased by the backoff ratio for each failed or slow request.
+    The current limit and numbers of requests are logged when requests are rejected, at most once per report interval.
+    Requests of other processes are counted as well, if the load function is provided.
+
+    @ivar max_limit: Maximal and initial limit, the limiter is disabled if not positive.
+    @ivar min_limit: Minimal limit.
+    @ivar latency: Number of seconds, after which a request is considered slow.
+    @ivar backoff: Ratio by which the limit is decreased.
+    @ivar report_interval: Minimal number of seconds between reports of rejected requests.
+    @ivar get_load: Function which returns the number of requests processed or queued by other processes.
+    @ivar limit: Current limit.
+    @ivar in_flight: Number of requests in progress.
+    @ivar rejected: Number of rejected requests.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, latency: float = 1.0, backoff: float = 0.9,
+                 report_interval: float = 60, get_load: Optional[Callable[[], int]] = None):
+        self.max_limit = max_limit
+        self.min_limit = max(min(min_limit, max_limit), 1)
+        self.latency = latency
+        self.backoff = backoff
+        self.report_interval = report_interval
+        self.get_load = get_load
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.rejected = 0
+        self._next_report = 0.0
+        self._lock = Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_limit > 0
+
+    def acquire(self) -> bool:
+        """Start processing a request and return whether it's within the limit."""
+        if not self.enabled:
+            return True
+        load = self.get_load() if self.get_load is not None else 0
+        with self._lock:
+            if self.in_flight + load >= int(self.limit):
+                self.rejected += 1
+                if monotonic() >= self._next_report:
+                    self._next_report = monotonic() + self.report_interval
+                    logging.warning('Concurrency limit %d reached with %d requests in progress or queued, '
+                                    '%d requests rejected.', int(self.limit), self.in_flight + load, self.rejected)
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, duration: float, success: bool = True) -> None:
+        """Finish processing of a request and adjust the limit.
+
+        @param duration: Duration of the request in seconds.
+        @param success: Whether the request succeeded.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.in_flight -= 1
+            if success and duration <= self.latency:
+                self.limit = min(self.limit + 1 / self.limit, self.max_limit)
+            else:
+                self.limit = max(self.limit * self.backoff, self.min_limit)
+
+
+class RateLimiter(object):
+    """Rate limits of client addresses and networks.
+
+    Requests are counted in fixed time windows, `burst` requests are allowed in a window of `burst / rate` seconds.
+    Counters are stored in a Django cache, so the limits are shared by all processes using the cache.
+    Counters are updated by atomic cache operations, so the cache should support them, e.g. memcached or redis.
+    Requests are allowed, if the cache fails.
+
+    @ivar cache_name: Name of the Django cache.
+    @ivar rate: Number of requests per second allowed to an address, the limit is disabled if not positive.
+    @ivar burst: Maximal number of requests allowed to an address at once.
+    @ivar network_rate: Number of requests per second allowed to a network, the limit is disabled if not positive.
+    @ivar network_burst: Maximal number of requests allowed to a network at once.
+    @ivar ipv4_prefix: Prefix length of IPv4 networks.
+    @ivar ipv6_prefix: Prefix length of IPv6 networks.
+    """
+
+    def __init__(self, cache_name: str, rate: float, burst: int, network_rate: float = 0, network_burst: int = 0,
+                 ipv4_prefix: int = 24, ipv6_prefix: int = 48):
+        self.cache_name = cache_name
+        self.rate = rate
+        self.burst = burst
+        self.network_rate = network_rate
+        self.network_burst = network_burst
+        self.ipv4_prefix = ipv4_prefix
+        self.ipv6_prefix = ipv6_prefix
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 or self.network_rate > 0
+
+    def get_buckets(self, address: str) -> List[Tuple[str, float, int]]:
+        """Return keys, rates and bursts of the buckets of the address."""
+        try:
+            parsed = ip_address(address)
+        except ValueError:
+            return []
+        buckets = []
+        if self.rate > 0:
+            buckets.append(('rdap:rate:{}'.format(parsed), self.rate, self.burst))
+        if self.network_rate > 0:
+            prefix = self.ipv4_prefix if parsed.version == 4 else self.ipv6_prefix
+            network = ip_network('{}/{}'.format(parsed, prefix), strict=False)
+            buckets.append(('rdap:rate:{}'.format(network), self.network_rate, self.network_burst))
+        return buckets
+
+    def check(self, address: str) -> Optional[float]:
+        """Count a request from the address.
+
+        @return: `None` if the request is allowed, number of seconds until the end of the window otherwise.
+        """
+        if not self.enabled:
+            return None
+        cache = caches[self.cache_name]
+        taken: List[str] = []
+        try:
+            for key, rate, burst in self.get_buckets(address):
+                window = max(burst, 1) / rate
+                now = time()
+                slot = int(now // window)
+                slot_key = '{}:{}'.format(key, slot)
+                if self._incr(cache, slot_key, ceil(window)) > burst:
+                    # Rejected requests are not counted in the other buckets.
+                    for taken_key in taken:
+                        with suppress(ValueError):
+                            cache.decr(taken_key)
+                    return (slot + 1) * window - now
+                taken.append(slot_key)
+        except Exception as error:
+            logging.warning('Rate limit check failed: %s', error)
+        return None
+
+    def _incr(self, cache: BaseCache, key: str, timeout: int) -> int:
+        """Increment the counter and return its value."""
+        if cache.add(key, 1, timeout):
+            return 1
+        try:
+            return cast(int, cache.incr(key))
+        except ValueError:
+            # Counter expired in the meantime.
+            cache.add(key, 1, timeout)
+            return 1
@@ -0,0 +1,138 @@
+#
+# Copyright (C) 2022  CZ.NIC, z. s. p. o.
+#
+# This file is part of FRED.
+#
+# FRED is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# FRED is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with FRED.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Utilities for FRED logger."""
+import atexit
+import logging
+from collections import deque
+from threading import Condition, Thread
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+class QueuedLogEntryId(object):
+    """Identifier of a queued log entry, which is known once the entry is created in the logger.
+
+    @ivar value: Identifier of the log entry in the logger.
+    @ivar dropped: Whether the log entry was dropped.
+    """
+
+    def __init__(self, dropped: bool = False):
+        self.value: Any = None
+        self.dropped = dropped
+
+
+# Queued logger call - method name, log entry identifier, arguments and keyword arguments.
+_Call = Tuple[str, QueuedLogEntryId, Tuple[Any, ...], Dict[str, Any]]
+
+
+class QueuedLoggerClient(object):
+    """Logger client proxy which queues the log entries and sends them to the logger in a background thread.
+
+    The queued log entries are sent in batches, so the latency of the logger doesn't add to the request.
+    Logger doesn't provide batch calls, so the calls in a batch are made one by one.
+
+    @ivar client: The wrapped logger client.
+    @ivar max_size: Maximal number of log entries in the queue.
+    @ivar batch_size: Maximal number of calls sent in a batch.
+    @ivar block: Whether to wait for a space in a full queue, otherwise the new log entry is dropped.
+    @ivar flush_timeout: Maximal number of seconds to wait for the queue to be sent on exit.
+    @ivar dropped: Number of dropped log entries.
+    """
+
+    def __init__(self, client: Any, max_size: int, batch_size: int = 100, block: bool = False,
+                 flush_timeout: float = 5):
+        self.client = client
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.block = block
+        self.flush_timeout = flush_timeout
+        self.dropped = 0
+        self._queue: Deque[_Call] = deque()
+        # Number of log entries created in the queue.
+        self._size = 0
+        self._closed = False
+        self._condition = Condition()
+        self._sender: Optional[Thread] = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    def create_log_entry(self, *args: Any, **kwargs: Any) -> QueuedLogEntryId:
+        """Queue creation of a log entry and return its identifier."""
+        with self._condition:
+            # Sender is started lazily to start the thread only in the worker processes.
+            if self._sender is None:
+                self._sender = Thread(target=self._run, name='rdap-logger', daemon=True)
+                self._sender.start()
+                atexit.register(self.close)
+            while self.block and self._size >= self.max_size and not self._closed:
+                self._condition.wait()
+            if self._size >= self.max_size or self._closed:
+                self.dropped += 1
+                return QueuedLogEntryId(dropped=True)
+            log_entry_id = QueuedLogEntryId()
+            self._queue.append(('create_log_entry', log_entry_id, args, kwargs))
+            self._size += 1
+            self._condition.notify_all()
+            return log_entry_id
+
+    def close_log_entry(self, log_entry_id: QueuedLogEntryId, *args: Any, **kwargs: Any) -> None:
+        """Queue closing of a log entry."""
+        if log_entry_id.dropped:
+            return
+        with self._condition:
+            # Log entries in the queue are always closed, so the queue holds at most twice the maximal size calls.
+            self._queue.append(('close_log_entry', log_entry_id, args, kwargs))
+            self._condition.notify_all()
+
+    def close(self) -> None:
+        """Send the queued log entries and stop the sender."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            sender = self._sender
+        if sender is not None:
+            sender.join(self.flush_timeout)
+            if sender.is_alive():
+                logging.warning('Logger queue was not flushed in %s seconds.', self.flush_timeout)
+
+    def _run(self) -> None:
+        dropped = 0
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                batch = [self._queue.popleft() for i in range(min(self.batch_size, len(self._queue)))]
+                self._size -= sum(1 for call in batch if call[0] == 'create_log_entry')
+                self._condition.notify_all()
+                if self.dropped > dropped:
+                    logging.warning('Logger queue is full, %d log entries dropped.', self.dropped - dropped)
+                    dropped = self.dropped
+            self._send(batch)
+
+    def _send(self, batch: List[_Call]) -> None:
+        for method, log_entry_id, args, kwargs in batch:
+            try:
+                if method == 'create_log_entry':
+                    log_entry_id.value = self.client.create_log_entry(*args, **kwargs)
+                elif log_entry_id.value is not None:
+                    self.client.close_log_entry(log_entry_id.value, *args, **kwargs)
+            except Exception as error:
+                logging.warning('Logger call %s failed: %s', method, error)
@@ -17,22 +17,78 @@
 # along with FRED.  If not, see <https://www.gnu.org/licenses/>.
 #
 """Wrapper module to whois idl interface."""
+import asyncio
 import logging
 from datetime import datetime
-from typing import Any, Dict, cast
+from typing import Any, Callable, Dict, Optional, Sequence, cast
 
 from django.http import HttpRequest
 from django.urls import reverse
-from regal import Domain, ObjectEvents
+from regal import Domain, Keyset, Nsset, ObjectEvents
 
+from rdap.clients import resolved
 from rdap.constants import ObjectStatus
-from rdap.settings import CONTACT_CLIENT, DOMAIN_CLIENT, KEYSET_CLIENT, NSSET_CLIENT, RDAP_SETTINGS
+from rdap.settings import (ASYNC_CONTACT_CLIENT, ASYNC_DOMAIN_CLIENT, ASYNC_KEYSET_CLIENT, ASYNC_NSSET_CLIENT,
+                           BACKEND_EXECUTOR, CONTACT_CLIENT, DOMAIN_CLIENT, KEYSET_CLIENT, NSSET_CLIENT, RDAP_SETTINGS)
 
 from .rdap_utils import ObjectClassName, add_unicode_name, rdap_status_mapping, to_rfc3339
 
 
+def _get_nsset(handle: str) -> Nsset:
+    return NSSET_CLIENT.get_nsset_info(NSSET_CLIENT.get_nsset_id(handle))
+
+
+def _get_keyset(handle: str) -> Keyset:
+    return KEYSET_CLIENT.get_keyset_info(KEYSET_CLIENT.get_keyset_id(handle))
+
+
+async def _get_nsset_async(handle: str) -> Nsset:
+    return await ASYNC_NSSET_CLIENT.get_nsset_info(await ASYNC_NSSET_CLIENT.get_nsset_id(handle))
+
+
+async def _get_keyset_async(handle: str) -> Keyset:
+    return await ASYNC_KEYSET_CLIENT.get_keyset_info(await ASYNC_KEYSET_CLIENT.get_keyset_id(handle))
+
+
 def domain_to_dict(domain: Domain, request: HttpRequest) -> Dict[str, Any]:
     """Transform domain to python dictionary."""
+    # Linked objects are independent of each other, fetch them concurrently.
+    # Links are built afterwards, since the script prefix used by `reverse` is thread local.
+    fetch_statuses = BACKEND_EXECUTOR.submit(DOMAIN_CLIENT.get_domain_state, domain.domain_id)
+    fetch_registrant = BACKEND_EXECUTOR.submit(CONTACT_CLIENT.get_contact_handle, domain.registrant)
+    fetch_admins = [BACKEND_EXECUTOR.submit(CONTACT_CLIENT.get_contact_handle, admin_id)
+                    for admin_id in domain.administrative_contacts]
+    fetch_nsset = BACKEND_EXECUTOR.submit(_get_nsset, domain.nsset) if domain.nsset else None
+    fetch_keyset = BACKEND_EXECUTOR.submit(_get_keyset, domain.keyset) if domain.keyset else None
+    return _domain_to_dict(domain, request, fetch_statuses, fetch_registrant, fetch_admins, fetch_nsset,
+                           fetch_keyset)
+
+
+async def domain_to_dict_async(domain: Domain, request: HttpRequest) -> Dict[str, Any]:
+    """Transform domain to python dictionary using asynchronous clients."""
+    calls = [ASYNC_DOMAIN_CLIENT.get_domain_state(domain.domain_id),
+             ASYNC_CONTACT_CLIENT.get_contact_handle(domain.registrant)]
+    calls.extend(ASYNC_CONTACT_CLIENT.get_contact_handle(admin_id) for admin_id in domain.administrative_contacts)
+    if domain.nsset:
+        calls.append(_get_nsset_async(domain.nsset))
+    if domain.keyset:
+        calls.append(_get_keyset_async(domain.keyset))
+    # Errors are raised only when the results are used, same as in the synchronous version.
+    fetches = [resolved(r) for r in await asyncio.gather(*calls, return_exceptions=True)]
+
+    fetch_statuses, fetch_registrant, *fetch_others = fetches
+    fetch_admins = fetch_others[:len(domain.administrative_contacts)]
+    fetch_others = fetch_others[len(domain.administrative_contacts):]
+    fetch_nsset = fetch_others.pop(0) if domain.nsset else None
+    fetch_keyset = fetch_others.pop(0) if domain.keyset else None
+    return _domain_to_dict(domain, request, fetch_statuses, fetch_registrant, fetch_admins, fetch_nsset,
+                           fetch_keyset)
+
+
+def _domain_to_dict(domain: Domain, request: HttpRequest, fetch_statuses: Callable[[], Dict[str, bool]],
+                    fetch_registrant: Callable[[], str], fetch_admins: Sequence[Callable[[], str]],
+                    fetch_nsset: Optional[Callable[[], Nsset]],
+                    fetch_keyset: Optional[Callable[[], Keyset]]) -> Dict[str, Any]:
     logging.debug(domain)
     events = cast(ObjectEvents, domain.events)
 
@@ -55,13 +111,13 @@ def domain_to_dict(domain: Domain, request: HttpRequest) -> Dict[str, Any]:
     if RDAP_SETTINGS.UNIX_WHOIS:
         result['port43'] = RDAP_SETTINGS.UNIX_WHOIS
 
-    statuses = DOMAIN_CLIENT.get_domain_state(domain.domain_id)
+    statuses = fetch_statuses()
     if statuses.get(ObjectStatus.DELETE_CANDIDATE, False):
         result['status'] = ["pending delete"]
     else:
-        registrant = CONTACT_CLIENT.get_contact_info(domain.registrant)
+        registrant_handle = fetch_registrant()
         registrant_link = request.build_absolute_uri(
-            reverse('entity-detail', kwargs={"handle": registrant.contact_handle}))
+            reverse('entity-detail', kwargs={"handle": registrant_handle}))
 
         result.update({
             "events": [
@@ -77,7 +133,7 @@ def domain_to_dict(domain: Domain, request: HttpRequest) -> Dict[str, Any]:
             "entities": [
                 {
                     "objectClassName": ObjectClassName.ENTITY,
-                    "handle": registrant.contact_handle,
+                    "handle": registrant_handle,
                     "roles": ["registrant"],
                     "links": [
                         {
@@ -98,13 +154,13 @@ def domain_to_dict(domain: Domain, request: HttpRequest) -> Dict[str, Any]:
 
         add_unicode_name(result, domain.fqdn)
 
-        for admin_id in domain.administrative_contacts:
-            contact = CONTACT_CLIENT.get_contact_info(admin_id)
-            admin_link = request.build_absolute_uri(reverse('entity-detail', kwargs={"handle": contact.contact_handle}))
+        for fetch_admin in fetch_admins:
+            admin_handle = fetch_admin()
+            admin_link = request.build_absolute_uri(reverse('entity-detail', kwargs={"handle": admin_handle}))
             result['entities'].append(
                 {
                     "objectClassName": ObjectClassName.ENTITY,
-                    "handle": contact.contact_handle,
+                    "handle": admin_handle,
                     "roles": ["administrative"],
                     "links": [
                         {
@@ -134,8 +190,8 @@ def domain_to_dict(domain: Domain, request: HttpRequest) -> Dict[str, Any]:
                 "eventDate": to_rfc3339(domain.validation_expires_at),
             })
 
-        if domain.nsset:
-            nsset = NSSET_CLIENT.get_nsset_info(NSSET_CLIENT.get_nsset_id(domain.nsset))
+        if fetch_nsset is not None:
+            nsset = fetch_nsset()
 
             nsset_link = request.build_absolute_uri(reverse('nsset-detail', kwargs={"handle": nsset.nsset_handle}))
             result["nameservers"] = []
@@ -181,8 +237,8 @@ def domain_to_dict(domain: Domain, request: HttpRequest) -> Dict[str, Any]:
                 result['nameservers'].append(ns_obj)
                 result['fred_nsset']['nameservers'].append(ns_obj)
 
-        if domain.keyset:
-            keyset = KEYSET_CLIENT.get_keyset_info(KEYSET_CLIENT.get_keyset_id(domain.keyset))
+        if fetch_keyset is not None:
+            keyset = fetch_keyset()
 
             result["secureDNS"] = {
                 "zoneSigned": True,
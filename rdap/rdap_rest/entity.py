@@ -26,18 +26,26 @@ from django.urls import reverse
 from regal import Contact, ObjectEvents
 
 from rdap.constants import ObjectStatus, Publish
-from rdap.settings import CONTACT_CLIENT, RDAP_SETTINGS
+from rdap.settings import ASYNC_CONTACT_CLIENT, CONTACT_CLIENT, RDAP_SETTINGS
 
 from .rdap_utils import ObjectClassName, rdap_status_mapping, to_rfc3339
 
 
 def contact_to_dict(contact: Contact, request: HttpRequest) -> Dict[str, Any]:
     """Transform contact to python dictionary."""
+    return _contact_to_dict(contact, request, CONTACT_CLIENT.get_contact_state(contact.contact_id))
+
+
+async def contact_to_dict_async(contact: Contact, request: HttpRequest) -> Dict[str, Any]:
+    """Transform contact to python dictionary using asynchronous client."""
+    return _contact_to_dict(contact, request, await ASYNC_CONTACT_CLIENT.get_contact_state(contact.contact_id))
+
+
+def _contact_to_dict(contact: Contact, request: HttpRequest, statuses: Dict[str, bool]) -> Dict[str, Any]:
     logging.debug(contact)
     events = cast(ObjectEvents, contact.events)
 
     self_link = request.build_absolute_uri(reverse('entity-detail', kwargs={"handle": contact.contact_handle}))
-    statuses = CONTACT_CLIENT.get_contact_state(contact.contact_id)
     if not statuses.get(ObjectStatus.LINKED, False):
         result: Dict[str, Any] = {
             "rdapConformance": ["rdap_level_0"],
@@ -17,21 +17,40 @@
 # along with FRED.  If not, see <https://www.gnu.org/licenses/>.
 #
 """Wrapper module to whois idl interface."""
+import asyncio
 import logging
 from datetime import datetime
-from typing import Any, Dict, cast
+from typing import Any, Callable, Dict, Sequence, cast
 
 from django.http import HttpRequest
 from django.urls import reverse
 from regal import Keyset, ObjectEvents
 
-from rdap.settings import CONTACT_CLIENT, KEYSET_CLIENT, RDAP_SETTINGS
+from rdap.clients import gather_unique, resolved
+from rdap.settings import (ASYNC_CONTACT_CLIENT, ASYNC_KEYSET_CLIENT, BACKEND_EXECUTOR, CONTACT_CLIENT, KEYSET_CLIENT,
+                           RDAP_SETTINGS)
 
 from .rdap_utils import ObjectClassName, rdap_status_mapping, to_rfc3339
 
 
 def keyset_to_dict(keyset: Keyset, request: HttpRequest) -> Dict[str, Any]:
     """Transform CORBA keyset keyset to python dictionary."""
+    # Technical contacts are fetched concurrently, while the state is fetched.
+    fetch_techs = BACKEND_EXECUTOR.map(CONTACT_CLIENT.get_contact_handle, keyset.technical_contacts)
+    statuses = KEYSET_CLIENT.get_keyset_state(keyset.keyset_id)
+    return _keyset_to_dict(keyset, request, statuses, fetch_techs)
+
+
+async def keyset_to_dict_async(keyset: Keyset, request: HttpRequest) -> Dict[str, Any]:
+    """Transform keyset to python dictionary using asynchronous clients."""
+    statuses, techs = await asyncio.gather(
+        ASYNC_KEYSET_CLIENT.get_keyset_state(keyset.keyset_id),
+        gather_unique(ASYNC_CONTACT_CLIENT.get_contact_handle, keyset.technical_contacts))
+    return _keyset_to_dict(keyset, request, statuses, [resolved(tech) for tech in techs])
+
+
+def _keyset_to_dict(keyset: Keyset, request: HttpRequest, statuses: Dict[str, bool],
+                    fetch_techs: Sequence[Callable[[], str]]) -> Dict[str, Any]:
     logging.debug(keyset)
     events = cast(ObjectEvents, keyset.events)
 
@@ -66,15 +85,14 @@ def keyset_to_dict(keyset: Keyset, request: HttpRequest) -> Dict[str, Any]:
     if RDAP_SETTINGS.UNIX_WHOIS:
         result['port43'] = RDAP_SETTINGS.UNIX_WHOIS
 
-    statuses = KEYSET_CLIENT.get_keyset_state(keyset.keyset_id)
     result["status"] = rdap_status_mapping(tuple(s for s, f in statuses.items() if f))
 
-    for tech_id in keyset.technical_contacts:
-        contact = CONTACT_CLIENT.get_contact_info(tech_id)
-        tech_link = request.build_absolute_uri(reverse('entity-detail', kwargs={"handle": contact.contact_handle}))
+    for fetch_tech in fetch_techs:
+        tech_handle = fetch_tech()
+        tech_link = request.build_absolute_uri(reverse('entity-detail', kwargs={"handle": tech_handle}))
         result['entities'].append({
             "objectClassName": ObjectClassName.ENTITY,
-            "handle": contact.contact_handle,
+            "handle": tech_handle,
             "roles": ["technical"],
             "links": [
                 {
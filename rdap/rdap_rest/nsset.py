@@ -17,21 +17,40 @@
 # along with FRED.  If not, see <https://www.gnu.org/licenses/>.
 #
 """Wrapper module to whois idl interface."""
+import asyncio
 import logging
 from datetime import datetime
-from typing import Any, Dict, cast
+from typing import Any, Callable, Dict, Sequence, cast
 
 from django.http import HttpRequest
 from django.urls import reverse
 from regal import Nsset, ObjectEvents
 
-from rdap.settings import CONTACT_CLIENT, NSSET_CLIENT, RDAP_SETTINGS
+from rdap.clients import gather_unique, resolved
+from rdap.settings import (ASYNC_CONTACT_CLIENT, ASYNC_NSSET_CLIENT, BACKEND_EXECUTOR, CONTACT_CLIENT, NSSET_CLIENT,
+                           RDAP_SETTINGS)
 
 from .rdap_utils import ObjectClassName, add_unicode_name, rdap_status_mapping, to_rfc3339
 
 
 def nsset_to_dict(nsset: Nsset, request: HttpRequest) -> Dict[str, Any]:
     """Transform nsset to python dictionary."""
+    # Technical contacts are fetched concurrently, while the state is fetched.
+    fetch_techs = BACKEND_EXECUTOR.map(CONTACT_CLIENT.get_contact_handle, nsset.technical_contacts)
+    statuses = NSSET_CLIENT.get_nsset_state(nsset.nsset_id)
+    return _nsset_to_dict(nsset, request, statuses, fetch_techs)
+
+
+async def nsset_to_dict_async(nsset: Nsset, request: HttpRequest) -> Dict[str, Any]:
+    """Transform nsset to python dictionary using asynchronous clients."""
+    statuses, techs = await asyncio.gather(
+        ASYNC_NSSET_CLIENT.get_nsset_state(nsset.nsset_id),
+        gather_unique(ASYNC_CONTACT_CLIENT.get_contact_handle, nsset.technical_contacts))
+    return _nsset_to_dict(nsset, request, statuses, [resolved(tech) for tech in techs])
+
+
+def _nsset_to_dict(nsset: Nsset, request: HttpRequest, statuses: Dict[str, bool],
+                   fetch_techs: Sequence[Callable[[], str]]) -> Dict[str, Any]:
     logging.debug(nsset)
     events = cast(ObjectEvents, nsset.events)
 
@@ -67,15 +86,14 @@ def nsset_to_dict(nsset: Nsset, request: HttpRequest) -> Dict[str, Any]:
     if RDAP_SETTINGS.UNIX_WHOIS:
         result['port43'] = RDAP_SETTINGS.UNIX_WHOIS
 
-    statuses = NSSET_CLIENT.get_nsset_state(nsset.nsset_id)
     result["status"] = rdap_status_mapping(tuple(s for s, f in statuses.items() if f))
 
-    for tech_id in nsset.technical_contacts:
-        contact = CONTACT_CLIENT.get_contact_info(tech_id)
-        tech_link = request.build_absolute_uri(reverse('entity-detail', kwargs={"handle": contact.contact_handle}))
+    for fetch_tech in fetch_techs:
+        tech_handle = fetch_tech()
+        tech_link = request.build_absolute_uri(reverse('entity-detail', kwargs={"handle": tech_handle}))
         result['entities'].append({
             "objectClassName": ObjectClassName.ENTITY,
-            "handle": contact.contact_handle,
+            "handle": tech_handle,
             "roles": ["technical"],
             "links": [
                 {
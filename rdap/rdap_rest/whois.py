@@ -23,12 +23,17 @@ from typing import Any, Dict, Optional
 from django.http import HttpRequest
 from regal.exceptions import ObjectDoesNotExist
 
-from ..settings import CONTACT_CLIENT, DOMAIN_CLIENT, KEYSET_CLIENT, NSSET_CLIENT
-from .domain import domain_to_dict
-from .entity import contact_to_dict
-from .keyset import keyset_to_dict
+from ..filters import DnsHostFilter
+from ..settings import (ASYNC_CONTACT_CLIENT, ASYNC_DOMAIN_CLIENT, ASYNC_KEYSET_CLIENT, ASYNC_NSSET_CLIENT,
+                        CONTACT_CLIENT, DOMAIN_CLIENT, KEYSET_CLIENT, NSSET_CLIENT, RDAP_SETTINGS)
+from .domain import domain_to_dict, domain_to_dict_async
+from .entity import contact_to_dict, contact_to_dict_async
+from .keyset import keyset_to_dict, keyset_to_dict_async
 from .nameserver import nameserver_to_dict
-from .nsset import nsset_to_dict
+from .nsset import nsset_to_dict, nsset_to_dict_async
+
+DNS_HOST_FILTER = DnsHostFilter(RDAP_SETTINGS.DNS_HOST_FILTER_FILE, RDAP_SETTINGS.DNS_HOST_FILTER_INTERVAL,
+                                RDAP_SETTINGS.DNS_HOST_FILTER_ERROR_RATE)
 
 
 def get_contact_by_handle(request: HttpRequest, handle: str) -> Optional[Dict[str, Any]]:
@@ -46,7 +51,8 @@ def get_domain_by_handle(request: HttpRequest, handle: str) -> Optional[Dict[str
 
 def get_nameserver_by_handle(request: HttpRequest, handle: str) -> Dict[str, Any]:
     logging.debug('get_nameserver_by_handle: %s', handle)
-    if NSSET_CLIENT.check_dns_host(handle):
+    # The filter may only rule out the host, the positive answer has to be confirmed by the registry.
+    if handle in DNS_HOST_FILTER and NSSET_CLIENT.check_dns_host(handle):
         return nameserver_to_dict(handle, request)
     else:
         raise ObjectDoesNotExist()
@@ -62,3 +68,36 @@ def get_keyset_by_handle(request: HttpRequest, handle: str) -> Optional[Dict[str
     logging.debug('get_keyset_by_handle: %s', handle)
     keyset = KEYSET_CLIENT.get_keyset_info(KEYSET_CLIENT.get_keyset_id(handle))
     return keyset_to_dict(keyset, request)
+
+
+async def get_contact_by_handle_async(request: HttpRequest, handle: str) -> Optional[Dict[str, Any]]:
+    """Get contact by handle and return RDAP structure using asynchronous clients."""
+    logging.debug('get_contact_by_handle_async: %s', handle)
+    contact = await ASYNC_CONTACT_CLIENT.get_contact_info(await ASYNC_CONTACT_CLIENT.get_contact_id(handle))
+    return await contact_to_dict_async(contact, request)
+
+
+async def get_domain_by_handle_async(request: HttpRequest, handle: str) -> Optional[Dict[str, Any]]:
+    logging.debug('get_domain_by_handle_async: %s', handle)
+    domain = await ASYNC_DOMAIN_CLIENT.get_domain_info(await ASYNC_DOMAIN_CLIENT.get_domain_id(handle))
+    return await domain_to_dict_async(domain, request)
+
+
+async def get_nameserver_by_handle_async(request: HttpRequest, handle: str) -> Dict[str, Any]:
+    logging.debug('get_nameserver_by_handle_async: %s', handle)
+    if handle in DNS_HOST_FILTER and await ASYNC_NSSET_CLIENT.check_dns_host(handle):
+        return nameserver_to_dict(handle, request)
+    else:
+        raise ObjectDoesNotExist()
+
+
+async def get_nsset_by_handle_async(request: HttpRequest, handle: str) -> Optional[Dict[str, Any]]:
+    logging.debug('get_nsset_by_handle_async: %s', handle)
+    nsset = await ASYNC_NSSET_CLIENT.get_nsset_info(await ASYNC_NSSET_CLIENT.get_nsset_id(handle))
+    return await nsset_to_dict_async(nsset, request)
+
+
+async def get_keyset_by_handle_async(request: HttpRequest, handle: str) -> Optional[Dict[str, Any]]:
+    logging.debug('get_keyset_by_handle_async: %s', handle)
+    keyset = await ASYNC_KEYSET_CLIENT.get_keyset_info(await ASYNC_KEYSET_CLIENT.get_keyset_id(handle))
+    return await keyset_to_dict_async(keyset, request)
@@ -17,14 +17,26 @@
 # along with FRED.  If not, see <https://www.gnu.org/licenses/>.
 #
 """RDAP application settings wrapper."""
+import json
 import os
-from typing import Any, Dict
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, Type, TypeVar, Union, cast
 
-from appsettings import AppSettings, DictSetting, FileSetting, IntegerSetting, ListSetting, StringSetting
+from appsettings import (AppSettings, BooleanSetting, DictSetting, FileSetting, FloatSetting, IntegerSetting,
+                         ListSetting, Setting, StringSetting)
+from django.core.exceptions import ValidationError
+from django.utils.functional import SimpleLazyObject
 from frgal import make_credentials
 from frgal.aio import SyncGrpcProxy
 from regal import ContactClient, DomainClient, KeysetClient, NssetClient
 
+from .cache import LruCache
+from .clients import (AsyncContactHandleProxy, BackendExecutor, BatchingProxy, CircuitBreaker, CircuitBreakerProxy,
+                      ClientPool, ContactHandleProxy, DeadlineProxy, HedgingPolicy, IdCacheProxy, LoadBalancer,
+                      RequestMemoProxy, channel_options)
+
+T = TypeVar('T')
+
 
 class LoggerOptionsSetting(DictSetting):
     """Custom dict setting for logger options."""
@@ -37,16 +49,121 @@ class LoggerOptionsSetting(DictSetting):
         return value
 
 
+class NetlocSetting(Setting):
+    """Custom setting for a network location or a list of network locations."""
+
+    def decode_environ(self, value: str) -> Any:
+        """Decode a JSON list or return the plain string."""
+        try:
+            return super().decode_environ(value)
+        except json.JSONDecodeError:
+            return value
+
+    def validate(self, value: Any) -> None:
+        """Check the value is a string or a non-empty list of strings."""
+        netlocs = [value] if isinstance(value, str) else value
+        if not isinstance(netlocs, (list, tuple)) or not netlocs or not all(isinstance(n, str) for n in netlocs):
+            raise ValidationError('Value must be a string or a non-empty list of strings.')
+
+    def transform(self, value: Union[str, Sequence[str]]) -> List[str]:
+        """Transform the value to a list."""
+        return [value] if isinstance(value, str) else list(value)
+
+
 class RdapAppSettings(AppSettings):
     """RDAP specific settings."""
 
     LOGGER = StringSetting(default='grill.DummyLoggerClient')
     LOGGER_OPTIONS = LoggerOptionsSetting(default={})
-    REGISTRY_NETLOC = StringSetting(required=True)
+    # Queue of log entries
+    LOGGER_QUEUE_SIZE = IntegerSetting(default=0)
+    LOGGER_QUEUE_BLOCK = BooleanSetting(default=False)
+    LOGGER_BATCH_SIZE = IntegerSetting(default=100)
+    LOGGER_FLUSH_TIMEOUT = FloatSetting(default=5.0, minimum=0.0)
+    REGISTRY_NETLOC = NetlocSetting(required=True)
     REGISTRY_SSL_CERT = FileSetting(default=None, mode=os.R_OK)
+    # Pool of registry channels
+    REGISTRY_CHANNEL_POOL_SIZE = IntegerSetting(default=1)
+    REGISTRY_KEEPALIVE_TIME = IntegerSetting(default=None)
+    REGISTRY_KEEPALIVE_TIMEOUT = IntegerSetting(default=None)
+    REGISTRY_MAX_CONCURRENT_STREAMS = IntegerSetting(default=None)
+    REGISTRY_WARM_UP = BooleanSetting(default=False)
+    # Load balancing of registry endpoints
+    REGISTRY_EJECTION_FAILURES = IntegerSetting(default=5)
+    REGISTRY_EJECTION_TIME = IntegerSetting(default=30)
     DISCLAIMER = ListSetting(default=None)
     UNIX_WHOIS = StringSetting(default=None)
     MAX_SIG_LIFE = IntegerSetting(default=None)
+    # Cache-Control headers
+    CACHE_CONTROL = DictSetting(default={
+        'domain': {'public': True, 'max_age': 60, 'stale_while_revalidate': 60},
+        'entity': {'public': True, 'max_age': 60, 'stale_while_revalidate': 60},
+        'nameserver': {'public': True, 'max_age': 300, 'stale_while_revalidate': 60},
+        'fred_nsset': {'public': True, 'max_age': 300, 'stale_while_revalidate': 60},
+        'fred_keyset': {'public': True, 'max_age': 300, 'stale_while_revalidate': 60},
+        'help': {'public': True, 'max_age': 86400},
+        'unsupported': {'public': True, 'max_age': 86400},
+    })
+    CACHE_CONTROL_STATUSES = DictSetting(default={'pending delete': {'public': True, 'max_age': 10}})
+    # In-process response cache
+    RESPONSE_CACHE_SIZE = IntegerSetting(default=0)
+    RESPONSE_CACHE_TIMEOUT = IntegerSetting(default=60)
+    RESPONSE_CACHE_TIMEOUTS = DictSetting(default={})
+    RESPONSE_CACHE_STALE_TIMEOUT = IntegerSetting(default=0)
+    RESPONSE_CACHE_REFRESH_WORKERS = IntegerSetting(default=1)
+    # Response cache shared by workers
+    SHARED_CACHE = StringSetting(default=None)
+    SHARED_CACHE_TIMEOUT = IntegerSetting(default=None)
+    SHARED_CACHE_LOCK_TIMEOUT = IntegerSetting(default=0)
+    # Cache of not found responses
+    NOT_FOUND_CACHE_SIZE = IntegerSetting(default=0)
+    NOT_FOUND_CACHE_TIMEOUT = IntegerSetting(default=10)
+    NOT_FOUND_CACHE_TIMEOUTS = DictSetting(default={})
+    # Cache of object identifiers
+    ID_CACHE_SIZE = IntegerSetting(default=0)
+    ID_CACHE_TIMEOUT = IntegerSetting(default=3600)
+    # Cache of contact handles
+    CONTACT_HANDLE_CACHE_SIZE = IntegerSetting(default=1000)
+    CONTACT_HANDLE_CACHE_TIMEOUT = IntegerSetting(default=3600)
+    # Filter of DNS hosts
+    DNS_HOST_FILTER_FILE = FileSetting(default=None, mode=os.R_OK)
+    DNS_HOST_FILTER_INTERVAL = IntegerSetting(default=300)
+    DNS_HOST_FILTER_ERROR_RATE = FloatSetting(default=0.01, minimum=0.0, maximum=1.0)
+    # Concurrent backend calls
+    BACKEND_WORKERS = IntegerSetting(default=0)
+    # Deadline of backend calls
+    REQUEST_DEADLINE = FloatSetting(default=None)
+    REQUEST_DEADLINE_WORKERS = IntegerSetting(default=10)
+    # Circuit breaker of registry calls
+    CIRCUIT_BREAKER_WINDOW = IntegerSetting(default=0)
+    CIRCUIT_BREAKER_FAILURE_RATE = FloatSetting(default=0.5, minimum=0.0, maximum=1.0)
+    CIRCUIT_BREAKER_SLOW_CALL = FloatSetting(default=None)
+    CIRCUIT_BREAKER_OPEN_TIMEOUT = IntegerSetting(default=30)
+    CIRCUIT_BREAKER_HALF_OPEN_CALLS = IntegerSetting(default=1)
+    # Adaptive limit of concurrent requests
+    CONCURRENCY_LIMIT = IntegerSetting(default=0)
+    CONCURRENCY_LIMIT_MIN = IntegerSetting(default=1)
+    CONCURRENCY_LIMIT_LATENCY = FloatSetting(default=1.0, minimum=0.0)
+    CONCURRENCY_LIMIT_BACKOFF = FloatSetting(default=0.9, minimum=0.0, maximum=1.0)
+    CONCURRENCY_LIMIT_RETRY_AFTER = IntegerSetting(default=1)
+    # Rate limits of clients
+    RATE_LIMIT = FloatSetting(default=0.0, minimum=0.0)
+    RATE_LIMIT_BURST = IntegerSetting(default=10)
+    RATE_LIMIT_NETWORK = FloatSetting(default=0.0, minimum=0.0)
+    RATE_LIMIT_NETWORK_BURST = IntegerSetting(default=100)
+    RATE_LIMIT_IPV4_PREFIX = IntegerSetting(default=24, minimum=0, maximum=32)
+    RATE_LIMIT_IPV6_PREFIX = IntegerSetting(default=48, minimum=0, maximum=128)
+    RATE_LIMIT_CACHE = StringSetting(default='default')
+    RATE_LIMIT_PROXIES = IntegerSetting(default=0)
+    # Hedging of slow registry calls
+    HEDGING_MAX_HEDGES = IntegerSetting(default=0)
+    HEDGING_PERCENTILE = FloatSetting(default=0.95, minimum=0.0, maximum=1.0)
+    HEDGING_MIN_SAMPLES = IntegerSetting(default=100)
+    HEDGING_WORKERS = IntegerSetting(default=10)
+    # Batching of contact info calls
+    CONTACT_BATCH_WINDOW = FloatSetting(default=0.0, minimum=0.0)
+    CONTACT_BATCH_SIZE = IntegerSetting(default=50)
+    CONTACT_BATCH_WORKERS = IntegerSetting(default=10)
 
     class Meta:
         setting_prefix = 'RDAP_'
@@ -55,11 +172,88 @@ class RdapAppSettings(AppSettings):
 RDAP_SETTINGS = RdapAppSettings()
 
 
-CONTACT_CLIENT = SyncGrpcProxy(ContactClient(RDAP_SETTINGS.REGISTRY_NETLOC,
-                                             make_credentials(RDAP_SETTINGS.REGISTRY_SSL_CERT)))
-DOMAIN_CLIENT = SyncGrpcProxy(DomainClient(RDAP_SETTINGS.REGISTRY_NETLOC,
-                                           make_credentials(RDAP_SETTINGS.REGISTRY_SSL_CERT)))
-KEYSET_CLIENT = SyncGrpcProxy(KeysetClient(RDAP_SETTINGS.REGISTRY_NETLOC,
-                                           make_credentials(RDAP_SETTINGS.REGISTRY_SSL_CERT)))
-NSSET_CLIENT = SyncGrpcProxy(NssetClient(RDAP_SETTINGS.REGISTRY_NETLOC,
-                                         make_credentials(RDAP_SETTINGS.REGISTRY_SSL_CERT)))
+ID_CACHE = LruCache(RDAP_SETTINGS.ID_CACHE_SIZE)
+CONTACT_HANDLE_CACHE = LruCache(RDAP_SETTINGS.CONTACT_HANDLE_CACHE_SIZE)
+BACKEND_EXECUTOR = BackendExecutor(RDAP_SETTINGS.BACKEND_WORKERS)
+# Circuit breaker shared by all registry clients.
+CIRCUIT_BREAKER = CircuitBreaker(RDAP_SETTINGS.CIRCUIT_BREAKER_WINDOW, RDAP_SETTINGS.CIRCUIT_BREAKER_FAILURE_RATE,
+                                 RDAP_SETTINGS.CIRCUIT_BREAKER_SLOW_CALL, RDAP_SETTINGS.CIRCUIT_BREAKER_OPEN_TIMEOUT,
+                                 RDAP_SETTINGS.CIRCUIT_BREAKER_HALF_OPEN_CALLS)
+# Policy of hedged calls shared by all registry client pools.
+HEDGING_POLICY = HedgingPolicy(RDAP_SETTINGS.HEDGING_PERCENTILE, RDAP_SETTINGS.HEDGING_MIN_SAMPLES,
+                               max_workers=RDAP_SETTINGS.HEDGING_WORKERS)
+
+
+def _lazy(factory: Callable[[], T]) -> T:
+    """Return a proxy of an object constructed on its first use.
+
+    Registry clients are only constructed in processes which use them, e.g. not in management commands.
+    """
+    return cast(T, SimpleLazyObject(factory))
+
+
+@lru_cache(maxsize=None)
+def _get_credentials() -> Any:
+    """Return credentials shared by all registry clients."""
+    return make_credentials(RDAP_SETTINGS.REGISTRY_SSL_CERT)
+
+
+def _make_endpoint_pool(client_cls: Type, netloc: str, sync: bool = True,
+                        hedging: Optional[HedgingPolicy] = None) -> ClientPool:
+    """Return a pool of registry clients of a single endpoint."""
+    clients = []
+    for index in range(max(RDAP_SETTINGS.REGISTRY_CHANNEL_POOL_SIZE, 1)):
+        options = channel_options(index, RDAP_SETTINGS.REGISTRY_KEEPALIVE_TIME,
+                                  RDAP_SETTINGS.REGISTRY_KEEPALIVE_TIMEOUT)
+        client = client_cls(netloc, _get_credentials(), options=options)
+        clients.append(SyncGrpcProxy(client) if sync else client)
+    return ClientPool(clients, RDAP_SETTINGS.REGISTRY_MAX_CONCURRENT_STREAMS, hedging)
+
+
+def _make_client_pool(client_cls: Type, sync: bool = True) -> ClientPool:
+    """Return a pool of registry clients sharing the credentials and the channels.
+
+    Calls are balanced among the endpoints, if there are more of them.
+    """
+    hedging = HEDGING_POLICY if RDAP_SETTINGS.HEDGING_MAX_HEDGES > 0 else None
+    netlocs = RDAP_SETTINGS.REGISTRY_NETLOC
+    if len(netlocs) == 1:
+        return _make_endpoint_pool(client_cls, netlocs[0], sync, hedging)
+    pools = [_make_endpoint_pool(client_cls, netloc, sync) for netloc in netlocs]
+    return LoadBalancer(pools, RDAP_SETTINGS.REGISTRY_EJECTION_FAILURES, RDAP_SETTINGS.REGISTRY_EJECTION_TIME, hedging)
+
+
+def _guard(client: Any) -> DeadlineProxy:
+    """Guard registry calls by the request deadline and the circuit breaker.
+
+    Breaker is inside the deadline, so it records only the calls made to the registry.
+    """
+    return DeadlineProxy(CircuitBreakerProxy(client, CIRCUIT_BREAKER), RDAP_SETTINGS.REQUEST_DEADLINE_WORKERS)
+
+
+CONTACT_CLIENT_POOL = _lazy(partial(_make_client_pool, ContactClient))
+DOMAIN_CLIENT_POOL = _lazy(partial(_make_client_pool, DomainClient))
+KEYSET_CLIENT_POOL = _lazy(partial(_make_client_pool, KeysetClient))
+NSSET_CLIENT_POOL = _lazy(partial(_make_client_pool, NssetClient))
+
+CONTACT_CLIENT = _lazy(lambda: RequestMemoProxy(ContactHandleProxy(IdCacheProxy(_guard(BatchingProxy(
+    CONTACT_CLIENT_POOL, 'get_contact_info', RDAP_SETTINGS.CONTACT_BATCH_WINDOW, RDAP_SETTINGS.CONTACT_BATCH_SIZE,
+    RDAP_SETTINGS.CONTACT_BATCH_WORKERS)), ID_CACHE, RDAP_SETTINGS.ID_CACHE_TIMEOUT), CONTACT_HANDLE_CACHE,
+    RDAP_SETTINGS.CONTACT_HANDLE_CACHE_TIMEOUT)))
+DOMAIN_CLIENT = _lazy(lambda: RequestMemoProxy(IdCacheProxy(_guard(DOMAIN_CLIENT_POOL), ID_CACHE,
+                                                            RDAP_SETTINGS.ID_CACHE_TIMEOUT)))
+KEYSET_CLIENT = _lazy(lambda: RequestMemoProxy(IdCacheProxy(_guard(KEYSET_CLIENT_POOL), ID_CACHE,
+                                                            RDAP_SETTINGS.ID_CACHE_TIMEOUT)))
+NSSET_CLIENT = _lazy(lambda: RequestMemoProxy(IdCacheProxy(_guard(NSSET_CLIENT_POOL), ID_CACHE,
+                                                           RDAP_SETTINGS.ID_CACHE_TIMEOUT)))
+
+# Native asynchronous clients for async views.
+ASYNC_CONTACT_CLIENT = _lazy(lambda: RequestMemoProxy(AsyncContactHandleProxy(IdCacheProxy(
+    _guard(_make_client_pool(ContactClient, sync=False)), ID_CACHE, RDAP_SETTINGS.ID_CACHE_TIMEOUT),
+    CONTACT_HANDLE_CACHE, RDAP_SETTINGS.CONTACT_HANDLE_CACHE_TIMEOUT)))
+ASYNC_DOMAIN_CLIENT = _lazy(lambda: RequestMemoProxy(IdCacheProxy(
+    _guard(_make_client_pool(DomainClient, sync=False)), ID_CACHE, RDAP_SETTINGS.ID_CACHE_TIMEOUT)))
+ASYNC_KEYSET_CLIENT = _lazy(lambda: RequestMemoProxy(IdCacheProxy(
+    _guard(_make_client_pool(KeysetClient, sync=False)), ID_CACHE, RDAP_SETTINGS.ID_CACHE_TIMEOUT)))
+ASYNC_NSSET_CLIENT = _lazy(lambda: RequestMemoProxy(IdCacheProxy(
+    _guard(_make_client_pool(NssetClient, sync=False)), ID_CACHE, RDAP_SETTINGS.ID_CACHE_TIMEOUT)))
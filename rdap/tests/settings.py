@@ -16,7 +16,7 @@
 # You should have received a copy of the GNU General Public License
 # along with FRED.  If not, see <https://www.gnu.org/licenses/>.
 #
-INSTALLED_APPS = ('rdap.tests.apps.TestRdapAppConfig', )
+INSTALLED_APPS = ('rdap.apps.RdapAppConfig', )
 ROOT_URLCONF = 'rdap.urls'
 SECRET_KEY = 'SECRET'
 RDAP_REGISTRY_NETLOC = 'example.org:55555'
@@ -16,13 +16,15 @@
 # You should have received a copy of the GNU General Public License
 # along with FRED.  If not, see <https://www.gnu.org/licenses/>.
 #
-from unittest.mock import call, patch
+import sys
+from unittest.mock import Mock, call, patch
 
 from django.apps import apps
 from django.apps.registry import Apps
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, override_settings
 
-from rdap.constants import LOGGER_SERVICE, LogEntryType, LogResult
+from rdap.apps import WARM_UP_HANDLE, warm_up_registry, warm_up_worker
+from rdap.clients import ClientPool, LoadBalancer
 
 
 class RdapAppConfigTest(SimpleTestCase):
@@ -30,11 +32,101 @@ class RdapAppConfigTest(SimpleTestCase):
         apps.clear_cache()
 
     def test_ready(self):
-        with patch('rdap.views.LOGGER.client', autospec=True) as logger_mock:
+        with patch('rdap.apps.warm_up_registry', autospec=True) as warm_up_mock:
             Apps(('rdap.apps.RdapAppConfig', ))  # Trigger `ready`.
 
-            self.assertEqual(logger_mock.mock_calls, [
-                call.register_service(LOGGER_SERVICE, handle='rdap_'),
-                call.register_log_entry_types(LOGGER_SERVICE, LogEntryType),
-                call.register_results(LOGGER_SERVICE, LogResult),
-            ])
+        self.assertEqual(warm_up_mock.mock_calls, [])
+
+    @override_settings(RDAP_REGISTRY_WARM_UP=True)
+    def test_ready_warm_up(self):
+        # Processes outside uWSGI, e.g. management commands, don't warm up.
+        with patch.dict(sys.modules, {'uwsgi': None}):
+            with patch('rdap.apps.warm_up_registry', autospec=True) as warm_up_mock:
+                Apps(('rdap.apps.RdapAppConfig', ))  # Trigger `ready`.
+
+        self.assertEqual(warm_up_mock.mock_calls, [])
+
+    @override_settings(RDAP_REGISTRY_WARM_UP=True)
+    def test_ready_warm_up_uwsgi_master(self):
+        uwsgi = Mock(spec=('worker_id', ))
+        uwsgi.worker_id.return_value = 0
+        uwsgidecorators = Mock(spec=('postfork', ))
+        with patch.dict(sys.modules, {'uwsgi': uwsgi, 'uwsgidecorators': uwsgidecorators}):
+            with patch('rdap.apps.warm_up_registry', autospec=True) as warm_up_mock:
+                Apps(('rdap.apps.RdapAppConfig', ))  # Trigger `ready`.
+
+        # Channels are warmed up after fork.
+        self.assertEqual(warm_up_mock.mock_calls, [])
+        self.assertEqual(uwsgidecorators.postfork.mock_calls, [call(warm_up_mock)])
+
+    @override_settings(RDAP_REGISTRY_WARM_UP=True)
+    def test_ready_warm_up_uwsgi_worker(self):
+        # Application is loaded by the worker, e.g. with `lazy-apps`.
+        uwsgi = Mock(spec=('worker_id', ))
+        uwsgi.worker_id.return_value = 2
+        uwsgidecorators = Mock(spec=('postfork', ))
+        with patch.dict(sys.modules, {'uwsgi': uwsgi, 'uwsgidecorators': uwsgidecorators}):
+            with patch('rdap.apps.warm_up_registry', autospec=True) as warm_up_mock:
+                Apps(('rdap.apps.RdapAppConfig', ))  # Trigger `ready`.
+
+        self.assertEqual(warm_up_mock.mock_calls, [call()])
+        self.assertEqual(uwsgidecorators.postfork.mock_calls, [])
+
+
+class WarmUpWorkerTest(SimpleTestCase):
+    def test_warm_up(self):
+        with patch('rdap.apps.warm_up_registry', autospec=True) as warm_up_mock:
+            warm_up_worker()
+
+        self.assertEqual(warm_up_mock.mock_calls, [])
+
+    @override_settings(RDAP_REGISTRY_WARM_UP=True)
+    def test_warm_up_enabled(self):
+        with patch('rdap.apps.warm_up_registry', autospec=True) as warm_up_mock:
+            warm_up_worker()
+
+        self.assertEqual(warm_up_mock.mock_calls, [call()])
+
+
+class WarmUpRegistryTest(SimpleTestCase):
+    def test_warm_up(self):
+        contact_clients = [Mock(spec=('get_contact_id', )), Mock(spec=('get_contact_id', ))]
+        domain_client = Mock(spec=('get_domain_id', ))
+        keyset_client = Mock(spec=('get_keyset_id', ))
+        nsset_client = Mock(spec=('get_nsset_id', ))
+        with patch('rdap.apps.CONTACT_CLIENT_POOL', ClientPool(contact_clients)):
+            with patch('rdap.apps.DOMAIN_CLIENT_POOL', ClientPool([domain_client])):
+                with patch('rdap.apps.KEYSET_CLIENT_POOL', ClientPool([keyset_client])):
+                    with patch('rdap.apps.NSSET_CLIENT_POOL', ClientPool([nsset_client])):
+                        with patch('rdap.apps.warm_up', autospec=True, return_value=0.5) as warm_up_mock:
+                            with self.assertLogs(level='INFO') as logs:
+                                warm_up_registry()
+
+        calls = warm_up_mock.call_args[0][0]
+        self.assertEqual(len(calls), 5)
+        for warm_up_call in calls:
+            warm_up_call()
+        for client in contact_clients:
+            self.assertEqual(client.mock_calls, [call.get_contact_id(WARM_UP_HANDLE)])
+        self.assertEqual(domain_client.mock_calls, [call.get_domain_id(WARM_UP_HANDLE)])
+        self.assertEqual(keyset_client.mock_calls, [call.get_keyset_id(WARM_UP_HANDLE)])
+        self.assertEqual(nsset_client.mock_calls, [call.get_nsset_id(WARM_UP_HANDLE)])
+        self.assertEqual(logs.output, ['INFO:root:Registry channels warmed up in 0.500 seconds.'])
+
+    def test_warm_up_endpoints(self):
+        clients = [Mock(spec=('get_domain_id', )) for i in range(4)]
+        pool = LoadBalancer([ClientPool(clients[:2]), ClientPool(clients[2:])])
+        with patch('rdap.apps.CONTACT_CLIENT_POOL', ClientPool([Mock(spec=('get_contact_id', ))])):
+            with patch('rdap.apps.DOMAIN_CLIENT_POOL', pool):
+                with patch('rdap.apps.KEYSET_CLIENT_POOL', ClientPool([Mock(spec=('get_keyset_id', ))])):
+                    with patch('rdap.apps.NSSET_CLIENT_POOL', ClientPool([Mock(spec=('get_nsset_id', ))])):
+                        with patch('rdap.apps.warm_up', autospec=True, return_value=0.5) as warm_up_mock:
+                            with self.assertLogs(level='INFO'):
+                                warm_up_registry()
+
+        calls = warm_up_mock.call_args[0][0]
+        self.assertEqual(len(calls), 7)
+        for warm_up_call in calls:
+            warm_up_call()
+        for client in clients:
+            self.assertEqual(client.mock_calls, [call.get_domain_id(WARM_UP_HANDLE)])
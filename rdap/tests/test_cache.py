@@ -0,0 +1,402 @@
+#
+# Copyright (C) 2022  CZ.NIC, z. s. p. o.
+#
+# This file is part of FRED.
+#
+# FRED is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# FRED is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with FRED.  If not, see <https://www.gnu.org/licenses/>.
+#
+import asyncio
+from concurrent.futures import Future
+from threading import Event, Thread
+from unittest.mock import AsyncMock, Mock, patch, sentinel
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+
+from rdap.cache import AsyncSingleFlight, BackgroundRefresher, CacheEntry, LruCache, SingleFlight, shared_single_flight
+
+
+class LruCacheTest(SimpleTestCase):
+    def setUp(self):
+        patcher = patch('rdap.cache.monotonic', return_value=100)
+        self.addCleanup(patcher.stop)
+        self.monotonic_mock = patcher.start()
+
+    def test_get_empty(self):
+        cache = LruCache(2)
+        self.assertIsNone(cache.get('kryten'))
+        self.assertEqual(cache.get('kryten', sentinel.default), sentinel.default)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_set(self):
+        cache = LruCache(2)
+        cache.set('kryten', sentinel.kryten, 10)
+        self.assertEqual(cache.get('kryten'), sentinel.kryten)
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+        self.assertEqual(len(cache), 1)
+
+    def test_set_disabled(self):
+        cache = LruCache(0)
+        cache.set('kryten', sentinel.kryten, 10)
+        self.assertIsNone(cache.get('kryten'))
+        self.assertEqual(len(cache), 0)
+
+    def test_set_no_timeout(self):
+        cache = LruCache(2)
+        cache.set('kryten', sentinel.kryten, 0)
+        self.assertIsNone(cache.get('kryten'))
+        self.assertEqual(len(cache), 0)
+
+    def test_expired(self):
+        cache = LruCache(2)
+        cache.set('kryten', sentinel.kryten, 10)
+        self.monotonic_mock.return_value = 110
+        self.assertIsNone(cache.get('kryten'))
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        self.assertEqual(len(cache), 0)
+
+    def test_stale(self):
+        cache = LruCache(2)
+        cache.set('kryten', sentinel.kryten, 10, 20)
+        self.assertEqual(cache.get_entry('kryten'), CacheEntry(sentinel.kryten, False))
+        self.monotonic_mock.return_value = 115
+        self.assertIsNone(cache.get('kryten'))
+        self.assertEqual(cache.get_entry('kryten'), CacheEntry(sentinel.kryten, True))
+        self.monotonic_mock.return_value = 130
+        self.assertIsNone(cache.get_entry('kryten'))
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+        self.assertEqual(len(cache), 0)
+
+    def test_keep_expired(self):
+        cache = LruCache(2, keep_expired=True)
+        cache.set('kryten', sentinel.kryten, 10, 20)
+        self.monotonic_mock.return_value = 130
+        self.assertIsNone(cache.get_entry('kryten'))
+        self.assertEqual(cache.get_expired('kryten'), sentinel.kryten)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        self.assertEqual(len(cache), 1)
+
+    def test_get_expired(self):
+        cache = LruCache(2)
+        self.assertIsNone(cache.get_expired('kryten'))
+        cache.set('kryten', sentinel.kryten, 10)
+        self.assertEqual(cache.get_expired('kryten'), sentinel.kryten)
+        self.monotonic_mock.return_value = 110
+        self.assertIsNone(cache.get('kryten'))
+        self.assertIsNone(cache.get_expired('kryten'))
+
+    def test_evict(self):
+        cache = LruCache(2)
+        cache.set('kryten', sentinel.kryten, 10)
+        cache.set('rimmer', sentinel.rimmer, 10)
+        # Use kryten, so rimmer is the least recently used.
+        cache.get('kryten')
+        cache.set('lister', sentinel.lister, 10)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('kryten'), sentinel.kryten)
+        self.assertIsNone(cache.get('rimmer'))
+        self.assertEqual(cache.get('lister'), sentinel.lister)
+
+    def test_delete(self):
+        cache = LruCache(2)
+        cache.set('kryten', sentinel.kryten, 10)
+        cache.delete('kryten')
+        cache.delete('rimmer')
+        self.assertIsNone(cache.get('kryten'))
+
+    def test_clear(self):
+        cache = LruCache(2)
+        cache.set('kryten', sentinel.kryten, 10)
+        cache.get('kryten')
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+
+class BackgroundRefresherTest(SimpleTestCase):
+    def test_submit(self):
+        refresher = BackgroundRefresher(1)
+        done = Event()
+        func = Mock(side_effect=done.set)
+
+        self.assertTrue(refresher.submit('kryten', func))
+
+        self.assertTrue(done.wait(5))
+        refresher._executor.shutdown()
+        func.assert_called_once_with()
+        self.assertEqual(refresher._pending, set())
+
+    def test_submit_pending(self):
+        refresher = BackgroundRefresher(1)
+        release = Event()
+        func = Mock(side_effect=lambda: release.wait(5))
+
+        self.assertTrue(refresher.submit('kryten', func))
+        self.assertFalse(refresher.submit('kryten', func))
+
+        release.set()
+        refresher._executor.shutdown()
+        func.assert_called_once_with()
+
+    def test_submit_other(self):
+        refresher = BackgroundRefresher(1)
+        func = Mock()
+
+        self.assertTrue(refresher.submit('kryten', func))
+        executor = refresher._executor
+        self.assertTrue(refresher.submit('rimmer', func))
+
+        refresher._executor.shutdown()
+        self.assertIs(refresher._executor, executor)
+        self.assertEqual(func.call_count, 2)
+
+    def test_submit_error(self):
+        refresher = BackgroundRefresher(1)
+        func = Mock(side_effect=ValueError('Gazpacho!'))
+
+        with self.assertLogs('root', 'WARNING'):
+            refresher.submit('kryten', func)
+            refresher._executor.shutdown()
+
+        self.assertEqual(refresher._pending, set())
+
+
+class SingleFlightTest(SimpleTestCase):
+    def test_do(self):
+        single_flight = SingleFlight()
+        func = Mock(return_value=sentinel.result)
+
+        self.assertEqual(single_flight.do('kryten', func), sentinel.result)
+        self.assertEqual(single_flight.do('kryten', func), sentinel.result)
+
+        self.assertEqual(func.call_count, 2)
+        self.assertEqual(single_flight.coalesced, 0)
+        self.assertEqual(single_flight._calls, {})
+
+    def test_do_coalesced(self):
+        single_flight = SingleFlight()
+        started = Event()
+        release = Event()
+
+        def _func():
+            started.set()
+            release.wait(5)
+            return sentinel.result
+
+        waiting = Event()
+
+        class _Future(Future):
+            def result(self, timeout=None):
+                waiting.set()
+                return super().result(timeout)
+
+        func = Mock(side_effect=_func)
+        results = []
+        with patch('rdap.cache.Future', _Future):
+            leader = Thread(target=lambda: results.append(single_flight.do('kryten', func)))
+            leader.start()
+            self.assertTrue(started.wait(5))
+            follower = Thread(target=lambda: results.append(single_flight.do('kryten', func)))
+            follower.start()
+            # Wait until the follower is coalesced.
+            self.assertTrue(waiting.wait(5))
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        func.assert_called_once_with()
+        self.assertEqual(results, [sentinel.result, sentinel.result])
+        self.assertEqual(single_flight.coalesced, 1)
+
+    def test_do_error(self):
+        single_flight = SingleFlight()
+        func = Mock(side_effect=ValueError('Gazpacho!'))
+
+        with self.assertRaisesRegex(ValueError, 'Gazpacho!'):
+            single_flight.do('kryten', func)
+
+        self.assertEqual(single_flight._calls, {})
+
+
+class AsyncSingleFlightTest(SimpleTestCase):
+    async def test_do(self):
+        single_flight = AsyncSingleFlight()
+        func = AsyncMock(return_value=sentinel.result)
+
+        self.assertEqual(await single_flight.do('kryten', func), sentinel.result)
+        self.assertEqual(await single_flight.do('kryten', func), sentinel.result)
+
+        self.assertEqual(func.await_count, 2)
+        self.assertEqual(single_flight.coalesced, 0)
+        self.assertEqual(single_flight._calls, {})
+
+    async def test_do_coalesced(self):
+        single_flight = AsyncSingleFlight()
+        release = asyncio.Event()
+
+        async def _func():
+            await release.wait()
+            return sentinel.result
+
+        func = AsyncMock(side_effect=_func)
+        leader = asyncio.ensure_future(single_flight.do('kryten', func))
+        follower = asyncio.ensure_future(single_flight.do('kryten', func))
+        # Let both tasks start.
+        await asyncio.sleep(0)
+        release.set()
+
+        self.assertEqual(await asyncio.gather(leader, follower), [sentinel.result, sentinel.result])
+        func.assert_awaited_once_with()
+        self.assertEqual(single_flight.coalesced, 1)
+
+    async def test_do_leader_cancelled(self):
+        single_flight = AsyncSingleFlight()
+        release = asyncio.Event()
+        started = asyncio.Event()
+
+        async def _func():
+            started.set()
+            await release.wait()
+            return sentinel.result
+
+        func = AsyncMock(side_effect=_func)
+        leader = asyncio.ensure_future(single_flight.do('kryten', func))
+        followers = [asyncio.ensure_future(single_flight.do('kryten', func)) for i in range(2)]
+        # Let all tasks start.
+        await asyncio.sleep(0)
+        started.clear()
+        leader.cancel()
+        # Wait for a follower to take over the call.
+        await started.wait()
+        release.set()
+
+        self.assertEqual(await asyncio.gather(*followers), [sentinel.result, sentinel.result])
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+        self.assertEqual(func.await_count, 2)
+        self.assertEqual(single_flight.coalesced, 1)
+        self.assertEqual(single_flight._calls, {})
+
+    async def test_do_follower_cancelled(self):
+        single_flight = AsyncSingleFlight()
+        release = asyncio.Event()
+
+        async def _func():
+            await release.wait()
+            return sentinel.result
+
+        func = AsyncMock(side_effect=_func)
+        leader = asyncio.ensure_future(single_flight.do('kryten', func))
+        follower = asyncio.ensure_future(single_flight.do('kryten', func))
+        # Let both tasks start.
+        await asyncio.sleep(0)
+        follower.cancel()
+        release.set()
+
+        self.assertEqual(await leader, sentinel.result)
+        with self.assertRaises(asyncio.CancelledError):
+            await follower
+        func.assert_awaited_once_with()
+        self.assertEqual(single_flight.coalesced, 0)
+
+    async def test_do_error(self):
+        single_flight = AsyncSingleFlight()
+        func = AsyncMock(side_effect=ValueError('Gazpacho!'))
+
+        with self.assertRaisesRegex(ValueError, 'Gazpacho!'):
+            await single_flight.do('kryten', func)
+
+        self.assertEqual(single_flight._calls, {})
+
+
+class SharedSingleFlightTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = LocMemCache('rdap-test', {})
+        self.addCleanup(self.cache.clear)
+
+    def test_locked(self):
+        func = Mock(return_value=sentinel.result)
+
+        self.assertEqual(shared_single_flight(self.cache, 'kryten', 10, func), sentinel.result)
+
+        func.assert_called_once_with()
+        self.assertIsNone(self.cache.get('kryten:lock'))
+
+    def test_unlock_error(self):
+        func = Mock(return_value=sentinel.result)
+
+        with patch.object(self.cache, 'delete', side_effect=ConnectionError('Smoke me a kipper')):
+            with self.assertLogs('root', 'WARNING') as logs:
+                self.assertEqual(shared_single_flight(self.cache, 'kryten', 10, func), sentinel.result)
+
+        func.assert_called_once_with()
+        self.assertEqual(logs.output, ['WARNING:root:Shared cache unlock failed: Smoke me a kipper'])
+
+    def test_wait(self):
+        self.cache.set('kryten:lock', True)
+        func = Mock(return_value=sentinel.result)
+
+        def _get(key, default=None):
+            # Simulate the other process storing the result.
+            self.cache.set('kryten', 'Smeg')
+            return LocMemCache.get(self.cache, key, default)
+
+        with patch.object(self.cache, 'get', side_effect=_get):
+            self.assertEqual(shared_single_flight(self.cache, 'kryten', 10, func, poll_interval=0), 'Smeg')
+
+        func.assert_not_called()
+
+    def test_wait_unlocked(self):
+        self.cache.set('kryten:lock', True)
+        func = Mock(return_value=sentinel.result)
+
+        def _get(key, default=None):
+            # Simulate the other process failing.
+            self.cache.delete('kryten:lock')
+            return LocMemCache.get(self.cache, key, default)
+
+        with patch.object(self.cache, 'get', side_effect=_get):
+            self.assertEqual(shared_single_flight(self.cache, 'kryten', 10, func, poll_interval=0), sentinel.result)
+
+        func.assert_called_once_with()
+
+    def test_wait_error(self):
+        self.cache.set('kryten:lock', True)
+        func = Mock(return_value=sentinel.result)
+
+        with patch.object(self.cache, 'get', side_effect=ConnectionError('Smoke me a kipper')):
+            with self.assertLogs('root', 'WARNING') as logs:
+                self.assertEqual(shared_single_flight(self.cache, 'kryten', 10, func, poll_interval=0),
+                                 sentinel.result)
+
+        func.assert_called_once_with()
+        self.assertEqual(logs.output, ['WARNING:root:Shared cache get failed: Smoke me a kipper'])
+
+    def test_wait_timeout(self):
+        self.cache.set('kryten:lock', True)
+        func = Mock(return_value=sentinel.result)
+
+        with patch('rdap.cache.monotonic', side_effect=[100, 100, 111]):
+            self.assertEqual(shared_single_flight(self.cache, 'kryten', 10, func, poll_interval=0), sentinel.result)
+
+        func.assert_called_once_with()
+
+    def test_lock_error(self):
+        func = Mock(return_value=sentinel.result)
+
+        with patch.object(self.cache, 'add', side_effect=ConnectionError('Smoke me a kipper')):
+            with self.assertLogs('root', 'WARNING'):
+                self.assertEqual(shared_single_flight(self.cache, 'kryten', 10, func), sentinel.result)
+
+        func.assert_called_once_with()
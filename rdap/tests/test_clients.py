@@ -0,0 +1,1231 @@
+#
+# Copyright (C) 2022  CZ.NIC, z. s. p. o.
+#
+# This file is part of FRED.
+#
+# FRED is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# FRED is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with FRED.  If not, see <https://www.gnu.org/licenses/>.
+#
+import asyncio
+from threading import Event, Thread
+from unittest.mock import AsyncMock, Mock, call, patch, sentinel
+
+from django.test import SimpleTestCase
+from regal import Contact
+from regal.exceptions import ContactDoesNotExist, DomainDoesNotExist
+
+from rdap.cache import LruCache
+from rdap.clients import (AsyncContactHandleProxy, BackendExecutor, BatchingProxy, CircuitBreaker, CircuitBreakerProxy,
+                          CircuitOpen, ClientPool, ContactHandleProxy, DeadlineExceeded, DeadlineProxy, HedgingPolicy,
+                          IdCacheProxy, LoadBalancer, RequestMemoProxy, channel_options, gather_unique, hedge_budget,
+                          remaining_time, request_deadline, request_memo, resolved, warm_up)
+
+
+class IdCacheProxyTest(SimpleTestCase):
+    def setUp(self):
+        self.client = Mock(spec=('get_contact_id', 'get_contact_info', 'netloc'))
+        self.client.get_contact_id.return_value = '2X4B'
+        self.client.get_contact_info.return_value = sentinel.contact
+        self.client.netloc = sentinel.netloc
+        self.cache = LruCache(10)
+        self.proxy = IdCacheProxy(self.client, self.cache, 60)
+
+    def test_attribute(self):
+        self.assertEqual(self.proxy.netloc, sentinel.netloc)
+
+    def test_get_id(self):
+        self.assertEqual(self.proxy.get_contact_id('KRYTEN'), '2X4B')
+        self.assertEqual(self.proxy.get_contact_id('kryten'), '2X4B')
+        self.assertEqual(self.client.mock_calls, [call.get_contact_id('KRYTEN')])
+
+    def test_get_id_disabled(self):
+        proxy = IdCacheProxy(self.client, LruCache(0), 60)
+        self.assertEqual(proxy.get_contact_id('KRYTEN'), '2X4B')
+        self.assertEqual(proxy.get_contact_id('KRYTEN'), '2X4B')
+        self.assertEqual(self.client.mock_calls, [call.get_contact_id('KRYTEN'), call.get_contact_id('KRYTEN')])
+
+    def test_get_id_not_found(self):
+        self.client.get_contact_id.side_effect = ContactDoesNotExist
+        with self.assertRaises(ContactDoesNotExist):
+            self.proxy.get_contact_id('KRYTEN')
+        self.assertEqual(len(self.cache), 0)
+
+    def test_other(self):
+        self.assertEqual(self.proxy.get_contact_info('2X4B'), sentinel.contact)
+        self.assertEqual(self.client.mock_calls, [call.get_contact_info('2X4B')])
+
+    def test_other_not_found(self):
+        self.proxy.get_contact_id('KRYTEN')
+        self.client.get_contact_info.side_effect = ContactDoesNotExist
+
+        with self.assertRaises(ContactDoesNotExist):
+            self.proxy.get_contact_info('2X4B')
+
+        # Identifier is resolved again and the same identifier is cached.
+        self.assertEqual(self.proxy.get_contact_id('KRYTEN'), '2X4B')
+        self.assertEqual(self.client.mock_calls, [call.get_contact_id('KRYTEN'), call.get_contact_info('2X4B'),
+                                                  call.get_contact_id('KRYTEN')])
+
+    def test_other_stale_id(self):
+        self.proxy.get_contact_id('KRYTEN')
+        # Contact was deleted and registered again.
+        self.client.get_contact_id.return_value = '3X4B'
+        self.client.get_contact_info.side_effect = [ContactDoesNotExist, sentinel.contact]
+
+        self.assertEqual(self.proxy.get_contact_info('2X4B'), sentinel.contact)
+
+        self.assertEqual(self.client.mock_calls, [call.get_contact_id('KRYTEN'), call.get_contact_info('2X4B'),
+                                                  call.get_contact_id('KRYTEN'), call.get_contact_info('3X4B')])
+        self.assertEqual(self.proxy.get_contact_id('kryten'), '3X4B')
+
+    def test_other_stale_id_deleted(self):
+        self.proxy.get_contact_id('KRYTEN')
+        self.client.get_contact_id.side_effect = ContactDoesNotExist
+        self.client.get_contact_info.side_effect = ContactDoesNotExist
+
+        with self.assertRaises(ContactDoesNotExist):
+            self.proxy.get_contact_info('2X4B')
+
+        self.assertEqual(len(self.cache), 0)
+
+    def test_other_not_found_not_cached(self):
+        self.client.get_contact_info.side_effect = ContactDoesNotExist
+        with self.assertRaises(ContactDoesNotExist):
+            self.proxy.get_contact_info('2X4B')
+        with self.assertRaises(ContactDoesNotExist):
+            self.proxy.get_contact_info()
+
+
+class ContactHandleProxyTest(SimpleTestCase):
+    def setUp(self):
+        self.client = Mock(spec=('get_contact_info', 'get_contact_state'))
+        self.client.get_contact_info.return_value = Contact(contact_id='2X4B', contact_handle='KRYTEN')
+        self.client.get_contact_state.return_value = sentinel.state
+        self.cache = LruCache(10)
+        self.proxy = ContactHandleProxy(self.client, self.cache, 60)
+
+    def test_attribute(self):
+        self.assertEqual(self.proxy.get_contact_state('2X4B'), sentinel.state)
+        self.assertEqual(self.client.mock_calls, [call.get_contact_state('2X4B')])
+
+    def test_get_contact_handle(self):
+        self.assertEqual(self.proxy.get_contact_handle('2X4B'), 'KRYTEN')
+        self.assertEqual(self.proxy.get_contact_handle('2X4B'), 'KRYTEN')
+        self.assertEqual(self.client.mock_calls, [call.get_contact_info('2X4B')])
+
+    def test_get_contact_handle_disabled(self):
+        proxy = ContactHandleProxy(self.client, LruCache(0), 60)
+        self.assertEqual(proxy.get_contact_handle('2X4B'), 'KRYTEN')
+        self.assertEqual(proxy.get_contact_handle('2X4B'), 'KRYTEN')
+        self.assertEqual(self.client.mock_calls, [call.get_contact_info('2X4B'), call.get_contact_info('2X4B')])
+
+    def test_get_contact_handle_not_found(self):
+        self.client.get_contact_info.side_effect = ContactDoesNotExist
+        with self.assertRaises(ContactDoesNotExist):
+            self.proxy.get_contact_handle('2X4B')
+        self.assertEqual(len(self.cache), 0)
+
+
+class AsyncIdCacheProxyTest(SimpleTestCase):
+    def setUp(self):
+        self.client = Mock(get_contact_id=AsyncMock(return_value='2X4B'),
+                           get_contact_info=AsyncMock(return_value=sentinel.contact))
+        self.cache = LruCache(10)
+        self.proxy = IdCacheProxy(self.client, self.cache, 60)
+
+    async def test_get_id(self):
+        self.assertEqual(await self.proxy.get_contact_id('KRYTEN'), '2X4B')
+        self.assertEqual(await self.proxy.get_contact_id('kryten'), '2X4B')
+        self.client.get_contact_id.assert_awaited_once_with('KRYTEN')
+
+    async def test_other(self):
+        self.assertEqual(await self.proxy.get_contact_info('2X4B'), sentinel.contact)
+        self.client.get_contact_info.assert_awaited_once_with('2X4B')
+
+    async def test_other_not_found(self):
+        self.client.get_contact_info.side_effect = ContactDoesNotExist
+        await self.proxy.get_contact_id('KRYTEN')
+        with self.assertRaises(ContactDoesNotExist):
+            await self.proxy.get_contact_info('2X4B')
+        self.assertEqual(self.client.get_contact_id.await_count, 2)
+
+    async def test_other_not_found_not_cached(self):
+        self.client.get_contact_info.side_effect = ContactDoesNotExist
+        with self.assertRaises(ContactDoesNotExist):
+            await self.proxy.get_contact_info('2X4B')
+        self.client.get_contact_id.assert_not_awaited()
+
+    async def test_other_stale_id(self):
+        await self.proxy.get_contact_id('KRYTEN')
+        self.client.get_contact_id.return_value = '3X4B'
+        self.client.get_contact_info.side_effect = [ContactDoesNotExist, sentinel.contact]
+
+        self.assertEqual(await self.proxy.get_contact_info('2X4B'), sentinel.contact)
+
+        self.assertEqual(self.client.get_contact_info.await_args_list, [call('2X4B'), call('3X4B')])
+        self.assertEqual(self.cache.get(('get_contact_id', 'kryten')), '3X4B')
+
+
+class AsyncContactHandleProxyTest(SimpleTestCase):
+    def setUp(self):
+        self.client = Mock(get_contact_info=AsyncMock(return_value=Contact(contact_id='2X4B', contact_handle='KRYTEN')))
+        self.proxy = AsyncContactHandleProxy(self.client, LruCache(10), 60)
+
+    async def test_get_contact_handle(self):
+        self.assertEqual(await self.proxy.get_contact_handle('2X4B'), 'KRYTEN')
+        self.assertEqual(await self.proxy.get_contact_handle('2X4B'), 'KRYTEN')
+        self.client.get_contact_info.assert_awaited_once_with('2X4B')
+
+
+class ResolvedTest(SimpleTestCase):
+    def test_result(self):
+        self.assertEqual(resolved(sentinel.result)(), sentinel.result)
+
+    def test_exception(self):
+        with self.assertRaises(ContactDoesNotExist):
+            resolved(ContactDoesNotExist())()
+
+
+class RequestMemoProxyTest(SimpleTestCase):
+    def setUp(self):
+        self.client = Mock(spec=('get_contact_info', 'get_contact_state', 'netloc'))
+        self.client.get_contact_info.return_value = sentinel.contact
+        self.client.netloc = sentinel.netloc
+        self.proxy = RequestMemoProxy(self.client)
+
+    def test_attribute(self):
+        self.assertEqual(self.proxy.netloc, sentinel.netloc)
+
+    def test_no_memo(self):
+        self.assertEqual(self.proxy.get_contact_info('2X4B'), sentinel.contact)
+        self.assertEqual(self.proxy.get_contact_info('2X4B'), sentinel.contact)
+        self.assertEqual(self.client.mock_calls, [call.get_contact_info('2X4B'), call.get_contact_info('2X4B')])
+        self.assertEqual(self.proxy.saved, 0)
+
+    def test_memo(self):
+        with request_memo() as memo:
+            self.assertEqual(self.proxy.get_contact_info('2X4B'), sentinel.contact)
+            self.assertEqual(self.proxy.get_contact_info('2X4B'), sentinel.contact)
+            self.proxy.get_contact_info('2X4C')
+            self.proxy.get_contact_state('2X4B')
+
+        self.assertEqual(self.client.mock_calls, [call.get_contact_info('2X4B'), call.get_contact_info('2X4C'),
+                                                  call.get_contact_state('2X4B')])
+        self.assertEqual(memo.saved, 1)
+        self.assertEqual(self.proxy.saved, 1)
+
+    def test_memo_scope(self):
+        with request_memo():
+            self.proxy.get_contact_info('2X4B')
+        with request_memo():
+            self.proxy.get_contact_info('2X4B')
+
+        self.assertEqual(self.client.mock_calls, [call.get_contact_info('2X4B'), call.get_contact_info('2X4B')])
+
+    def test_memo_error(self):
+        self.client.get_contact_info.side_effect = ContactDoesNotExist
+        with request_memo() as memo:
+            with self.assertRaises(ContactDoesNotExist):
+                self.proxy.get_contact_info('2X4B')
+            with self.assertRaises(ContactDoesNotExist):
+                self.proxy.get_contact_info('2X4B')
+
+        self.client.get_contact_info.assert_called_once_with('2X4B')
+        self.assertEqual(memo.saved, 1)
+
+    def test_memo_unhashable(self):
+        with request_memo() as memo:
+            self.proxy.get_contact_info(['2X4B'])
+            self.proxy.get_contact_info(['2X4B'])
+
+        self.assertEqual(self.client.get_contact_info.call_count, 2)
+        self.assertEqual(memo.saved, 0)
+
+    def test_memo_executor(self):
+        executor = BackendExecutor(2)
+        with request_memo() as memo:
+            self.proxy.get_contact_info('2X4B')
+            self.assertEqual(executor.submit(self.proxy.get_contact_info, '2X4B')(), sentinel.contact)
+        executor._executor.shutdown()
+
+        self.client.get_contact_info.assert_called_once_with('2X4B')
+        self.assertEqual(memo.saved, 1)
+
+    async def test_memo_async(self):
+        client = Mock(get_contact_info=AsyncMock(return_value=sentinel.contact))
+        proxy = RequestMemoProxy(client)
+        with request_memo() as memo:
+            self.assertEqual(await proxy.get_contact_info('2X4B'), sentinel.contact)
+            self.assertEqual(await proxy.get_contact_info('2X4B'), sentinel.contact)
+
+        client.get_contact_info.assert_awaited_once_with('2X4B')
+        self.assertEqual(memo.saved, 1)
+
+    async def test_no_memo_async(self):
+        client = Mock(get_contact_info=AsyncMock(return_value=sentinel.contact))
+        proxy = RequestMemoProxy(client)
+
+        self.assertEqual(await proxy.get_contact_info('2X4B'), sentinel.contact)
+        self.assertEqual(await proxy.get_contact_info('2X4B'), sentinel.contact)
+
+        self.assertEqual(client.get_contact_info.await_count, 2)
+        self.assertEqual(proxy.saved, 0)
+
+    async def test_memo_async_error(self):
+        client = Mock(get_contact_info=AsyncMock(side_effect=ContactDoesNotExist))
+        proxy = RequestMemoProxy(client)
+        with request_memo() as memo:
+            with self.assertRaises(ContactDoesNotExist):
+                await proxy.get_contact_info('2X4B')
+            with self.assertRaises(ContactDoesNotExist):
+                await proxy.get_contact_info('2X4B')
+
+        client.get_contact_info.assert_awaited_once_with('2X4B')
+        self.assertEqual(memo.saved, 1)
+
+    async def test_memo_async_cancelled(self):
+        release = asyncio.Event()
+        started = asyncio.Event()
+
+        async def _get_contact_info(contact_id):
+            started.set()
+            await release.wait()
+            return sentinel.contact
+
+        client = Mock(get_contact_info=AsyncMock(side_effect=_get_contact_info))
+        proxy = RequestMemoProxy(client)
+        with request_memo() as memo:
+            leader = asyncio.ensure_future(proxy.get_contact_info('2X4B'))
+            followers = [asyncio.ensure_future(proxy.get_contact_info('2X4B')) for i in range(2)]
+            # Let all tasks start.
+            await asyncio.sleep(0)
+            started.clear()
+            leader.cancel()
+            # Wait for a follower to take over the call.
+            await started.wait()
+            release.set()
+
+            self.assertEqual(await asyncio.gather(*followers), [sentinel.contact, sentinel.contact])
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+
+        self.assertEqual(client.get_contact_info.mock_calls, [call('2X4B'), call('2X4B')])
+        self.assertEqual(memo.saved, 1)
+        self.assertEqual(proxy.saved, 1)
+
+    async def test_memo_async_follower_cancelled(self):
+        release = asyncio.Event()
+
+        async def _get_contact_info(contact_id):
+            await release.wait()
+            return sentinel.contact
+
+        client = Mock(get_contact_info=AsyncMock(side_effect=_get_contact_info))
+        proxy = RequestMemoProxy(client)
+        with request_memo() as memo:
+            leader = asyncio.ensure_future(proxy.get_contact_info('2X4B'))
+            follower = asyncio.ensure_future(proxy.get_contact_info('2X4B'))
+            # Let both tasks start.
+            await asyncio.sleep(0)
+            follower.cancel()
+            release.set()
+
+            self.assertEqual(await leader, sentinel.contact)
+            with self.assertRaises(asyncio.CancelledError):
+                await follower
+
+        client.get_contact_info.assert_awaited_once_with('2X4B')
+        self.assertEqual(memo.saved, 0)
+
+
+class RequestDeadlineTest(SimpleTestCase):
+    def test_no_deadline(self):
+        self.assertIsNone(remaining_time())
+        with request_deadline(None):
+            self.assertIsNone(remaining_time())
+
+    def test_deadline(self):
+        with request_deadline(10):
+            self.assertGreater(remaining_time(), 9)
+            self.assertLessEqual(remaining_time(), 10)
+        self.assertIsNone(remaining_time())
+
+    def test_exceeded(self):
+        with request_deadline(0):
+            with self.assertRaises(DeadlineExceeded):
+                remaining_time()
+
+
+class DeadlineProxyTest(SimpleTestCase):
+    def setUp(self):
+        self.client = Mock(spec=('get_contact_info', 'netloc'), netloc=sentinel.netloc)
+        self.client.get_contact_info.return_value = sentinel.contact
+        self.proxy = DeadlineProxy(self.client, 2)
+
+    def test_attribute(self):
+        self.assertEqual(self.proxy.netloc, sentinel.netloc)
+
+    def test_no_deadline(self):
+        self.assertEqual(self.proxy.get_contact_info('2X4B'), sentinel.contact)
+
+        self.client.get_contact_info.assert_called_once_with('2X4B')
+        self.assertIsNone(self.proxy._executor)
+
+    def test_deadline(self):
+        with request_deadline(10):
+            self.assertEqual(self.proxy.get_contact_info('2X4B'), sentinel.contact)
+
+        self.client.get_contact_info.assert_called_once_with('2X4B')
+
+    def test_deadline_executor(self):
+        with request_deadline(10):
+            self.proxy.get_contact_info('2X4B')
+            executor = self.proxy._executor
+            self.proxy.get_contact_info('2X4B')
+
+        self.assertIs(self.proxy._executor, executor)
+        self.assertEqual(self.client.get_contact_info.call_count, 2)
+
+    def test_deadline_context(self):
+        # Test the deadline is available to the call.
+        self.client.get_contact_info.side_effect = lambda contact_id: remaining_time()
+        with request_deadline(10):
+            self.assertGreater(self.proxy.get_contact_info('2X4B'), 9)
+
+    def test_deadline_error(self):
+        self.client.get_contact_info.side_effect = ContactDoesNotExist
+        with request_deadline(10):
+            with self.assertRaises(ContactDoesNotExist):
+                self.proxy.get_contact_info('2X4B')
+
+    def test_deadline_exceeded(self):
+        with request_deadline(0):
+            with self.assertRaises(DeadlineExceeded):
+                self.proxy.get_contact_info('2X4B')
+
+        self.assertEqual(self.client.get_contact_info.mock_calls, [])
+
+    def test_slow_call(self):
+        release = Event()
+        self.client.get_contact_info.side_effect = lambda contact_id: release.wait(5)
+        try:
+            with request_deadline(0.01):
+                with self.assertRaises(DeadlineExceeded):
+                    self.proxy.get_contact_info('2X4B')
+        finally:
+            release.set()
+
+    async def test_async(self):
+        client = Mock(get_contact_info=AsyncMock(return_value=sentinel.contact))
+        proxy = DeadlineProxy(client, 2)
+
+        with request_deadline(10):
+            self.assertEqual(await proxy.get_contact_info('2X4B'), sentinel.contact)
+        self.assertEqual(await proxy.get_contact_info('2X4B'), sentinel.contact)
+
+    async def test_async_slow_call(self):
+        async def _get_contact_info(contact_id):
+            await asyncio.sleep(5)
+
+        client = Mock(get_contact_info=AsyncMock(side_effect=_get_contact_info))
+        proxy = DeadlineProxy(client, 2)
+
+        with request_deadline(0.01):
+            with self.assertRaises(DeadlineExceeded):
+                await proxy.get_contact_info('2X4B')
+
+
+@patch('rdap.clients.monotonic', return_value=100)
+class CircuitBreakerTest(SimpleTestCase):
+    def test_disabled(self, monotonic_mock):
+        breaker = CircuitBreaker(0, 0.5)
+        breaker.record(False, 1)
+
+        self.assertFalse(breaker.before_call())
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_closed(self, monotonic_mock):
+        breaker = CircuitBreaker(4, 0.5)
+        for success in (True, False, True, True, True, False):
+            self.assertFalse(breaker.before_call())
+            breaker.record(success, 1)
+
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_open(self, monotonic_mock):
+        breaker = CircuitBreaker(4, 0.5, open_timeout=30)
+        for success in (True, False, True, False):
+            breaker.record(success, 1)
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        monotonic_mock.return_value = 110
+        with self.assertRaises(CircuitOpen) as catcher:
+            breaker.before_call()
+        self.assertEqual(catcher.exception.retry_after, 20)
+
+    def test_slow_call(self, monotonic_mock):
+        breaker = CircuitBreaker(2, 1, slow_call=5)
+        breaker.record(True, 6)
+        breaker.record(True, 6)
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_half_open(self, monotonic_mock):
+        breaker = CircuitBreaker(1, 1, open_timeout=30, half_open_calls=2)
+        breaker.record(False, 1)
+        monotonic_mock.return_value = 130
+
+        self.assertTrue(breaker.before_call())
+        self.assertTrue(breaker.before_call())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        # Only the probes are allowed.
+        with self.assertRaises(CircuitOpen):
+            breaker.before_call()
+
+        breaker.record(True, 1, probe=True)
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        breaker.record(True, 1, probe=True)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertFalse(breaker.before_call())
+
+    def test_half_open_failure(self, monotonic_mock):
+        breaker = CircuitBreaker(1, 1, open_timeout=30)
+        breaker.record(False, 1)
+        monotonic_mock.return_value = 130
+
+        self.assertTrue(breaker.before_call())
+        breaker.record(False, 1, probe=True)
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpen) as catcher:
+            breaker.before_call()
+        self.assertEqual(catcher.exception.retry_after, 30)
+
+    def test_probe_closed(self, monotonic_mock):
+        breaker = CircuitBreaker(1, 1, open_timeout=30)
+        breaker.record(False, 1)
+        monotonic_mock.return_value = 130
+        self.assertTrue(breaker.before_call())
+        breaker.record(True, 1, probe=True)
+
+        # Results of late probes are ignored.
+        breaker.record(False, 1, probe=True)
+
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_open_record(self, monotonic_mock):
+        breaker = CircuitBreaker(1, 1, open_timeout=30)
+        breaker.record(False, 1)
+
+        # Results of calls started before the breaker opened are ignored.
+        breaker.record(True, 1)
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(list(breaker._results), [])
+
+
+class CircuitBreakerProxyTest(SimpleTestCase):
+    def setUp(self):
+        self.client = Mock(spec=('get_contact_info', 'netloc'), netloc=sentinel.netloc)
+        self.client.get_contact_info.return_value = sentinel.contact
+        self.breaker = CircuitBreaker(1, 1)
+        self.proxy = CircuitBreakerProxy(self.client, self.breaker)
+
+    def test_attribute(self):
+        self.assertEqual(self.proxy.netloc, sentinel.netloc)
+
+    def test_call(self):
+        self.assertEqual(self.proxy.get_contact_info('2X4B'), sentinel.contact)
+
+        self.client.get_contact_info.assert_called_once_with('2X4B')
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_not_found(self):
+        self.client.get_contact_info.side_effect = ContactDoesNotExist
+
+        with self.assertRaises(ContactDoesNotExist):
+            self.proxy.get_contact_info('2X4B')
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_error(self):
+        self.client.get_contact_info.side_effect = RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            self.proxy.get_contact_info('2X4B')
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpen):
+            self.proxy.get_contact_info('2X4B')
+        self.assertEqual(self.client.get_contact_info.call_count, 1)
+
+    async def test_async(self):
+        client = Mock(get_contact_info=AsyncMock(return_value=sentinel.contact))
+        proxy = CircuitBreakerProxy(client, self.breaker)
+
+        self.assertEqual(await proxy.get_contact_info('2X4B'), sentinel.contact)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    async def test_async_not_found(self):
+        client = Mock(get_contact_info=AsyncMock(side_effect=ContactDoesNotExist))
+        proxy = CircuitBreakerProxy(client, self.breaker)
+
+        with self.assertRaises(ContactDoesNotExist):
+            await proxy.get_contact_info('2X4B')
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    async def test_async_error(self):
+        client = Mock(get_contact_info=AsyncMock(side_effect=RuntimeError))
+        proxy = CircuitBreakerProxy(client, self.breaker)
+
+        with self.assertRaises(RuntimeError):
+            await proxy.get_contact_info('2X4B')
+        with self.assertRaises(CircuitOpen):
+            await proxy.get_contact_info('2X4B')
+        self.assertEqual(client.get_contact_info.call_count, 1)
+
+
+class BatchingProxyTest(SimpleTestCase):
+    def setUp(self):
+        self.client = Mock(spec=('get_contact_info', 'get_contact_state'))
+        self.client.get_contact_info.side_effect = lambda contact_id: Contact(contact_id=contact_id)
+        self.client.get_contact_state.return_value = sentinel.state
+
+    def test_disabled(self):
+        proxy = BatchingProxy(self.client, 'get_contact_info', 0, 10, 2)
+
+        self.assertEqual(proxy.get_contact_info('2X4B'), Contact(contact_id='2X4B'))
+
+        self.assertIsNone(proxy._dispatcher)
+        self.assertEqual(proxy.batches, 0)
+
+    def test_other(self):
+        proxy = BatchingProxy(self.client, 'get_contact_info', 0.01, 10, 2)
+
+        self.assertEqual(proxy.get_contact_state('2X4B'), sentinel.state)
+
+        self.assertIsNone(proxy._dispatcher)
+
+    def test_call(self):
+        proxy = BatchingProxy(self.client, 'get_contact_info', 0.01, 10, 2)
+
+        self.assertEqual(proxy.get_contact_info('2X4B'), Contact(contact_id='2X4B'))
+
+        self.client.get_contact_info.assert_called_once_with('2X4B')
+        self.assertEqual(proxy.batches, 1)
+
+    def test_batch(self):
+        proxy = BatchingProxy(self.client, 'get_contact_info', 10, 2, 2)
+
+        # Submit identical calls, as if made by concurrent requests.
+        futures = [proxy._submit((('2X4B', ), ())), proxy._submit((('2X4B', ), ()))]
+        # Fill the batch, so it's dispatched before the window elapses.
+        self.assertEqual(proxy.get_contact_info('2X4C'), Contact(contact_id='2X4C'))
+
+        self.assertEqual([f.result(5) for f in futures], [Contact(contact_id='2X4B'), Contact(contact_id='2X4B')])
+        self.assertEqual(self.client.get_contact_info.call_count, 2)
+        self.assertEqual(proxy.batches, 1)
+        self.assertEqual(proxy.saved, 1)
+
+    def test_call_kwargs(self):
+        proxy = BatchingProxy(self.client, 'get_contact_info', 0.01, 10, 2)
+
+        self.assertEqual(proxy.get_contact_info(contact_id='2X4B'), Contact(contact_id='2X4B'))
+
+        self.client.get_contact_info.assert_called_once_with(contact_id='2X4B')
+
+    def test_batch_kwargs(self):
+        self.client.get_contact_info.side_effect = lambda contact_id, **kwargs: Contact(contact_id=contact_id)
+        proxy = BatchingProxy(self.client, 'get_contact_info', 10, 2, 2)
+        started = Event()
+        results = []
+
+        def _call():
+            started.set()
+            results.append(proxy.get_contact_info('2X4B', history=True))
+
+        thread = Thread(target=_call)
+        thread.start()
+        self.assertTrue(started.wait(5))
+        # Calls with different keyword arguments are not joined, they fill the batch.
+        self.assertEqual(proxy.get_contact_info('2X4B', history=False), Contact(contact_id='2X4B'))
+        thread.join(5)
+
+        self.assertEqual(results, [Contact(contact_id='2X4B')])
+        self.assertEqual(sorted(self.client.get_contact_info.mock_calls, key=repr),
+                         [call('2X4B', history=False), call('2X4B', history=True)])
+        self.assertEqual(proxy.batches, 1)
+        self.assertEqual(proxy.saved, 0)
+
+    def test_error(self):
+        self.client.get_contact_info.side_effect = ContactDoesNotExist
+        proxy = BatchingProxy(self.client, 'get_contact_info', 0.01, 10, 2)
+
+        with self.assertRaises(ContactDoesNotExist):
+            proxy.get_contact_info('2X4B')
+
+
+class ChannelOptionsTest(SimpleTestCase):
+    def test_default(self):
+        self.assertEqual(channel_options(2), [('rdap.channel_index', 2)])
+
+    def test_keepalive(self):
+        self.assertEqual(channel_options(0, 30, 10), [('rdap.channel_index', 0), ('grpc.keepalive_time_ms', 30000),
+                                                      ('grpc.keepalive_permit_without_calls', 1),
+                                                      ('grpc.keepalive_timeout_ms', 10000)])
+
+
+class ClientPoolTest(SimpleTestCase):
+    def setUp(self):
+        self.clients = [Mock(spec=('get_domain_id', 'netloc'), netloc=sentinel.netloc) for i in range(3)]
+        for index, client in enumerate(self.clients):
+            client.get_domain_id.return_value = index
+
+    def test_empty(self):
+        with self.assertRaises(ValueError):
+            ClientPool([])
+
+    def test_attribute(self):
+        self.assertEqual(ClientPool(self.clients).netloc, sentinel.netloc)
+
+    def test_round_robin(self):
+        pool = ClientPool(self.clients)
+
+        self.assertEqual([pool.get_domain_id('example.org') for i in range(4)], [0, 1, 2, 0])
+
+        self.assertEqual(self.clients[0].get_domain_id.mock_calls, [call('example.org'), call('example.org')])
+
+    def test_error(self):
+        self.clients[0].get_domain_id.side_effect = DomainDoesNotExist
+        pool = ClientPool(self.clients, max_calls=1)
+
+        with self.assertRaises(DomainDoesNotExist):
+            pool.get_domain_id('example.org')
+
+        self.assertEqual(pool._calls, [0, 0, 0])
+
+    def test_max_calls(self):
+        pool = ClientPool(self.clients, max_calls=1)
+        # Simulate calls in progress.
+        pool._calls = [0, 1, 0]
+        pool._next = 1
+
+        self.assertEqual(pool.get_domain_id('example.org'), 2)
+
+    def test_max_calls_busy(self):
+        pool = ClientPool(self.clients, max_calls=1)
+        # Simulate calls in progress.
+        pool._calls = [2, 1, 3]
+
+        self.assertEqual(pool.get_domain_id('example.org'), 1)
+
+    async def test_async(self):
+        clients = [Mock(get_domain_id=AsyncMock(return_value=i)) for i in range(2)]
+        pool = ClientPool(clients)
+
+        self.assertEqual([await pool.get_domain_id('example.org') for i in range(3)], [0, 1, 0])
+        self.assertEqual(pool._calls, [0, 0])
+
+
+class HedgingPolicyTest(SimpleTestCase):
+    def test_get_delay(self):
+        policy = HedgingPolicy(0.9, min_samples=10)
+        for duration in range(10):
+            policy.record('get_domain_id', duration / 10)
+
+        self.assertEqual(policy.get_delay('get_domain_id'), 0.9)
+        self.assertIsNone(policy.get_delay('get_keyset_id'))
+
+    def test_get_delay_min_samples(self):
+        policy = HedgingPolicy(0.9, min_samples=10)
+        policy.record('get_domain_id', 0.1)
+
+        self.assertIsNone(policy.get_delay('get_domain_id'))
+
+    def test_max_samples(self):
+        policy = HedgingPolicy(0.5, min_samples=1, max_samples=2)
+        for duration in (5, 1, 1):
+            policy.record('get_domain_id', duration)
+
+        self.assertEqual(policy.get_delay('get_domain_id'), 1)
+
+    def test_take(self):
+        policy = HedgingPolicy(0.9)
+        with hedge_budget(1):
+            self.assertTrue(policy.take())
+            self.assertFalse(policy.take())
+        self.assertEqual(policy.hedges, 1)
+
+    def test_take_no_budget(self):
+        policy = HedgingPolicy(0.9)
+
+        self.assertFalse(policy.take())
+        self.assertEqual(policy.hedges, 0)
+
+    def test_reserve(self):
+        policy = HedgingPolicy(0.9, max_workers=1)
+
+        self.assertTrue(policy.reserve())
+        self.assertFalse(policy.reserve())
+        policy.release()
+        self.assertTrue(policy.reserve())
+
+    def test_submit(self):
+        policy = HedgingPolicy(0.9, max_workers=1)
+        policy.reserve()
+
+        self.assertEqual(policy.submit(Mock(return_value=sentinel.result), sentinel.arg).result(5), sentinel.result)
+
+        policy._executor.shutdown()
+        # The thread is released after the call.
+        self.assertTrue(policy.reserve())
+
+
+class ClientPoolHedgingTest(SimpleTestCase):
+    def setUp(self):
+        self.policy = HedgingPolicy(0.5, min_samples=1)
+        self.policy.record('get_domain_id', 0.01)
+        self.release = Event()
+
+    def tearDown(self):
+        self.release.set()
+        if self.policy._executor is not None:
+            self.policy._executor.shutdown()
+
+    def _slow(self, *args):
+        self.release.wait(1)
+        return sentinel.slow
+
+    def test_fast(self):
+        clients = [Mock(get_domain_id=Mock(return_value=i)) for i in range(2)]
+        pool = ClientPool(clients, hedging=self.policy)
+
+        with hedge_budget(1):
+            self.assertEqual(pool.get_domain_id('example.org'), 0)
+
+        clients[1].get_domain_id.assert_not_called()
+        self.assertEqual(self.policy.hedges, 0)
+
+    def test_hedge(self):
+        clients = [Mock(get_domain_id=Mock(side_effect=self._slow)),
+                   Mock(get_domain_id=Mock(return_value=sentinel.fast))]
+        pool = ClientPool(clients, hedging=self.policy)
+
+        with hedge_budget(1):
+            self.assertEqual(pool.get_domain_id('example.org'), sentinel.fast)
+
+        clients[1].get_domain_id.assert_called_once_with('example.org')
+        self.assertEqual(self.policy.hedges, 1)
+
+    def test_hedge_executor(self):
+        clients = [Mock(get_domain_id=Mock(return_value=i)) for i in range(2)]
+        pool = ClientPool(clients, hedging=self.policy)
+
+        with hedge_budget(2):
+            pool.get_domain_id('example.org')
+            executor = self.policy._executor
+            pool.get_domain_id('example.org')
+
+        self.assertIs(self.policy._executor, executor)
+
+    def test_hedge_budget_exhausted(self):
+        clients = [Mock(get_domain_id=Mock(side_effect=self._slow)),
+                   Mock(get_domain_id=Mock(return_value=sentinel.fast))]
+        pool = ClientPool(clients, hedging=self.policy)
+
+        with hedge_budget(0):
+            self.release.set()
+            self.assertEqual(pool.get_domain_id('example.org'), sentinel.slow)
+
+        clients[1].get_domain_id.assert_not_called()
+        # Calls without budget are not made in the executor.
+        self.assertIsNone(self.policy._executor)
+
+    def test_hedge_workers_busy(self):
+        clients = [Mock(get_domain_id=Mock(return_value=sentinel.slow)),
+                   Mock(get_domain_id=Mock(return_value=sentinel.fast))]
+        pool = ClientPool(clients, hedging=self.policy)
+        self.policy._reserved = self.policy.max_workers
+
+        with hedge_budget(1):
+            self.assertEqual(pool.get_domain_id('example.org'), sentinel.slow)
+
+        # Calls are not queued in the executor.
+        self.assertIsNone(self.policy._executor)
+
+    def test_hedge_workers_busy_hedge(self):
+        clients = [Mock(get_domain_id=Mock(side_effect=lambda *args: self.release.wait(0.05) or sentinel.slow)),
+                   Mock(get_domain_id=Mock(return_value=sentinel.fast))]
+        pool = ClientPool(clients, hedging=HedgingPolicy(0.5, min_samples=1, max_workers=1))
+        pool.hedging.record('get_domain_id', 0.01)
+
+        with hedge_budget(1):
+            self.assertEqual(pool.get_domain_id('example.org'), sentinel.slow)
+
+        pool.hedging._executor.shutdown()
+        clients[1].get_domain_id.assert_not_called()
+        self.assertEqual(pool.hedging.hedges, 0)
+
+    def test_hedge_budget_taken(self):
+        clients = [Mock(get_domain_id=Mock(side_effect=lambda *args: self.release.wait(0.05) or sentinel.slow)),
+                   Mock(get_domain_id=Mock(return_value=sentinel.fast))]
+        pool = ClientPool(clients, hedging=self.policy)
+
+        # Budget is taken by another call of the request in the meantime.
+        with hedge_budget(1):
+            with patch.object(self.policy, 'take', return_value=False):
+                self.assertEqual(pool.get_domain_id('example.org'), sentinel.slow)
+
+        self.policy._executor.shutdown()
+        clients[1].get_domain_id.assert_not_called()
+        self.assertEqual(self.policy._reserved, 0)
+
+    def test_hedge_first_failed(self):
+        hedged = Event()
+
+        def _fail(*args):
+            hedged.wait(5)
+            raise ConnectionError('Gazpacho!')
+
+        def _succeed(*args):
+            hedged.set()
+            # Let the original call fail first.
+            self.release.wait(0.1)
+            return sentinel.fast
+
+        clients = [Mock(get_domain_id=Mock(side_effect=_fail)), Mock(get_domain_id=Mock(side_effect=_succeed))]
+        pool = ClientPool(clients, hedging=self.policy)
+
+        with hedge_budget(1):
+            self.assertEqual(pool.get_domain_id('example.org'), sentinel.fast)
+
+    def test_hedge_all_failed(self):
+        def _fail(*args):
+            self.release.wait(0.05)
+            raise ConnectionError('Gazpacho!')
+
+        clients = [Mock(get_domain_id=Mock(side_effect=_fail)), Mock(get_domain_id=Mock(side_effect=_fail))]
+        pool = ClientPool(clients, hedging=self.policy)
+
+        with hedge_budget(1):
+            with self.assertRaisesRegex(ConnectionError, 'Gazpacho!'):
+                pool.get_domain_id('example.org')
+
+        self.assertEqual(self.policy.hedges, 1)
+
+    def test_hedge_not_found(self):
+        hedged = Event()
+
+        def _not_found(*args):
+            hedged.wait(5)
+            raise DomainDoesNotExist()
+
+        def _slow(*args):
+            hedged.set()
+            return self._slow()
+
+        clients = [Mock(get_domain_id=Mock(side_effect=_not_found)), Mock(get_domain_id=Mock(side_effect=_slow))]
+        pool = ClientPool(clients, hedging=self.policy)
+
+        with hedge_budget(1):
+            with self.assertRaises(DomainDoesNotExist):
+                pool.get_domain_id('example.org')
+
+    def test_no_budget(self):
+        clients = [Mock(get_domain_id=Mock(side_effect=self._slow)),
+                   Mock(get_domain_id=Mock(return_value=sentinel.fast))]
+        pool = ClientPool(clients, hedging=self.policy)
+        self.release.set()
+
+        self.assertEqual(pool.get_domain_id('example.org'), sentinel.slow)
+
+        clients[1].get_domain_id.assert_not_called()
+        self.assertIsNone(self.policy._executor)
+
+    def test_not_read_only(self):
+        clients = [Mock(update_domain=Mock(side_effect=self._slow)),
+                   Mock(update_domain=Mock(return_value=sentinel.fast))]
+        pool = ClientPool(clients, hedging=self.policy)
+        self.release.set()
+
+        with hedge_budget(1):
+            self.assertEqual(pool.update_domain('example.org'), sentinel.slow)
+
+        clients[1].update_domain.assert_not_called()
+
+    def test_record(self):
+        clients = [Mock(get_keyset_id=Mock(return_value=sentinel.id))]
+        pool = ClientPool(clients, hedging=self.policy)
+
+        pool.get_keyset_id('example')
+
+        self.assertEqual(len(self.policy._samples['get_keyset_id']), 1)
+
+    async def test_hedge_async(self):
+        async def _slow(*args):
+            await asyncio.sleep(1)
+
+        clients = [Mock(get_domain_id=AsyncMock(side_effect=_slow)),
+                   Mock(get_domain_id=AsyncMock(return_value=sentinel.fast))]
+        pool = ClientPool(clients, hedging=self.policy)
+
+        with hedge_budget(1):
+            self.assertEqual(await pool.get_domain_id('example.org'), sentinel.fast)
+
+        clients[1].get_domain_id.assert_awaited_once_with('example.org')
+        self.assertEqual(self.policy.hedges, 1)
+        self.assertEqual(pool._calls, [0, 0])
+
+    async def test_hedge_async_first_failed(self):
+        async def _fail(*args):
+            await asyncio.sleep(0.05)
+            raise ConnectionError('Gazpacho!')
+
+        async def _succeed(*args):
+            await asyncio.sleep(0.1)
+            return sentinel.fast
+
+        clients = [Mock(get_domain_id=AsyncMock(side_effect=_fail)),
+                   Mock(get_domain_id=AsyncMock(side_effect=_succeed))]
+        pool = ClientPool(clients, hedging=self.policy)
+
+        with hedge_budget(1):
+            self.assertEqual(await pool.get_domain_id('example.org'), sentinel.fast)
+
+        self.assertEqual(pool._calls, [0, 0])
+
+    async def test_hedge_async_all_failed(self):
+        async def _fail(*args):
+            await asyncio.sleep(0.05)
+            raise ConnectionError('Gazpacho!')
+
+        clients = [Mock(get_domain_id=AsyncMock(side_effect=_fail)), Mock(get_domain_id=AsyncMock(side_effect=_fail))]
+        pool = ClientPool(clients, hedging=self.policy)
+
+        with hedge_budget(1):
+            with self.assertRaisesRegex(ConnectionError, 'Gazpacho!'):
+                await pool.get_domain_id('example.org')
+
+    async def test_hedge_async_budget_exhausted(self):
+        async def _slow(*args):
+            await asyncio.sleep(0.1)
+            return sentinel.slow
+
+        clients = [Mock(get_domain_id=AsyncMock(side_effect=_slow)),
+                   Mock(get_domain_id=AsyncMock(return_value=sentinel.fast))]
+        pool = ClientPool(clients, hedging=self.policy)
+
+        with hedge_budget(0):
+            self.assertEqual(await pool.get_domain_id('example.org'), sentinel.slow)
+
+        clients[1].get_domain_id.assert_not_awaited()
+        self.assertEqual(self.policy.hedges, 0)
+
+    async def test_hedge_async_budget_taken(self):
+        async def _slow(*args):
+            await asyncio.sleep(0.05)
+            return sentinel.slow
+
+        clients = [Mock(get_domain_id=AsyncMock(side_effect=_slow)),
+                   Mock(get_domain_id=AsyncMock(return_value=sentinel.fast))]
+        pool = ClientPool(clients, hedging=self.policy)
+
+        # Budget is taken by another call of the request in the meantime.
+        with hedge_budget(1):
+            with patch.object(self.policy, 'take', return_value=False):
+                self.assertEqual(await pool.get_domain_id('example.org'), sentinel.slow)
+
+        clients[1].get_domain_id.assert_not_awaited()
+
+
+@patch('rdap.clients.monotonic', return_value=100)
+class LoadBalancerTest(SimpleTestCase):
+    def setUp(self):
+        self.endpoints = [Mock(get_domain_id=Mock(return_value=i)) for i in range(3)]
+
+    def test_round_robin(self, monotonic_mock):
+        balancer = LoadBalancer(self.endpoints)
+
+        self.assertEqual([balancer.get_domain_id('example.org') for i in range(4)], [0, 1, 2, 0])
+        self.assertEqual(balancer._calls, [0, 0, 0])
+
+    def test_least_calls(self, monotonic_mock):
+        balancer = LoadBalancer(self.endpoints)
+        # Simulate calls in progress.
+        balancer._calls = [2, 1, 3]
+
+        self.assertEqual(balancer.get_domain_id('example.org'), 1)
+
+    def test_eject(self, monotonic_mock):
+        self.endpoints[0].get_domain_id.side_effect = ConnectionError
+        balancer = LoadBalancer(self.endpoints, max_failures=2, ejection_time=30)
+
+        with self.assertLogs(level='WARNING') as logs:
+            for i in range(2):
+                balancer._next = 0
+                with self.assertRaises(ConnectionError):
+                    balancer.get_domain_id('example.org')
+
+        self.assertEqual(balancer._ejected_until, [130, 0, 0])
+        self.assertEqual(logs.output, ['WARNING:root:Registry endpoint 0 ejected for 30 seconds.'])
+        balancer._next = 0
+        self.assertEqual(balancer.get_domain_id('example.org'), 1)
+        # Endpoint is returned after the ejection time.
+        monotonic_mock.return_value = 130
+        balancer._next = 0
+        self.endpoints[0].get_domain_id.side_effect = None
+        self.assertEqual(balancer.get_domain_id('example.org'), 0)
+
+    def test_eject_not_consecutive(self, monotonic_mock):
+        self.endpoints[0].get_domain_id.side_effect = [ConnectionError, 0, ConnectionError]
+        balancer = LoadBalancer(self.endpoints, max_failures=2)
+
+        for i in range(3):
+            balancer._next = 0
+            try:
+                balancer.get_domain_id('example.org')
+            except ConnectionError:
+                pass
+
+        self.assertEqual(balancer._failures, [1, 0, 0])
+        self.assertEqual(balancer._ejected_until, [0, 0, 0])
+
+    def test_not_found(self, monotonic_mock):
+        self.endpoints[0].get_domain_id.side_effect = DomainDoesNotExist
+        balancer = LoadBalancer(self.endpoints, max_failures=1)
+
+        with self.assertRaises(DomainDoesNotExist):
+            balancer.get_domain_id('example.org')
+
+        self.assertEqual(balancer._ejected_until, [0, 0, 0])
+
+    def test_all_ejected(self, monotonic_mock):
+        balancer = LoadBalancer(self.endpoints)
+        balancer._ejected_until = [130, 130, 130]
+        balancer._calls = [1, 0, 1]
+
+        self.assertEqual(balancer.get_domain_id('example.org'), 1)
+
+    def test_hedge_other_endpoint(self, monotonic_mock):
+        balancer = LoadBalancer(self.endpoints)
+        balancer._calls = [0, 5, 5]
+
+        self.assertEqual(balancer._acquire(exclude=0), 1)
+
+    async def test_async(self, monotonic_mock):
+        endpoints = [Mock(get_domain_id=AsyncMock(side_effect=ConnectionError)),
+                     Mock(get_domain_id=AsyncMock(return_value=1))]
+        balancer = LoadBalancer(endpoints, max_failures=1)
+
+        with self.assertLogs(level='WARNING'):
+            with self.assertRaises(ConnectionError):
+                await balancer.get_domain_id('example.org')
+
+        self.assertEqual(await balancer.get_domain_id('example.org'), 1)
+        self.assertEqual(await balancer.get_domain_id('example.org'), 1)
+        self.assertEqual(balancer._ejected_until, [130, 0])
+
+    async def test_async_not_found(self, monotonic_mock):
+        endpoints = [Mock(get_domain_id=AsyncMock(side_effect=DomainDoesNotExist))]
+        balancer = LoadBalancer(endpoints, max_failures=1)
+
+        with self.assertRaises(DomainDoesNotExist):
+            await balancer.get_domain_id('example.org')
+
+        self.assertEqual(balancer._ejected_until, [0])
+
+
+class BackendExecutorTest(SimpleTestCase):
+    def test_submit(self):
+        executor = BackendExecutor(2)
+        func = Mock(return_value=sentinel.result)
+
+        fetch = executor.submit(func, sentinel.arg)
+
+        self.assertEqual(fetch(), sentinel.result)
+        func.assert_called_once_with(sentinel.arg)
+        executor._executor.shutdown()
+
+    def test_submit_error(self):
+        executor = BackendExecutor(2)
+        fetch = executor.submit(Mock(side_effect=ContactDoesNotExist))
+
+        with self.assertRaises(ContactDoesNotExist):
+            fetch()
+        executor._executor.shutdown()
+
+    def test_submit_disabled(self):
+        executor = BackendExecutor(0)
+        func = Mock(return_value=sentinel.result)
+
+        fetch = executor.submit(func, sentinel.arg)
+
+        # The call is deferred until its result is requested.
+        func.assert_not_called()
+        self.assertEqual(fetch(), sentinel.result)
+        self.assertEqual(fetch(), sentinel.result)
+        func.assert_called_once_with(sentinel.arg)
+        self.assertIsNone(executor._executor)
+
+    def test_submit_disabled_error(self):
+        executor = BackendExecutor(0)
+        func = Mock(side_effect=ContactDoesNotExist)
+        fetch = executor.submit(func)
+
+        with self.assertRaises(ContactDoesNotExist):
+            fetch()
+        with self.assertRaises(ContactDoesNotExist):
+            fetch()
+        func.assert_called_once_with()
+
+    def test_map(self):
+        for workers in (0, 2):
+            with self.subTest(workers=workers):
+                executor = BackendExecutor(workers)
+                func = Mock(side_effect=str.upper)
+
+                fetches = executor.map(func, ['kryten', 'rimmer', 'kryten'])
+
+                self.assertEqual([fetch() for fetch in fetches], ['KRYTEN', 'RIMMER', 'KRYTEN'])
+                self.assertEqual(func.call_count, 2)
+
+
+class GatherUniqueTest(SimpleTestCase):
+    async def test_gather_unique(self):
+        func = AsyncMock(side_effect=str.upper)
+
+        self.assertEqual(await gather_unique(func, ['kryten', 'rimmer', 'kryten']), ['KRYTEN', 'RIMMER', 'KRYTEN'])
+
+        self.assertEqual(func.await_count, 2)
+
+
+class WarmUpTest(SimpleTestCase):
+    def test_empty(self):
+        self.assertGreaterEqual(warm_up([]), 0)
+
+    def test_warm_up(self):
+        calls = [Mock(return_value=sentinel.result), Mock(side_effect=ContactDoesNotExist)]
+
+        self.assertGreaterEqual(warm_up(calls), 0)
+
+        for warm_up_call in calls:
+            warm_up_call.assert_called_once_with()
+
+    def test_error(self):
+        calls = [Mock(side_effect=RuntimeError('Gazpacho!'))]
+
+        with self.assertLogs(level='WARNING') as logs:
+            warm_up(calls)
+
+        self.assertEqual(logs.output, ['WARNING:root:Warm-up call failed: Gazpacho!'])
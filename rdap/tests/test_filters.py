@@ -0,0 +1,176 @@
+#
+# Copyright (C) 2022  CZ.NIC, z. s. p. o.
+#
+# This file is part of FRED.
+#
+# FRED is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# FRED is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with FRED.  If not, see <https://www.gnu.org/licenses/>.
+#
+import os
+from tempfile import TemporaryDirectory
+from threading import Thread
+from typing import cast
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from rdap.filters import BloomFilter, DnsHostFilter, normalize_dns_host
+
+
+class BloomFilterTest(SimpleTestCase):
+    def test_empty(self):
+        bloom = BloomFilter(0, 0.01)
+        self.assertNotIn('kryten', bloom)
+
+    def test_contains(self):
+        bloom = BloomFilter(100, 0.01)
+        for i in range(100):
+            bloom.add('ns{}.example.org'.format(i))
+        for i in range(100):
+            self.assertIn('ns{}.example.org'.format(i), bloom)
+        self.assertNotIn('kryten', bloom)
+
+
+class NormalizeDnsHostTest(SimpleTestCase):
+    def test_normalize(self):
+        data = (
+            # fqdn, result
+            ('ns.example.org', 'ns.example.org'),
+            ('NS.Example.ORG', 'ns.example.org'),
+            ('ns.example.org.', 'ns.example.org'),
+            (' ns.example.org\n', 'ns.example.org'),
+            ('ns.háčkyčárky.cz', 'ns.xn--hkyrky-ptac70bc.cz'),
+            ('NS.HÁČKYČÁRKY.CZ.', 'ns.xn--hkyrky-ptac70bc.cz'),
+            ('ns.xn--hkyrky-ptac70bc.cz', 'ns.xn--hkyrky-ptac70bc.cz'),
+            # Invalid names are kept.
+            ('ns.ex_ample.čz', 'ns.ex_ample.čz'),
+        )
+        for fqdn, result in data:
+            with self.subTest(fqdn=fqdn):
+                self.assertEqual(normalize_dns_host(fqdn), result)
+
+
+class DnsHostFilterTest(SimpleTestCase):
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, 'hosts.txt')
+        patcher = patch('rdap.filters.monotonic', return_value=100)
+        self.addCleanup(patcher.stop)
+        self.monotonic_mock = patcher.start()
+
+    def _write(self, *hosts: str, mtime: int) -> None:
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(hosts))
+        os.utime(self.path, (mtime, mtime))
+
+    def _refresh(self, host_filter: DnsHostFilter) -> None:
+        host_filter.refresh()
+        # Loader is started by the first refresh, later refreshes may reuse the finished one.
+        cast(Thread, host_filter._loader).join()
+
+    def test_no_file(self):
+        host_filter = DnsHostFilter(None)
+        host_filter.refresh()
+        self.assertIn('ns.example.org', host_filter)
+        # Loader is not started without a file.
+        self.assertIsNone(host_filter._loader)
+
+    def test_missing_file(self):
+        host_filter = DnsHostFilter(self.path)
+        with self.assertLogs('root', 'WARNING'):
+            self._refresh(host_filter)
+        self.assertIn('ns.example.org', host_filter)
+
+    def test_contains(self):
+        self._write('ns.example.org', 'NS.EXAMPLE.NET.', '', mtime=1000)
+        host_filter = DnsHostFilter(self.path)
+        self._refresh(host_filter)
+        self.assertIn('ns.example.org', host_filter)
+        self.assertIn('ns.example.net', host_filter)
+        self.assertNotIn('ns.example.com', host_filter)
+
+    def test_contains_idn(self):
+        self._write('ns.háčkyčárky.cz', mtime=1000)
+        host_filter = DnsHostFilter(self.path)
+        self._refresh(host_filter)
+        self.assertIn('ns.xn--hkyrky-ptac70bc.cz', host_filter)
+
+    def test_contains_not_loaded(self):
+        # All hosts pass until the filter is loaded in background.
+        self._write('ns.example.org', mtime=1000)
+        host_filter = DnsHostFilter(self.path)
+        with host_filter._lock:
+            self.assertIn('ns.example.com', host_filter)
+
+    def test_empty_file(self):
+        self._write('', mtime=1000)
+        host_filter = DnsHostFilter(self.path)
+        with self.assertLogs('root', 'WARNING') as log_catcher:
+            self._refresh(host_filter)
+        self.assertEqual(log_catcher.output, ['WARNING:root:No DNS hosts found in {}, the file is ignored.'.format(
+            self.path)])
+        self.assertIn('ns.example.com', host_filter)
+
+    def test_reload_empty_file(self):
+        self._write('ns.example.org', mtime=1000)
+        host_filter = DnsHostFilter(self.path, interval=60)
+        self._refresh(host_filter)
+
+        # Previous filter is kept.
+        self._write('', mtime=2000)
+        self.monotonic_mock.return_value = 200
+        with self.assertLogs('root', 'WARNING'):
+            self._refresh(host_filter)
+        self.assertIn('ns.example.org', host_filter)
+        self.assertNotIn('ns.example.com', host_filter)
+
+        # File is checked again, once it's complete.
+        self._write('ns.example.org', 'ns.example.com', mtime=2000)
+        self.monotonic_mock.return_value = 300
+        self._refresh(host_filter)
+        self.assertIn('ns.example.com', host_filter)
+
+    def test_reload(self):
+        self._write('ns.example.org', mtime=1000)
+        host_filter = DnsHostFilter(self.path, interval=60)
+        self._refresh(host_filter)
+        self.assertNotIn('ns.example.com', host_filter)
+
+        self._write('ns.example.org', 'ns.example.com', mtime=2000)
+        # Check interval hasn't passed yet.
+        self.monotonic_mock.return_value = 150
+        self._refresh(host_filter)
+        self.assertNotIn('ns.example.com', host_filter)
+
+        self.monotonic_mock.return_value = 200
+        self._refresh(host_filter)
+        self.assertIn('ns.example.com', host_filter)
+
+    def test_reload_not_modified(self):
+        self._write('ns.example.org', mtime=1000)
+        host_filter = DnsHostFilter(self.path, interval=60)
+        self._refresh(host_filter)
+        self.assertNotIn('ns.example.com', host_filter)
+
+        self._write('ns.example.org', 'ns.example.com', mtime=1000)
+        self.monotonic_mock.return_value = 200
+        self._refresh(host_filter)
+        self.assertNotIn('ns.example.com', host_filter)
+
+    def test_reload_locked(self):
+        self._write('ns.example.org', mtime=1000)
+        host_filter = DnsHostFilter(self.path)
+        with host_filter._lock:
+            host_filter.refresh()
+        self.assertIsNone(host_filter._loader)
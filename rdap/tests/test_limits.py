@@ -0,0 +1,238 @@
+#
+# Copyright (C) 2022  CZ.NIC, z. s. p. o.
+#
+# This file is part of FRED.
+#
+# FRED is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# FRED is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with FRED.  If not, see <https://www.gnu.org/licenses/>.
+#
+import sys
+from unittest.mock import Mock, patch
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from rdap.limits import ConcurrencyLimiter, RateLimiter, _get_uwsgi, get_uwsgi_load
+
+
+class GetUwsgiLoadTest(SimpleTestCase):
+    def setUp(self):
+        _get_uwsgi.cache_clear()
+        self.addCleanup(_get_uwsgi.cache_clear)
+
+    def test_no_uwsgi(self):
+        with patch.dict(sys.modules, {'uwsgi': None}):
+            self.assertEqual(get_uwsgi_load(), 0)
+
+    def test_uwsgi(self):
+        uwsgi = Mock(spec=('worker_id', 'workers', 'listen_queue'))
+        uwsgi.worker_id.return_value = 1
+        uwsgi.workers.return_value = ({'id': 1, 'status': 'busy'}, {'id': 2, 'status': 'busy'},
+                                      {'id': 3, 'status': 'idle'})
+        uwsgi.listen_queue.return_value = 5
+        with patch.dict(sys.modules, {'uwsgi': uwsgi}):
+            self.assertEqual(get_uwsgi_load(), 6)
+
+
+class ConcurrencyLimiterTest(SimpleTestCase):
+    def test_disabled(self):
+        limiter = ConcurrencyLimiter(0)
+
+        for i in range(3):
+            self.assertTrue(limiter.acquire())
+        limiter.release(10, False)
+
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertEqual(limiter.limit, 0)
+
+    def test_acquire(self):
+        limiter = ConcurrencyLimiter(2)
+
+        self.assertTrue(limiter.acquire())
+        self.assertTrue(limiter.acquire())
+        with self.assertLogs('root', 'WARNING'):
+            self.assertFalse(limiter.acquire())
+
+        self.assertEqual(limiter.in_flight, 2)
+        self.assertEqual(limiter.rejected, 1)
+        limiter.release(0.1)
+        self.assertTrue(limiter.acquire())
+
+    def test_load(self):
+        load_mock = Mock(return_value=1)
+        limiter = ConcurrencyLimiter(2, get_load=load_mock)
+
+        self.assertTrue(limiter.acquire())
+        with self.assertLogs('root', 'WARNING') as log_catcher:
+            self.assertFalse(limiter.acquire())
+
+        self.assertEqual(log_catcher.output, ['WARNING:root:Concurrency limit 2 reached with 2 requests in progress or '
+                                              'queued, 1 requests rejected.'])
+        load_mock.return_value = 0
+        self.assertTrue(limiter.acquire())
+
+    def test_report(self):
+        limiter = ConcurrencyLimiter(1, report_interval=60)
+        limiter.acquire()
+
+        with patch('rdap.limits.monotonic', return_value=100) as monotonic_mock:
+            with self.assertLogs('root', 'WARNING') as log_catcher:
+                self.assertFalse(limiter.acquire())
+                # Rejections are reported at most once per interval.
+                monotonic_mock.return_value = 159
+                self.assertFalse(limiter.acquire())
+                monotonic_mock.return_value = 160
+                self.assertFalse(limiter.acquire())
+
+        self.assertEqual(log_catcher.output, [
+            'WARNING:root:Concurrency limit 1 reached with 1 requests in progress or queued, 1 requests rejected.',
+            'WARNING:root:Concurrency limit 1 reached with 1 requests in progress or queued, 3 requests rejected.'])
+
+    def test_increase(self):
+        limiter = ConcurrencyLimiter(10)
+        limiter.limit = 4
+        limiter.acquire()
+
+        limiter.release(0.1)
+
+        self.assertEqual(limiter.limit, 4.25)
+
+    def test_increase_max(self):
+        limiter = ConcurrencyLimiter(4)
+        limiter.acquire()
+
+        limiter.release(0.1)
+
+        self.assertEqual(limiter.limit, 4)
+
+    def test_decrease_slow(self):
+        limiter = ConcurrencyLimiter(10, latency=1.0, backoff=0.5)
+        limiter.acquire()
+
+        limiter.release(1.5)
+
+        self.assertEqual(limiter.limit, 5)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_decrease_failure(self):
+        limiter = ConcurrencyLimiter(10, backoff=0.5)
+        limiter.acquire()
+
+        limiter.release(0.1, False)
+
+        self.assertEqual(limiter.limit, 5)
+
+    def test_decrease_min(self):
+        limiter = ConcurrencyLimiter(10, min_limit=3, backoff=0.1)
+        limiter.acquire()
+
+        limiter.release(0.1, False)
+
+        self.assertEqual(limiter.limit, 3)
+
+
+@patch('rdap.limits.time', return_value=1000)
+class RateLimiterTest(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_disabled(self, time_mock):
+        limiter = RateLimiter('default', 0, 1)
+
+        for i in range(3):
+            self.assertIsNone(limiter.check('192.0.2.1'))
+
+    def test_burst(self, time_mock):
+        limiter = RateLimiter('default', 0.5, 2)
+
+        self.assertIsNone(limiter.check('192.0.2.1'))
+        self.assertIsNone(limiter.check('192.0.2.1'))
+        self.assertEqual(limiter.check('192.0.2.1'), 4)
+        # Other addresses are not limited.
+        self.assertIsNone(limiter.check('192.0.2.2'))
+
+    def test_window(self, time_mock):
+        limiter = RateLimiter('default', 0.5, 2)
+        limiter.check('192.0.2.1')
+        limiter.check('192.0.2.1')
+
+        time_mock.return_value = 1003
+        self.assertEqual(limiter.check('192.0.2.1'), 1)
+        time_mock.return_value = 1004
+        self.assertIsNone(limiter.check('192.0.2.1'))
+        self.assertIsNone(limiter.check('192.0.2.1'))
+        self.assertEqual(limiter.check('192.0.2.1'), 4)
+
+    def test_network(self, time_mock):
+        limiter = RateLimiter('default', 10, 10, network_rate=1, network_burst=2)
+
+        self.assertIsNone(limiter.check('192.0.2.1'))
+        self.assertIsNone(limiter.check('192.0.2.2'))
+        self.assertEqual(limiter.check('192.0.2.3'), 2)
+        self.assertIsNone(limiter.check('192.0.3.1'))
+
+    def test_network_refund(self, time_mock):
+        limiter = RateLimiter('default', 1, 1, network_rate=1, network_burst=1)
+
+        self.assertIsNone(limiter.check('192.0.2.1'))
+        self.assertEqual(limiter.check('192.0.2.2'), 1)
+
+        # Request rejected by the network limit is not counted for the address.
+        self.assertEqual(caches['default'].get('rdap:rate:192.0.2.2:1000'), 0)
+
+    def test_network_refund_expired(self, time_mock):
+        limiter = RateLimiter('default', 1, 1, network_rate=1, network_burst=1)
+        limiter.check('192.0.2.1')
+
+        with patch.object(caches['default'], 'decr', side_effect=ValueError('Gazpacho!')):
+            self.assertEqual(limiter.check('192.0.2.2'), 1)
+
+    def test_network_ipv6(self, time_mock):
+        limiter = RateLimiter('default', 0, 0, network_rate=1, network_burst=1)
+
+        self.assertIsNone(limiter.check('2001:db8::1'))
+        self.assertEqual(limiter.check('2001:db8:0:1::1'), 1)
+        self.assertIsNone(limiter.check('2001:db8:1::1'))
+
+    def test_no_burst(self, time_mock):
+        limiter = RateLimiter('default', 0.5, 0)
+
+        self.assertEqual(limiter.check('192.0.2.1'), 2)
+
+    def test_counter_expired(self, time_mock):
+        limiter = RateLimiter('default', 1, 1)
+        limiter.check('192.0.2.1')
+
+        with patch.object(caches['default'], 'incr', side_effect=ValueError('Gazpacho!')):
+            self.assertIsNone(limiter.check('192.0.2.1'))
+
+    def test_get_buckets(self, time_mock):
+        limiter = RateLimiter('default', 1, 5, network_rate=10, network_burst=50, ipv4_prefix=16)
+
+        self.assertEqual(limiter.get_buckets('192.0.2.1'),
+                         [('rdap:rate:192.0.2.1', 1, 5), ('rdap:rate:192.0.0.0/16', 10, 50)])
+
+    def test_invalid_address(self, time_mock):
+        limiter = RateLimiter('default', 1, 0)
+
+        self.assertEqual(limiter.get_buckets(''), [])
+        self.assertIsNone(limiter.check(''))
+
+    def test_cache_error(self, time_mock):
+        limiter = RateLimiter('default', 1, 0)
+
+        with patch.object(caches['default'], 'add', side_effect=ConnectionError('Gazpacho!')):
+            with self.assertLogs(level='WARNING') as logs:
+                self.assertIsNone(limiter.check('192.0.2.1'))
+
+        self.assertEqual(logs.output, ['WARNING:root:Rate limit check failed: Gazpacho!'])
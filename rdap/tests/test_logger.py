@@ -0,0 +1,145 @@
+#
+# Copyright (C) 2022  CZ.NIC, z. s. p. o.
+#
+# This file is part of FRED.
+#
+# FRED is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# FRED is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with FRED.  If not, see <https://www.gnu.org/licenses/>.
+#
+from threading import Event
+from unittest.mock import Mock, call, patch, sentinel
+
+from django.test import SimpleTestCase
+
+from rdap.logger import QueuedLoggerClient
+
+
+@patch('rdap.logger.atexit', autospec=True)
+class QueuedLoggerClientTest(SimpleTestCase):
+    def setUp(self):
+        self.client = Mock(spec=('create_log_entry', 'close_log_entry', 'register_service'))
+        self.client.create_log_entry.return_value = sentinel.log_entry_id
+
+    def test_attribute(self, atexit_mock):
+        logger_client = QueuedLoggerClient(self.client, 10)
+
+        logger_client.register_service(sentinel.service)
+
+        self.assertEqual(self.client.mock_calls, [call.register_service(sentinel.service)])
+
+    def test_log(self, atexit_mock):
+        logger_client = QueuedLoggerClient(self.client, 10)
+
+        log_entry_id = logger_client.create_log_entry(sentinel.service, sentinel.type, source_ip='127.0.0.1')
+        logger_client.close_log_entry(log_entry_id, sentinel.result, properties=sentinel.properties)
+        logger_client.close()
+
+        self.assertEqual(self.client.mock_calls, [
+            call.create_log_entry(sentinel.service, sentinel.type, source_ip='127.0.0.1'),
+            call.close_log_entry(sentinel.log_entry_id, sentinel.result, properties=sentinel.properties),
+        ])
+        self.assertEqual(log_entry_id.value, sentinel.log_entry_id)
+        self.assertEqual(atexit_mock.mock_calls, [call.register(logger_client.close)])
+
+    def test_batch(self, atexit_mock):
+        logger_client = QueuedLoggerClient(self.client, 10, batch_size=2)
+        # Don't start the sender, run it in the test.
+        logger_client._sender = Mock()
+        for i in range(3):
+            logger_client.create_log_entry(sentinel.service, i)
+        logger_client._closed = True
+
+        with patch.object(logger_client, '_send', wraps=logger_client._send) as send_mock:
+            logger_client._run()
+
+        self.assertEqual([len(c[1][0]) for c in send_mock.mock_calls], [2, 1])
+        self.assertEqual(self.client.create_log_entry.mock_calls, [call(sentinel.service, i) for i in range(3)])
+        self.assertEqual(logger_client._size, 0)
+
+    def test_drop(self, atexit_mock):
+        logger_client = QueuedLoggerClient(self.client, 1)
+        sending = Event()
+        release = Event()
+
+        def _create_log_entry(*args):
+            sending.set()
+            release.wait(1)
+
+        self.client.create_log_entry.side_effect = _create_log_entry
+        # Fill the queue while the sender is blocked by the first log entry.
+        logger_client.create_log_entry(sentinel.service, 0)
+        self.assertTrue(sending.wait(5))
+        logger_client.create_log_entry(sentinel.service, 1)
+
+        log_entry_id = logger_client.create_log_entry(sentinel.service, 2)
+        logger_client.close_log_entry(log_entry_id, sentinel.result)
+
+        self.assertTrue(log_entry_id.dropped)
+        self.assertEqual(logger_client.dropped, 1)
+        with self.assertLogs(level='WARNING') as logs:
+            release.set()
+            logger_client.close()
+
+        self.assertEqual(self.client.create_log_entry.mock_calls,
+                         [call(sentinel.service, 0), call(sentinel.service, 1)])
+        self.assertEqual(self.client.close_log_entry.mock_calls, [])
+        self.assertEqual(logs.output, ['WARNING:root:Logger queue is full, 1 log entries dropped.'])
+
+    def test_block(self, atexit_mock):
+        logger_client = QueuedLoggerClient(self.client, 1, block=True)
+
+        for i in range(3):
+            logger_client.create_log_entry(sentinel.service, i)
+        logger_client.close()
+
+        self.assertEqual(self.client.create_log_entry.mock_calls, [call(sentinel.service, i) for i in range(3)])
+        self.assertEqual(logger_client.dropped, 0)
+
+    def test_error(self, atexit_mock):
+        self.client.create_log_entry.side_effect = ConnectionError('Gazpacho!')
+        logger_client = QueuedLoggerClient(self.client, 10)
+
+        with self.assertLogs(level='WARNING') as logs:
+            log_entry_id = logger_client.create_log_entry(sentinel.service, sentinel.type)
+            logger_client.close_log_entry(log_entry_id, sentinel.result)
+            logger_client.close()
+
+        self.assertEqual(self.client.close_log_entry.mock_calls, [])
+        self.assertEqual(logs.output, ['WARNING:root:Logger call create_log_entry failed: Gazpacho!'])
+
+    def test_closed(self, atexit_mock):
+        logger_client = QueuedLoggerClient(self.client, 10)
+        logger_client.close()
+
+        log_entry_id = logger_client.create_log_entry(sentinel.service, sentinel.type)
+
+        self.assertTrue(log_entry_id.dropped)
+
+    def test_close_timeout(self, atexit_mock):
+        logger_client = QueuedLoggerClient(self.client, 10, flush_timeout=0.01)
+        release = Event()
+        self.addCleanup(release.set)
+        self.client.create_log_entry.side_effect = lambda *args: release.wait(5)
+        logger_client.create_log_entry(sentinel.service, sentinel.type)
+
+        with self.assertLogs(level='WARNING') as logs:
+            logger_client.close()
+
+        self.assertEqual(logs.output, ['WARNING:root:Logger queue was not flushed in 0.01 seconds.'])
+
+    def test_close_not_started(self, atexit_mock):
+        logger_client = QueuedLoggerClient(self.client, 10)
+
+        logger_client.close()
+
+        self.assertEqual(self.client.mock_calls, [])
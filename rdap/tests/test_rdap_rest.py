@@ -16,20 +16,22 @@
 # You should have received a copy of the GNU General Public License
 # along with FRED.  If not, see <https://www.gnu.org/licenses/>.
 #
+import json
 from datetime import datetime, timezone
 from ipaddress import IPv4Address, IPv6Address
 from typing import Any, Dict, List, Optional
-from unittest.mock import patch
+from unittest.mock import AsyncMock, Mock, patch
 
 from django.test import RequestFactory, SimpleTestCase, override_settings
 from regal import Address, Contact, DnsHost, DnsKey, Domain, Keyset, Nsset, ObjectEvent, ObjectEvents
 
+from rdap.clients import BackendExecutor
 from rdap.constants import ObjectStatus
-from rdap.rdap_rest.domain import domain_to_dict
+from rdap.rdap_rest.domain import domain_to_dict, domain_to_dict_async
 from rdap.rdap_rest.entity import contact_to_dict
-from rdap.rdap_rest.keyset import keyset_to_dict
+from rdap.rdap_rest.keyset import keyset_to_dict, keyset_to_dict_async
 from rdap.rdap_rest.nameserver import nameserver_to_dict
-from rdap.rdap_rest.nsset import nsset_to_dict
+from rdap.rdap_rest.nsset import nsset_to_dict, nsset_to_dict_async
 from rdap.rdap_rest.rdap_utils import ObjectClassName
 
 
@@ -40,10 +42,10 @@ class TestDomainToDict(SimpleTestCase):
     def setUp(self):
         self.request = RequestFactory(HTTP_HOST='rdap.example').get('/dummy/')
 
-        patcher = patch('rdap.rdap_rest.domain.CONTACT_CLIENT', spec=('get_contact_info', ))
+        patcher = patch('rdap.rdap_rest.domain.CONTACT_CLIENT', spec=('get_contact_handle', ))
         self.addCleanup(patcher.stop)
         self.contact_mock = patcher.start()
-        self.contact_mock.get_contact_info.return_value = Contact(contact_id='2X4B', contact_handle='KRYTEN')
+        self.contact_mock.get_contact_handle.return_value = 'KRYTEN'
         patcher = patch('rdap.rdap_rest.domain.DOMAIN_CLIENT', spec=('get_domain_state', ))
         self.addCleanup(patcher.stop)
         self.domain_mock = patcher.start()
@@ -105,8 +107,7 @@ class TestDomainToDict(SimpleTestCase):
             self._test_simple({}, {'port43': 'whois.example.org'})
 
     def test_admin_contacts(self):
-        self.contact_mock.get_contact_info.side_effect = [Contact(contact_id='2X4B', contact_handle='KRYTEN'),
-                                                          Contact(contact_id='ID-RIMMER', contact_handle='RIMMER')]
+        self.contact_mock.get_contact_handle.side_effect = ['KRYTEN', 'RIMMER']
         link = {'value': 'http://rdap.example/entity/KRYTEN', 'rel': 'self',
                 'href': 'http://rdap.example/entity/KRYTEN', 'type': 'application/rdap+json'}
         admin = {'value': 'http://rdap.example/entity/RIMMER', 'rel': 'self',
@@ -252,6 +253,82 @@ class TestDomainToDict(SimpleTestCase):
                 'fred_keyset': keyset_data}
         self._test_simple({'keyset': 'EXAMPLE'}, data)
 
+    def test_concurrent(self):
+        self.contact_mock.get_contact_handle.side_effect = {
+            '2X4B': 'KRYTEN', 'ID-RIMMER': 'RIMMER', 'ID-LISTER': 'LISTER', 'ID-CAT': 'CAT'}.get
+        self.domain_mock.get_domain_state.return_value = {ObjectStatus.LINKED: True}
+        self.nsset_mock.get_nsset_id.return_value = 'ID-EXAMPLE'
+        self.nsset_mock.get_nsset_info.return_value = Nsset(
+            nsset_id='ID-EXAMPLE', nsset_handle='EXAMPLE', dns_hosts=[DnsHost(fqdn='ns.example.org', ip_addresses=[])])
+        self.keyset_mock.get_keyset_id.return_value = 'ID-EXAMPLE'
+        self.keyset_mock.get_keyset_info.return_value = Keyset(
+            keyset_id='ID-EXAMPLE', keyset_handle='EXAMPLE',
+            dns_keys=[DnsKey(flags=42, protocol=3, alg=-15, key='Gazpacho!')])
+        events = ObjectEvents(
+            registered=ObjectEvent(registrar_handle='DIVADROID', timestamp=datetime(1988, 9, 6, tzinfo=timezone.utc)),
+            transferred=ObjectEvent(registrar_handle='QUEEG-500'))
+        domain = Domain(domain_id='EXAMPLE', fqdn='example.org', sponsoring_registrar='HOLLY', events=events,
+                        registrant='2X4B', expires_at=datetime(1999, 4, 5, tzinfo=timezone.utc),
+                        administrative_contacts=['ID-RIMMER', 'ID-LISTER', 'ID-CAT'], nsset='EXAMPLE',
+                        keyset='EXAMPLE')
+
+        result = domain_to_dict(domain, self.request)
+        with patch('rdap.rdap_rest.domain.BACKEND_EXECUTOR', new=BackendExecutor(4)):
+            concurrent_result = domain_to_dict(domain, self.request)
+
+        self.assertEqual(json.dumps(concurrent_result), json.dumps(result))
+        self.assertEqual([e['handle'] for e in result['entities']], ['KRYTEN', 'HOLLY', 'RIMMER', 'LISTER', 'CAT'])
+
+    async def test_async(self):
+        handles = {'2X4B': 'KRYTEN', 'ID-RIMMER': 'RIMMER'}
+        nsset = Nsset(nsset_id='ID-EXAMPLE', nsset_handle='EXAMPLE',
+                      dns_hosts=[DnsHost(fqdn='ns.example.org', ip_addresses=[])])
+        keyset = Keyset(keyset_id='ID-EXAMPLE', keyset_handle='EXAMPLE',
+                        dns_keys=[DnsKey(flags=42, protocol=3, alg=-15, key='Gazpacho!')])
+        self.contact_mock.get_contact_handle.side_effect = handles.get
+        self.domain_mock.get_domain_state.return_value = {}
+        self.nsset_mock.get_nsset_id.return_value = 'ID-EXAMPLE'
+        self.nsset_mock.get_nsset_info.return_value = nsset
+        self.keyset_mock.get_keyset_id.return_value = 'ID-EXAMPLE'
+        self.keyset_mock.get_keyset_info.return_value = keyset
+        async_contact = Mock(get_contact_handle=AsyncMock(side_effect=handles.get))
+        async_domain = Mock(get_domain_state=AsyncMock(return_value={}))
+        async_nsset = Mock(get_nsset_id=AsyncMock(return_value='ID-EXAMPLE'),
+                           get_nsset_info=AsyncMock(return_value=nsset))
+        async_keyset = Mock(get_keyset_id=AsyncMock(return_value='ID-EXAMPLE'),
+                            get_keyset_info=AsyncMock(return_value=keyset))
+        events = ObjectEvents(
+            registered=ObjectEvent(registrar_handle='DIVADROID', timestamp=datetime(1988, 9, 6, tzinfo=timezone.utc)),
+            transferred=ObjectEvent(registrar_handle='QUEEG-500'))
+        domain = Domain(domain_id='EXAMPLE', fqdn='example.org', sponsoring_registrar='HOLLY', events=events,
+                        registrant='2X4B', expires_at=datetime(1999, 4, 5, tzinfo=timezone.utc),
+                        administrative_contacts=['ID-RIMMER'], nsset='EXAMPLE', keyset='EXAMPLE')
+
+        result = domain_to_dict(domain, self.request)
+        with patch.multiple('rdap.rdap_rest.domain', ASYNC_CONTACT_CLIENT=async_contact,
+                            ASYNC_DOMAIN_CLIENT=async_domain, ASYNC_NSSET_CLIENT=async_nsset,
+                            ASYNC_KEYSET_CLIENT=async_keyset):
+            async_result = await domain_to_dict_async(domain, self.request)
+
+        self.assertEqual(json.dumps(async_result), json.dumps(result))
+
+    async def test_async_simple(self):
+        self.domain_mock.get_domain_state.return_value = {}
+        async_contact = Mock(get_contact_handle=AsyncMock(return_value='KRYTEN'))
+        async_domain = Mock(get_domain_state=AsyncMock(return_value={}))
+        events = ObjectEvents(
+            registered=ObjectEvent(registrar_handle='DIVADROID', timestamp=datetime(1988, 9, 6, tzinfo=timezone.utc)),
+            transferred=ObjectEvent(registrar_handle='QUEEG-500'))
+        domain = Domain(domain_id='EXAMPLE', fqdn='example.org', sponsoring_registrar='HOLLY', events=events,
+                        registrant='2X4B', expires_at=datetime(1999, 4, 5, tzinfo=timezone.utc))
+
+        result = domain_to_dict(domain, self.request)
+        with patch.multiple('rdap.rdap_rest.domain', ASYNC_CONTACT_CLIENT=async_contact,
+                            ASYNC_DOMAIN_CLIENT=async_domain):
+            async_result = await domain_to_dict_async(domain, self.request)
+
+        self.assertEqual(json.dumps(async_result), json.dumps(result))
+
 
 @override_settings(ALLOWED_HOSTS=['rdap.example'], RDAP_UNIX_WHOIS=None)
 class TestContactToDict(SimpleTestCase):
@@ -455,7 +532,7 @@ class TestKeysetToDict(SimpleTestCase):
         patcher = patch('rdap.rdap_rest.keyset.KEYSET_CLIENT', spec=('get_keyset_state', ))
         self.addCleanup(patcher.stop)
         self.keyset_mock = patcher.start()
-        patcher = patch('rdap.rdap_rest.keyset.CONTACT_CLIENT', spec=('get_contact_info', ))
+        patcher = patch('rdap.rdap_rest.keyset.CONTACT_CLIENT', spec=('get_contact_handle', ))
         self.addCleanup(patcher.stop)
         self.contact_mock = patcher.start()
 
@@ -503,7 +580,7 @@ class TestKeysetToDict(SimpleTestCase):
         self._test(keyset, {ObjectStatus.LINKED: True}, data)
 
     def test_tech_contacts(self):
-        self.contact_mock.get_contact_info.return_value = Contact(contact_id='ID-RIMMER', contact_handle='RIMMER')
+        self.contact_mock.get_contact_handle.return_value = 'RIMMER'
         events = ObjectEvents(
             registered=ObjectEvent(registrar_handle='DIVADROID', timestamp=datetime(1988, 9, 6, tzinfo=timezone.utc)),
             transferred=ObjectEvent(registrar_handle='QUEEG-500'))
@@ -557,6 +634,29 @@ class TestKeysetToDict(SimpleTestCase):
         }
         self._test(keyset, {}, data)
 
+    async def test_async(self):
+        handles = {'ID-RIMMER': 'RIMMER', 'ID-LISTER': 'LISTER'}
+        self.contact_mock.get_contact_handle.side_effect = handles.get
+        self.keyset_mock.get_keyset_state.return_value = {ObjectStatus.LINKED: True}
+        async_contact = Mock(get_contact_handle=AsyncMock(side_effect=handles.get))
+        async_keyset = Mock(get_keyset_state=AsyncMock(return_value={ObjectStatus.LINKED: True}))
+        events = ObjectEvents(
+            registered=ObjectEvent(registrar_handle='DIVADROID', timestamp=datetime(1988, 9, 6, tzinfo=timezone.utc)),
+            transferred=ObjectEvent(registrar_handle='QUEEG-500'))
+        keyset = Keyset(keyset_id='2X4B', keyset_handle='KRYTEN', sponsoring_registrar='HOLLY', events=events,
+                        technical_contacts=['ID-RIMMER', 'ID-LISTER', 'ID-RIMMER'],
+                        dns_keys=[DnsKey(flags=42, protocol=3, alg=-15, key='Gazpacho!')])
+
+        result = keyset_to_dict(keyset, self.request)
+        with patch.multiple('rdap.rdap_rest.keyset', ASYNC_CONTACT_CLIENT=async_contact,
+                            ASYNC_KEYSET_CLIENT=async_keyset):
+            async_result = await keyset_to_dict_async(keyset, self.request)
+
+        self.assertEqual(json.dumps(async_result), json.dumps(result))
+        async_keyset.get_keyset_state.assert_awaited_once_with('2X4B')
+        # Duplicate contacts are fetched only once.
+        self.assertEqual(async_contact.get_contact_handle.await_count, 2)
+
 
 @override_settings(ALLOWED_HOSTS=['rdap.example'])
 class TestNameserverToDict(SimpleTestCase):
@@ -594,7 +694,7 @@ class TestNssetToDict(SimpleTestCase):
         patcher = patch('rdap.rdap_rest.nsset.NSSET_CLIENT', spec=('get_nsset_state', ))
         self.addCleanup(patcher.stop)
         self.nsset_mock = patcher.start()
-        patcher = patch('rdap.rdap_rest.nsset.CONTACT_CLIENT', spec=('get_contact_info', ))
+        patcher = patch('rdap.rdap_rest.nsset.CONTACT_CLIENT', spec=('get_contact_handle', ))
         self.addCleanup(patcher.stop)
         self.contact_mock = patcher.start()
 
@@ -643,7 +743,7 @@ class TestNssetToDict(SimpleTestCase):
         self._test(nsset, {ObjectStatus.LINKED: True}, data)
 
     def test_tech_contacts(self):
-        self.contact_mock.get_contact_info.return_value = Contact(contact_id='ID-RIMMER', contact_handle='RIMMER')
+        self.contact_mock.get_contact_handle.return_value = 'RIMMER'
         events = ObjectEvents(
             registered=ObjectEvent(registrar_handle='DIVADROID', timestamp=datetime(1988, 9, 6, tzinfo=timezone.utc)),
             transferred=ObjectEvent(registrar_handle='QUEEG-500'))
@@ -659,6 +759,28 @@ class TestNssetToDict(SimpleTestCase):
         })
         self._test(nsset, {}, {'entities': entities})
 
+    def test_tech_contacts_concurrent(self):
+        self.contact_mock.get_contact_handle.side_effect = {'ID-RIMMER': 'RIMMER', 'ID-LISTER': 'LISTER'}.get
+        events = ObjectEvents(
+            registered=ObjectEvent(registrar_handle='DIVADROID', timestamp=datetime(1988, 9, 6, tzinfo=timezone.utc)),
+            transferred=ObjectEvent(registrar_handle='QUEEG-500'))
+        nsset = Nsset(nsset_id='2X4B', nsset_handle='KRYTEN', sponsoring_registrar='HOLLY', events=events,
+                      technical_contacts=['ID-RIMMER', 'ID-LISTER', 'ID-RIMMER'])
+        entities = [{'objectClassName': ObjectClassName.ENTITY, 'handle': 'HOLLY', 'roles': ['registrar']}]
+        for handle in ('RIMMER', 'LISTER', 'RIMMER'):
+            link = 'http://rdap.example/entity/{}'.format(handle)
+            entities.append({
+                'objectClassName': ObjectClassName.ENTITY,
+                'handle': handle,
+                'roles': ['technical'],
+                'links': [{'value': link, 'rel': 'self', 'href': link, 'type': 'application/rdap+json'}],
+            })
+
+        with patch('rdap.rdap_rest.nsset.BACKEND_EXECUTOR', new=BackendExecutor(4)):
+            self._test(nsset, {}, {'entities': entities})
+
+        self.assertEqual(self.contact_mock.get_contact_handle.call_count, 2)
+
     def test_nameserver_empty(self):
         events = ObjectEvents(
             registered=ObjectEvent(registrar_handle='DIVADROID', timestamp=datetime(1988, 9, 6, tzinfo=timezone.utc)),
@@ -722,3 +844,26 @@ class TestNssetToDict(SimpleTestCase):
             'events': events_data,
         }
         self._test(nsset, {}, data)
+
+    async def test_async(self):
+        handles = {'ID-RIMMER': 'RIMMER', 'ID-LISTER': 'LISTER'}
+        self.contact_mock.get_contact_handle.side_effect = handles.get
+        self.nsset_mock.get_nsset_state.return_value = {ObjectStatus.LINKED: True}
+        async_contact = Mock(get_contact_handle=AsyncMock(side_effect=handles.get))
+        async_nsset = Mock(get_nsset_state=AsyncMock(return_value={ObjectStatus.LINKED: True}))
+        events = ObjectEvents(
+            registered=ObjectEvent(registrar_handle='DIVADROID', timestamp=datetime(1988, 9, 6, tzinfo=timezone.utc)),
+            transferred=ObjectEvent(registrar_handle='QUEEG-500'))
+        nsset = Nsset(nsset_id='2X4B', nsset_handle='KRYTEN', sponsoring_registrar='HOLLY', events=events,
+                      technical_contacts=['ID-RIMMER', 'ID-LISTER', 'ID-RIMMER'],
+                      dns_hosts=[DnsHost(fqdn='ns.example.org', ip_addresses=[IPv4Address('127.0.0.1')])])
+
+        result = nsset_to_dict(nsset, self.request)
+        with patch.multiple('rdap.rdap_rest.nsset', ASYNC_CONTACT_CLIENT=async_contact,
+                            ASYNC_NSSET_CLIENT=async_nsset):
+            async_result = await nsset_to_dict_async(nsset, self.request)
+
+        self.assertEqual(json.dumps(async_result), json.dumps(result))
+        async_nsset.get_nsset_state.assert_awaited_once_with('2X4B')
+        # Duplicate contacts are fetched only once.
+        self.assertEqual(async_contact.get_contact_handle.await_count, 2)
@@ -16,11 +16,19 @@
 # You should have received a copy of the GNU General Public License
 # along with FRED.  If not, see <https://www.gnu.org/licenses/>.
 #
-from unittest.mock import call, patch, sentinel
+import json
+import os
+import subprocess
+import sys
+from threading import Event
+from unittest.mock import Mock, call, patch, sentinel
 
-from django.test import SimpleTestCase
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
 
-from rdap.settings import LoggerOptionsSetting
+from rdap.clients import CircuitBreaker, DeadlineExceeded, LoadBalancer, request_deadline
+from rdap.settings import LoggerOptionsSetting, NetlocSetting, _guard, _make_client_pool
 
 
 class LoggerOptionsSettingTest(SimpleTestCase):
@@ -38,3 +46,139 @@ class LoggerOptionsSettingTest(SimpleTestCase):
             self.assertEqual(setting.transform({'credentials': {'ssl_cert': sentinel.cert}}),
                              {'credentials': sentinel.result})
         self.assertEqual(cred_mock.mock_calls, [call(ssl_cert=sentinel.cert)])
+
+
+class NetlocSettingTest(SimpleTestCase):
+    def test_check(self):
+        setting = NetlocSetting(name='NETLOC')
+        for value in ('localhost:50051', ['localhost:50051'], ['localhost:50051', 'localhost:50052']):
+            with self.subTest(value=value):
+                with override_settings(NETLOC=value):
+                    setting.check()
+
+    def test_check_invalid(self):
+        setting = NetlocSetting(name='NETLOC')
+        for value in ([], [50051], 50051, None):
+            with self.subTest(value=value):
+                with override_settings(NETLOC=value):
+                    with self.assertRaises(ImproperlyConfigured):
+                        setting.check()
+
+    def test_environ(self):
+        setting = NetlocSetting(name='NETLOC')
+        for environ, value in (('registry:50051', ['registry:50051']),
+                               ('["registry:50051", "registry:50052"]', ['registry:50051', 'registry:50052'])):
+            with self.subTest(environ=environ):
+                with patch.dict(os.environ, NETLOC=environ):
+                    setting.check()
+                    self.assertEqual(setting.value, value)
+
+    def test_transform(self):
+        setting = NetlocSetting()
+        self.assertEqual(setting.transform('localhost:50051'), ['localhost:50051'])
+        self.assertEqual(setting.transform(('localhost:50051', 'localhost:50052')),
+                         ['localhost:50051', 'localhost:50052'])
+
+
+@patch('rdap.settings._get_credentials', return_value=sentinel.credentials)
+class MakeClientPoolTest(SimpleTestCase):
+    def test_single_endpoint(self, credentials_mock):
+        client_cls = Mock()
+        with override_settings(RDAP_REGISTRY_NETLOC='localhost:50051', RDAP_REGISTRY_CHANNEL_POOL_SIZE=2):
+            pool = _make_client_pool(client_cls, sync=False)
+
+        self.assertNotIsInstance(pool, LoadBalancer)
+        self.assertEqual(len(pool.clients), 2)
+        self.assertEqual([c[0][:2] for c in client_cls.call_args_list],
+                         [('localhost:50051', sentinel.credentials)] * 2)
+
+    def test_endpoints(self, credentials_mock):
+        client_cls = Mock()
+        with override_settings(RDAP_REGISTRY_NETLOC=['localhost:50051', 'localhost:50052'],
+                               RDAP_REGISTRY_CHANNEL_POOL_SIZE=2):
+            pool = _make_client_pool(client_cls, sync=False)
+
+        self.assertIsInstance(pool, LoadBalancer)
+        self.assertEqual([len(endpoint.clients) for endpoint in pool.clients], [2, 2])
+        self.assertEqual([c[0][0] for c in client_cls.call_args_list],
+                         ['localhost:50051', 'localhost:50051', 'localhost:50052', 'localhost:50052'])
+
+
+class GuardTest(SimpleTestCase):
+    def test_deadline_exceeded(self):
+        client = Mock(spec=('get_domain_id', ))
+        breaker = CircuitBreaker(4, 0.5)
+        with patch('rdap.settings.CIRCUIT_BREAKER', new=breaker):
+            guarded = _guard(client)
+
+        with request_deadline(0):
+            for i in range(4):
+                with self.assertRaises(DeadlineExceeded):
+                    guarded.get_domain_id('example.org')
+
+        # Calls rejected by the deadline are not backend failures.
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(list(breaker._results), [])
+        self.assertEqual(client.mock_calls, [])
+
+    def test_slow_call(self):
+        release = Event()
+        client = Mock(spec=('get_domain_id', ))
+        client.get_domain_id.side_effect = lambda *args: release.wait(5)
+        breaker = CircuitBreaker(1, 1)
+        with patch('rdap.settings.CIRCUIT_BREAKER', new=breaker):
+            guarded = _guard(client)
+
+        with patch.object(breaker, 'record', wraps=breaker.record) as record_mock:
+            with request_deadline(0.01):
+                with self.assertRaises(DeadlineExceeded):
+                    guarded.get_domain_id('example.org')
+            release.set()
+            guarded._executor.shutdown()
+
+        # Abandoned call is recorded, when it finishes.
+        self.assertEqual(len(record_mock.mock_calls), 1)
+
+
+# Script which imports the application and reports the import time, created lazy objects and started threads.
+IMPORT_SCRIPT = """
+import json
+import threading
+from time import monotonic
+
+start = monotonic()
+import django
+django.setup()
+import rdap.async_urls
+import rdap.urls
+duration = monotonic() - start
+
+from django.utils.functional import empty
+from rdap import settings, views
+names = ('CONTACT_CLIENT', 'DOMAIN_CLIENT', 'KEYSET_CLIENT', 'NSSET_CLIENT', 'ASYNC_CONTACT_CLIENT',
+         'ASYNC_DOMAIN_CLIENT', 'ASYNC_KEYSET_CLIENT', 'ASYNC_NSSET_CLIENT', 'CONTACT_CLIENT_POOL',
+         'DOMAIN_CLIENT_POOL', 'KEYSET_CLIENT_POOL', 'NSSET_CLIENT_POOL')
+created = [n for n in names if getattr(settings, n)._wrapped is not empty]
+if views.LOGGER._wrapped is not empty:
+    created.append('LOGGER')
+if settings._get_credentials.cache_info().currsize:
+    created.append('credentials')
+threads = [t.name for t in threading.enumerate() if t is not threading.main_thread()]
+print(json.dumps({'duration': duration, 'created': created, 'threads': threads}))
+"""
+# Maximal time in seconds to import the application.
+# The budget is generous to catch only blocking calls, e.g. connecting to the registry, not slow machines.
+IMPORT_TIME_BUDGET = 10.0
+
+
+class ImportTest(SimpleTestCase):
+    def test_import(self):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT], stdout=subprocess.PIPE, env=env,
+                                check=True).stdout
+        result = json.loads(output)
+
+        # Clients and logger are only created on their first use.
+        self.assertEqual(result['created'], [])
+        self.assertEqual(result['threads'], [])
+        self.assertLess(result['duration'], IMPORT_TIME_BUDGET)
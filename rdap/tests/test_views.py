@@ -16,15 +16,25 @@
 # You should have received a copy of the GNU General Public License
 # along with FRED.  If not, see <https://www.gnu.org/licenses/>.
 #
+import asyncio
 import json
-from unittest.mock import patch
+from datetime import datetime, timezone
+from hashlib import sha256
+from threading import get_ident
+from unittest.mock import ANY, AsyncMock, Mock, call, patch, sentinel
 
-from django.test import Client, SimpleTestCase
+from django.core.cache import caches
+from django.test import Client, RequestFactory, SimpleTestCase, override_settings
 from grill.utils import TestLogEntry, TestLoggerClient
-from regal import Contact
+from regal import Contact, ObjectEvent, ObjectEvents
 from regal.exceptions import ContactDoesNotExist
 
+from rdap.cache import LruCache
+from rdap.clients import CircuitOpen, DeadlineExceeded
 from rdap.constants import LOGGER_SERVICE, LogEntryType, LogResult
+from rdap.limits import ConcurrencyLimiter, RateLimiter
+from rdap.logger import QueuedLoggerClient
+from rdap.views import ObjectView, RenderedResponse, _make_logger, _refresh_done, get_cache_control, get_client_address
 
 
 class EnforcingCsrfClient(Client):
@@ -36,12 +46,82 @@ class EnforcingCsrfClient(Client):
         super(EnforcingCsrfClient, self).__init__(enforce_csrf_checks=True, **defaults)
 
 
+class GetCacheControlTest(SimpleTestCase):
+    def test_default(self):
+        self.assertEqual(get_cache_control('domain'), {'public': True, 'max_age': 60, 'stale_while_revalidate': 60})
+        self.assertEqual(get_cache_control('help'), {'public': True, 'max_age': 86400})
+
+    def test_unknown(self):
+        self.assertEqual(get_cache_control('gazpacho'), {})
+        self.assertEqual(get_cache_control(None), {})
+
+    def test_status(self):
+        self.assertEqual(get_cache_control('domain', ['active', 'pending delete']), {'public': True, 'max_age': 10})
+        self.assertEqual(get_cache_control('domain', ['active']),
+                         {'public': True, 'max_age': 60, 'stale_while_revalidate': 60})
+
+    @override_settings(RDAP_CACHE_CONTROL={'domain': {'no_cache': True}}, RDAP_CACHE_CONTROL_STATUSES={})
+    def test_custom(self):
+        self.assertEqual(get_cache_control('domain', ['pending delete']), {'no_cache': True})
+
+
+class GetClientAddressTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_remote_addr(self):
+        request = self.factory.get('/', REMOTE_ADDR='192.0.2.1', HTTP_X_FORWARDED_FOR='198.51.100.1')
+        self.assertEqual(get_client_address(request), '192.0.2.1')
+
+    @override_settings(RDAP_RATE_LIMIT_PROXIES=1)
+    def test_proxy(self):
+        request = self.factory.get('/', REMOTE_ADDR='192.0.2.1', HTTP_X_FORWARDED_FOR='203.0.113.1, 198.51.100.1')
+        self.assertEqual(get_client_address(request), '198.51.100.1')
+
+    @override_settings(RDAP_RATE_LIMIT_PROXIES=2)
+    def test_proxies(self):
+        request = self.factory.get('/', REMOTE_ADDR='192.0.2.1', HTTP_X_FORWARDED_FOR='203.0.113.1, 198.51.100.1')
+        self.assertEqual(get_client_address(request), '203.0.113.1')
+
+    @override_settings(RDAP_RATE_LIMIT_PROXIES=1)
+    def test_proxy_no_header(self):
+        request = self.factory.get('/', REMOTE_ADDR='192.0.2.1')
+        self.assertEqual(get_client_address(request), '192.0.2.1')
+
+
+class MakeLoggerTest(SimpleTestCase):
+    @override_settings(RDAP_LOGGER='grill.TestLoggerClient', RDAP_LOGGER_OPTIONS={'netloc': sentinel.netloc})
+    def test_make_logger(self):
+        with patch('rdap.views.get_logger_client', autospec=True) as get_client_mock:
+            logger = _make_logger()
+
+        self.assertIs(logger.client, get_client_mock.return_value)
+        self.assertEqual(get_client_mock.mock_calls, [
+            call('grill.TestLoggerClient', netloc=sentinel.netloc),
+            call().register_service(LOGGER_SERVICE, handle='rdap_'),
+            call().register_log_entry_types(LOGGER_SERVICE, LogEntryType),
+            call().register_results(LOGGER_SERVICE, LogResult),
+        ])
+
+    @override_settings(RDAP_LOGGER_QUEUE_SIZE=10)
+    def test_make_logger_queue(self):
+        with patch('rdap.views.get_logger_client', autospec=True) as get_client_mock:
+            logger = _make_logger()
+
+        self.assertIsInstance(logger.client, QueuedLoggerClient)
+        self.assertIs(logger.client.client, get_client_mock.return_value)
+        self.assertEqual(logger.client.max_size, 10)
+
+
 class TestObjectView(SimpleTestCase):
     """
     Test `ObjectView` class.
     """
     client_class = EnforcingCsrfClient
 
+    # Hashed part of the shared cache key of the entity.
+    shared_url = 'http://testserver/{}/kryten'.format(LogEntryType.ENTITY_LOOKUP)
+
     def setUp(self):
         self.test_logger = TestLoggerClient()
         log_patcher = patch('rdap.views.LOGGER.client', new=self.test_logger)
@@ -66,12 +146,29 @@ class TestObjectView(SimpleTestCase):
         result = json.loads(response.content.decode())
         self.assertEqual(result['objectClassName'], 'entity')
         self.assertEqual(result['handle'], 'kryten')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60, stale-while-revalidate=60')
 
         # Check logger
         log_entry = TestLogEntry(LOGGER_SERVICE, LogEntryType.ENTITY_LOOKUP, LogResult.SUCCESS, source_ip='127.0.0.1',
                                  input_properties={'handle': 'kryten'})
         self.assertEqual(self.test_logger.mock.mock_calls, log_entry.get_calls())
 
+    @override_settings(RDAP_CACHE_CONTROL={})
+    def test_entity_no_cache_control(self):
+        patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT',
+                        spec=('get_contact_info', 'get_contact_id', 'get_contact_state'))
+        with patcher as contact_mock:
+            contact = Contact(contact_id='2X4B', contact_handle='kryten', sponsoring_registrar='HOLLY')
+            contact_mock.get_contact_id.return_value = '2X4B'
+            contact_mock.get_contact_info.return_value = contact
+            contact_mock.get_contact_state.return_value = {}
+
+            with patch('rdap.rdap_rest.entity.CONTACT_CLIENT', new=contact_mock):
+                response = self.client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Cache-Control', response)
+
     def test_disclaimer(self):
         patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT',
                         spec=('get_contact_info', 'get_contact_id', 'get_contact_state'))
@@ -92,6 +189,231 @@ class TestObjectView(SimpleTestCase):
         self.assertEqual(result['handle'], 'kryten')
         self.assertIn({'title': 'Disclaimer', 'description': ['Quagaars!']}, result['notices'])
 
+    def test_entity_etag(self):
+        patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT',
+                        spec=('get_contact_info', 'get_contact_id', 'get_contact_state'))
+        with patcher as contact_mock:
+            events = ObjectEvents(
+                registered=ObjectEvent(registrar_handle='HOLLY', timestamp=datetime(1988, 9, 6, tzinfo=timezone.utc)),
+                transferred=ObjectEvent(registrar_handle='HOLLY'))
+            contact = Contact(contact_id='2X4B', contact_handle='kryten', sponsoring_registrar='HOLLY', events=events)
+            contact_mock.get_contact_id.return_value = '2X4B'
+            contact_mock.get_contact_info.return_value = contact
+            contact_mock.get_contact_state.return_value = {'linked': True}
+
+            with patch('rdap.rdap_rest.entity.CONTACT_CLIENT', new=contact_mock):
+                response = self.client.get('/entity/kryten')
+                not_modified = self.client.get('/entity/kryten', HTTP_IF_NONE_MATCH=response['ETag'])
+                modified = self.client.get('/entity/kryten', HTTP_IF_NONE_MATCH='"gazpacho"')
+                # Object state or linked objects may change without a change of the object itself.
+                modified_since = self.client.get('/entity/kryten',
+                                                 HTTP_IF_MODIFIED_SINCE='Tue, 06 Sep 1988 00:00:00 GMT')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"{}"'.format(sha256(response.content).hexdigest()))
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        self.assertEqual(modified.status_code, 200)
+        self.assertEqual(modified.content, response.content)
+        self.assertEqual(modified_since.status_code, 200)
+
+    def test_entity_cached(self):
+        patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT',
+                        spec=('get_contact_info', 'get_contact_id', 'get_contact_state'))
+        with patcher as contact_mock:
+            contact = Contact(contact_id='2X4B', contact_handle='kryten', sponsoring_registrar='HOLLY')
+            contact_mock.get_contact_id.return_value = '2X4B'
+            contact_mock.get_contact_info.return_value = contact
+            contact_mock.get_contact_state.return_value = {}
+
+            with patch('rdap.rdap_rest.entity.CONTACT_CLIENT', new=contact_mock):
+                with patch('rdap.views.RESPONSE_CACHE', new=LruCache(10)) as cache:
+                    response = self.client.get('/entity/kryten')
+                    cached_response = self.client.get('/entity/KRYTEN')
+
+        self.assertEqual(cached_response.status_code, 200)
+        self.assertEqual(cached_response['Content-Type'], 'application/rdap+json')
+        self.assertEqual(cached_response.content, response.content)
+        self.assertEqual(contact_mock.get_contact_id.call_count, 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # Check logger
+        log_entry = TestLogEntry(LOGGER_SERVICE, LogEntryType.ENTITY_LOOKUP, LogResult.SUCCESS, source_ip='127.0.0.1',
+                                 input_properties={'handle': 'kryten'})
+        cached_log_entry = TestLogEntry(LOGGER_SERVICE, LogEntryType.ENTITY_LOOKUP, LogResult.SUCCESS,
+                                        source_ip='127.0.0.1', input_properties={'handle': 'KRYTEN'})
+        self.assertEqual(self.test_logger.mock.mock_calls, log_entry.get_calls() + cached_log_entry.get_calls())
+
+    def test_entity_cache_timeouts(self):
+        patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT',
+                        spec=('get_contact_info', 'get_contact_id', 'get_contact_state'))
+        with patcher as contact_mock:
+            contact = Contact(contact_id='2X4B', contact_handle='kryten', sponsoring_registrar='HOLLY')
+            contact_mock.get_contact_id.return_value = '2X4B'
+            contact_mock.get_contact_info.return_value = contact
+            contact_mock.get_contact_state.return_value = {}
+
+            with patch('rdap.rdap_rest.entity.CONTACT_CLIENT', new=contact_mock):
+                with patch('rdap.views.RESPONSE_CACHE', new=LruCache(10)) as cache:
+                    with self.settings(RDAP_RESPONSE_CACHE_TIMEOUTS={'entity': 0}):
+                        self.client.get('/entity/kryten')
+                        self.client.get('/entity/kryten')
+
+        self.assertEqual(contact_mock.get_contact_id.call_count, 2)
+        self.assertEqual(len(cache), 0)
+
+    @override_settings(RDAP_RESPONSE_CACHE_STALE_TIMEOUT=60)
+    def test_entity_stale(self):
+        patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT',
+                        spec=('get_contact_info', 'get_contact_id', 'get_contact_state'))
+        with patcher as contact_mock:
+            contact = Contact(contact_id='2X4B', contact_handle='kryten', sponsoring_registrar='HOLLY')
+            contact_mock.get_contact_id.return_value = '2X4B'
+            contact_mock.get_contact_info.return_value = contact
+            contact_mock.get_contact_state.return_value = {}
+
+            with patch('rdap.rdap_rest.entity.CONTACT_CLIENT', new=contact_mock):
+                with patch('rdap.views.RESPONSE_CACHE', new=LruCache(10)) as cache:
+                    with patch('rdap.views.REFRESHER', autospec=True) as refresher_mock:
+                        with patch('rdap.cache.monotonic', return_value=100) as monotonic_mock:
+                            response = self.client.get('/entity/kryten')
+                            monotonic_mock.return_value = 200
+                            stale_response = self.client.get('/entity/kryten')
+
+                            self.assertEqual(contact_mock.get_contact_id.call_count, 1)
+                            self.assertEqual(len(refresher_mock.submit.mock_calls), 1)
+                            # Run the refresh
+                            refresher_mock.submit.mock_calls[0].args[1]()
+
+                            self.assertEqual(contact_mock.get_contact_id.call_count, 2)
+                            key = (LogEntryType.ENTITY_LOOKUP, 'kryten', 'http', 'testserver')
+                            self.assertFalse(cache.get_entry(key).stale)
+
+        self.assertEqual(stale_response.status_code, 200)
+        self.assertEqual(stale_response.content, response.content)
+
+    @override_settings(RDAP_RESPONSE_CACHE_STALE_TIMEOUT=60)
+    def test_entity_stale_deleted(self):
+        patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT',
+                        spec=('get_contact_info', 'get_contact_id', 'get_contact_state'))
+        with patcher as contact_mock:
+            contact = Contact(contact_id='2X4B', contact_handle='kryten', sponsoring_registrar='HOLLY')
+            contact_mock.get_contact_id.return_value = '2X4B'
+            contact_mock.get_contact_info.return_value = contact
+            contact_mock.get_contact_state.return_value = {}
+
+            with patch('rdap.rdap_rest.entity.CONTACT_CLIENT', new=contact_mock):
+                with patch('rdap.views.RESPONSE_CACHE', new=LruCache(10)) as cache:
+                    with patch('rdap.views.REFRESHER', autospec=True) as refresher_mock:
+                        with patch('rdap.cache.monotonic', return_value=100) as monotonic_mock:
+                            self.client.get('/entity/kryten')
+                            monotonic_mock.return_value = 200
+                            self.client.get('/entity/kryten')
+
+                            contact_mock.get_contact_id.side_effect = ContactDoesNotExist
+                            with self.assertRaises(ContactDoesNotExist):
+                                refresher_mock.submit.mock_calls[0].args[1]()
+
+        self.assertEqual(len(cache), 0)
+
+    @override_settings(CACHES={'rdap': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                       RDAP_SHARED_CACHE='rdap')
+    def test_entity_shared_cache(self):
+        patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT',
+                        spec=('get_contact_info', 'get_contact_id', 'get_contact_state'))
+        with patcher as contact_mock:
+            contact = Contact(contact_id='2X4B', contact_handle='kryten', sponsoring_registrar='HOLLY')
+            contact_mock.get_contact_id.return_value = '2X4B'
+            contact_mock.get_contact_info.return_value = contact
+            contact_mock.get_contact_state.return_value = {}
+
+            with patch('rdap.rdap_rest.entity.CONTACT_CLIENT', new=contact_mock):
+                response = self.client.get('/entity/kryten')
+                # Simulate a different worker with an empty in-process cache.
+                with patch('rdap.views.RESPONSE_CACHE', new=LruCache(10)) as cache:
+                    cached_response = self.client.get('/entity/kryten')
+                    self.assertEqual(len(cache), 1)
+
+        self.assertEqual(cached_response.status_code, 200)
+        self.assertEqual(cached_response.content, response.content)
+        self.assertEqual(contact_mock.get_contact_id.call_count, 1)
+        cached = caches['rdap'].get('rdap:entity:{}'.format(sha256(self.shared_url.encode()).hexdigest()))
+        self.assertEqual(cached.content, response.content)
+
+    @override_settings(CACHES={'rdap': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                       RDAP_SHARED_CACHE='rdap', RDAP_SHARED_CACHE_LOCK_TIMEOUT=10)
+    def test_entity_shared_cache_lock(self):
+        cache_key = 'rdap:entity:{}'.format(sha256(self.shared_url.encode()).hexdigest())
+        caches['rdap'].clear()
+        patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT',
+                        spec=('get_contact_info', 'get_contact_id', 'get_contact_state'))
+        with patcher as contact_mock:
+            contact = Contact(contact_id='2X4B', contact_handle='kryten', sponsoring_registrar='HOLLY')
+            contact_mock.get_contact_id.return_value = '2X4B'
+            contact_mock.get_contact_info.return_value = contact
+            contact_mock.get_contact_state.return_value = {}
+
+            with patch('rdap.rdap_rest.entity.CONTACT_CLIENT', new=contact_mock):
+                with patch('rdap.views.RESPONSE_CACHE', new=LruCache(10)):
+                    with patch.object(caches['rdap'], 'add', wraps=caches['rdap'].add) as add_mock:
+                        response = self.client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content.decode())['handle'], 'kryten')
+        self.assertEqual(add_mock.mock_calls, [call(cache_key + ':lock', True, 10)])
+        self.assertEqual(caches['rdap'].get(cache_key).content, response.content)
+        self.assertIsNone(caches['rdap'].get(cache_key + ':lock'))
+
+    @override_settings(CACHES={'rdap': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                       RDAP_SHARED_CACHE='rdap', RDAP_SHARED_CACHE_TIMEOUT=42)
+    def test_entity_shared_cache_timeout(self):
+        cache_key = 'rdap:entity:{}'.format(sha256(self.shared_url.encode()).hexdigest())
+        caches['rdap'].clear()
+        patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT',
+                        spec=('get_contact_info', 'get_contact_id', 'get_contact_state'))
+        with patcher as contact_mock:
+            contact = Contact(contact_id='2X4B', contact_handle='kryten', sponsoring_registrar='HOLLY')
+            contact_mock.get_contact_id.return_value = '2X4B'
+            contact_mock.get_contact_info.return_value = contact
+            contact_mock.get_contact_state.return_value = {}
+
+            with patch('rdap.rdap_rest.entity.CONTACT_CLIENT', new=contact_mock):
+                with patch('rdap.views.RESPONSE_CACHE', new=LruCache(10)):
+                    with patch.object(caches['rdap'], 'set', wraps=caches['rdap'].set) as set_mock:
+                        response = self.client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set_mock.mock_calls, [call(cache_key, ANY, 42)])
+
+    def test_shared_cache_key_request_type(self):
+        # Views without an object class don't share keys.
+        request = RequestFactory().get('/entity/kryten')
+        entity_view = ObjectView(request_type=LogEntryType.ENTITY_LOOKUP)
+        nsset_view = ObjectView(request_type=LogEntryType.NSSET_LOOKUP)
+
+        self.assertNotEqual(entity_view.get_shared_cache_key(request, 'kryten'),
+                            nsset_view.get_shared_cache_key(request, 'kryten'))
+
+    @override_settings(RDAP_SHARED_CACHE='default')
+    def test_entity_shared_cache_error(self):
+        patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT',
+                        spec=('get_contact_info', 'get_contact_id', 'get_contact_state'))
+        with patcher as contact_mock:
+            contact = Contact(contact_id='2X4B', contact_handle='kryten', sponsoring_registrar='HOLLY')
+            contact_mock.get_contact_id.return_value = '2X4B'
+            contact_mock.get_contact_info.return_value = contact
+            contact_mock.get_contact_state.return_value = {}
+
+            with patch('rdap.rdap_rest.entity.CONTACT_CLIENT', new=contact_mock):
+                with patch.object(caches['default'], 'get', side_effect=ConnectionError('Smoke me a kipper')):
+                    with patch.object(caches['default'], 'set', side_effect=ConnectionError('Smoke me a kipper')):
+                        response = self.client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content.decode())['handle'], 'kryten')
+
     def test_entity_not_found(self):
         patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT', spec=('get_contact_id', 'get_contact_info'))
         with patcher as contact_mock:
@@ -108,6 +430,53 @@ class TestObjectView(SimpleTestCase):
                                  input_properties={'handle': 'kryten'})
         self.assertEqual(self.test_logger.mock.mock_calls, log_entry.get_calls())
 
+    @override_settings(RDAP_SHARED_CACHE='default')
+    def test_entity_not_found_shared_cache_error(self):
+        patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT', spec=('get_contact_id', 'get_contact_info'))
+        with patcher as contact_mock:
+            contact_mock.get_contact_id.side_effect = ContactDoesNotExist
+
+            with patch('rdap.views.NOT_FOUND_CACHE', new=LruCache(10)):
+                with patch.object(caches['default'], 'delete', side_effect=ConnectionError('Smoke me a kipper')):
+                    with self.assertLogs(level='WARNING') as logs:
+                        response = self.client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('WARNING:root:Shared cache delete failed: Smoke me a kipper', logs.output)
+
+    def test_entity_not_found_cached(self):
+        patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT', spec=('get_contact_id', 'get_contact_info'))
+        with patcher as contact_mock:
+            contact_mock.get_contact_id.side_effect = ContactDoesNotExist
+
+            with patch('rdap.views.NOT_FOUND_CACHE', new=LruCache(10)) as cache:
+                self.client.get('/entity/kryten')
+                response = self.client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['Content-Type'], 'application/rdap+json')
+        self.assertEqual(contact_mock.get_contact_id.call_count, 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # Check logger
+        log_entry = TestLogEntry(LOGGER_SERVICE, LogEntryType.ENTITY_LOOKUP, LogResult.NOT_FOUND, source_ip='127.0.0.1',
+                                 input_properties={'handle': 'kryten'})
+        self.assertEqual(self.test_logger.mock.mock_calls, log_entry.get_calls() * 2)
+
+    @override_settings(RDAP_NOT_FOUND_CACHE_TIMEOUTS={'entity': 0})
+    def test_entity_not_found_cache_timeouts(self):
+        patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT', spec=('get_contact_id', 'get_contact_info'))
+        with patcher as contact_mock:
+            contact_mock.get_contact_id.side_effect = ContactDoesNotExist
+
+            with patch('rdap.views.NOT_FOUND_CACHE', new=LruCache(10)) as cache:
+                self.client.get('/entity/kryten')
+                response = self.client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(contact_mock.get_contact_id.call_count, 2)
+        self.assertEqual(len(cache), 0)
+
     def test_entity_exception(self):
         patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT', spec=('get_contact_id', 'get_contact_info'))
         with patcher as contact_mock:
@@ -122,6 +491,151 @@ class TestObjectView(SimpleTestCase):
                                  properties={'error': 'Exception'})
         self.assertEqual(self.test_logger.mock.mock_calls, log_entry.get_calls())
 
+    @override_settings(RDAP_REQUEST_DEADLINE=0.5)
+    def test_entity_deadline(self):
+        patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT', spec=('get_contact_id', 'get_contact_info'))
+        with patcher as contact_mock:
+            contact_mock.get_contact_id.side_effect = DeadlineExceeded
+
+            response = self.client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(response['Content-Type'], 'application/rdap+json')
+        self.assertEqual(json.loads(response.content.decode()), {
+            'rdapConformance': ['rdap_level_0', 'fred_version_0'],
+            'errorCode': 504,
+            'title': 'Gateway Timeout',
+            'description': ['Registry did not respond in time.'],
+        })
+
+        # Check logger
+        log_entry = TestLogEntry(LOGGER_SERVICE, LogEntryType.ENTITY_LOOKUP, LogResult.INTERNAL_SERVER_ERROR,
+                                 source_ip='127.0.0.1', input_properties={'handle': 'kryten'},
+                                 properties={'error': 'DeadlineExceeded'})
+        self.assertEqual(self.test_logger.mock.mock_calls, log_entry.get_calls())
+
+    def test_entity_circuit_open(self):
+        patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT', spec=('get_contact_id', 'get_contact_info'))
+        with patcher as contact_mock:
+            contact_mock.get_contact_id.side_effect = CircuitOpen(9.2)
+
+            response = self.client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Content-Type'], 'application/rdap+json')
+        self.assertEqual(response['Retry-After'], '10')
+        self.assertEqual(json.loads(response.content.decode()), {
+            'rdapConformance': ['rdap_level_0', 'fred_version_0'],
+            'errorCode': 503,
+            'title': 'Service Unavailable',
+            'description': ['Registry is temporarily unavailable.'],
+        })
+
+        # Check logger
+        log_entry = TestLogEntry(LOGGER_SERVICE, LogEntryType.ENTITY_LOOKUP, LogResult.INTERNAL_SERVER_ERROR,
+                                 source_ip='127.0.0.1', input_properties={'handle': 'kryten'},
+                                 properties={'error': 'CircuitOpen'})
+        self.assertEqual(self.test_logger.mock.mock_calls, log_entry.get_calls())
+
+    def test_entity_circuit_open_expired(self):
+        patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT',
+                        spec=('get_contact_info', 'get_contact_id', 'get_contact_state'))
+        with patcher as contact_mock:
+            contact = Contact(contact_id='2X4B', contact_handle='kryten', sponsoring_registrar='HOLLY')
+            contact_mock.get_contact_id.return_value = '2X4B'
+            contact_mock.get_contact_info.return_value = contact
+            contact_mock.get_contact_state.return_value = {}
+
+            with patch('rdap.rdap_rest.entity.CONTACT_CLIENT', new=contact_mock):
+                with patch('rdap.views.RESPONSE_CACHE', new=LruCache(10, keep_expired=True)):
+                    with patch('rdap.cache.monotonic', return_value=100) as monotonic_mock:
+                        response = self.client.get('/entity/kryten')
+                        monotonic_mock.return_value = 1000
+                        contact_mock.get_contact_id.side_effect = CircuitOpen(9.2)
+                        with self.assertLogs('root', 'INFO') as log_catcher:
+                            expired_response = self.client.get('/entity/kryten')
+
+        self.assertEqual(expired_response.status_code, 200)
+        self.assertEqual(expired_response.content, response.content)
+        self.assertEqual(log_catcher.output, [
+            "INFO:root:Registry is unavailable, expired response returned: "
+            "({!r}, 'kryten', 'http', 'testserver')".format(LogEntryType.ENTITY_LOOKUP)])
+
+    def test_entity_circuit_open_shared(self):
+        rendered = RenderedResponse(b'{}', '"gazpacho"')
+        shared_cache = Mock(spec=('get', 'set', 'delete'))
+        # Response is cached by another worker, while the registry is called.
+        shared_cache.get.side_effect = [None, rendered]
+        with patch('rdap.views.ObjectView.get_shared_cache', return_value=shared_cache):
+            with patch('rdap.rdap_rest.whois.CONTACT_CLIENT',
+                       spec=('get_contact_id', 'get_contact_info')) as contact_mock:
+                contact_mock.get_contact_id.side_effect = CircuitOpen(9.2)
+                response = self.client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'{}')
+        self.assertEqual(response['ETag'], '"gazpacho"')
+
+    def test_entity_rate_limited(self):
+        limiter = RateLimiter('default', 1, 0)
+        with patch('rdap.views.RATE_LIMITER', new=limiter):
+            with patch('rdap.rdap_rest.whois.CONTACT_CLIENT', spec=('get_contact_id', )) as contact_mock:
+                response = self.client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Content-Type'], 'application/rdap+json')
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(json.loads(response.content.decode()), {
+            'rdapConformance': ['rdap_level_0', 'fred_version_0'],
+            'errorCode': 429,
+            'title': 'Too Many Requests',
+            'description': ['Too many requests from the client.'],
+        })
+        self.assertEqual(contact_mock.mock_calls, [])
+
+        # Check logger
+        log_entry = TestLogEntry(LOGGER_SERVICE, LogEntryType.ENTITY_LOOKUP, LogResult.TOO_MANY_REQUESTS,
+                                 source_ip='127.0.0.1', input_properties={'handle': 'kryten'})
+        self.assertEqual(self.test_logger.mock.mock_calls, log_entry.get_calls())
+
+    def test_entity_overloaded(self):
+        limiter = ConcurrencyLimiter(1)
+        limiter.in_flight = 1
+        patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT', spec=('get_contact_id', 'get_contact_info'))
+        with patch('rdap.views.CONCURRENCY_LIMITER', new=limiter):
+            with patcher as contact_mock:
+                with self.assertLogs('root', 'WARNING'):
+                    response = self.client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Content-Type'], 'application/rdap+json')
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(json.loads(response.content.decode()), {
+            'rdapConformance': ['rdap_level_0', 'fred_version_0'],
+            'errorCode': 503,
+            'title': 'Service Unavailable',
+            'description': ['Server is overloaded.'],
+        })
+        self.assertEqual(contact_mock.mock_calls, [])
+        self.assertEqual(limiter.rejected, 1)
+        # Rejected requests are not logged.
+        self.assertEqual(self.test_logger.mock.mock_calls, [])
+
+    def test_entity_concurrency_limit(self):
+        limiter = ConcurrencyLimiter(10, backoff=0.5)
+        patcher = patch('rdap.rdap_rest.whois.CONTACT_CLIENT', spec=('get_contact_id', 'get_contact_info'))
+        with patch('rdap.views.CONCURRENCY_LIMITER', new=limiter):
+            with patcher as contact_mock:
+                contact_mock.get_contact_id.side_effect = ContactDoesNotExist
+                self.client.get('/entity/kryten')
+                self.assertEqual(limiter.limit, 10)
+
+                contact_mock.get_contact_id.side_effect = DeadlineExceeded
+                self.client.get('/entity/kryten')
+
+        self.assertEqual(limiter.limit, 5)
+        self.assertEqual(limiter.in_flight, 0)
+
     def test_post(self):
         # Test POST returns `Method Not Allowed` response instead of CSRF check failure.
         response = self.client.post('/entity/kryten', {})
@@ -171,6 +685,262 @@ class TestFqdnObjectView(SimpleTestCase):
         self.assertEqual(self.test_logger.mock.mock_calls, [])
 
 
+@override_settings(ROOT_URLCONF='rdap.async_urls')
+class TestAsyncObjectView(SimpleTestCase):
+    """
+    Test `AsyncObjectView` class.
+    """
+
+    def setUp(self):
+        self.test_logger = TestLoggerClient()
+        log_patcher = patch('rdap.views.LOGGER.client', new=self.test_logger)
+        self.addCleanup(log_patcher.stop)
+        log_patcher.start()
+
+    async def test_entity(self):
+        contact = Contact(contact_id='2X4B', contact_handle='kryten', sponsoring_registrar='HOLLY')
+        contact_mock = Mock(get_contact_id=AsyncMock(return_value='2X4B'),
+                            get_contact_info=AsyncMock(return_value=contact),
+                            get_contact_state=AsyncMock(return_value={}))
+        with patch('rdap.rdap_rest.whois.ASYNC_CONTACT_CLIENT', new=contact_mock):
+            with patch('rdap.rdap_rest.entity.ASYNC_CONTACT_CLIENT', new=contact_mock):
+                response = await self.async_client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/rdap+json')
+        result = json.loads(response.content.decode())
+        self.assertEqual(result['objectClassName'], 'entity')
+        self.assertEqual(result['handle'], 'kryten')
+        self.assertEqual(result['links'][0]['href'], 'http://testserver/entity/kryten')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60, stale-while-revalidate=60')
+
+        # Check logger
+        log_entry = TestLogEntry(LOGGER_SERVICE, LogEntryType.ENTITY_LOOKUP, LogResult.SUCCESS, source_ip='127.0.0.1',
+                                 input_properties={'handle': 'kryten'})
+        self.assertEqual(self.test_logger.mock.mock_calls, log_entry.get_calls())
+
+    async def test_entity_not_found(self):
+        contact_mock = Mock(get_contact_id=AsyncMock(side_effect=ContactDoesNotExist))
+        with patch('rdap.rdap_rest.whois.ASYNC_CONTACT_CLIENT', new=contact_mock):
+            response = await self.async_client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['Content-Type'], 'application/rdap+json')
+        self.assertEqual(response.content, b'')
+
+        # Check logger
+        log_entry = TestLogEntry(LOGGER_SERVICE, LogEntryType.ENTITY_LOOKUP, LogResult.NOT_FOUND, source_ip='127.0.0.1',
+                                 input_properties={'handle': 'kryten'})
+        self.assertEqual(self.test_logger.mock.mock_calls, log_entry.get_calls())
+
+    async def test_entity_logger_thread(self):
+        # Logger calls block, so they're not made in the event loop thread.
+        threads = []
+        self.test_logger.mock.create_log_entry.side_effect = lambda *args, **kwargs: threads.append(get_ident())
+        self.test_logger.mock.close_log_entry.side_effect = lambda *args, **kwargs: threads.append(get_ident())
+        contact_mock = Mock(get_contact_id=AsyncMock(side_effect=ContactDoesNotExist))
+        with patch('rdap.rdap_rest.whois.ASYNC_CONTACT_CLIENT', new=contact_mock):
+            response = await self.async_client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(get_ident(), threads)
+
+    async def test_entity_error(self):
+        contact_mock = Mock(get_contact_id=AsyncMock(side_effect=RuntimeError))
+        with patch('rdap.rdap_rest.whois.ASYNC_CONTACT_CLIENT', new=contact_mock):
+            with self.assertLogs('django.request', 'ERROR'):
+                with self.assertRaises(RuntimeError):
+                    await self.async_client.get('/entity/kryten')
+
+        # Check logger
+        log_entry = TestLogEntry(LOGGER_SERVICE, LogEntryType.ENTITY_LOOKUP, LogResult.INTERNAL_SERVER_ERROR,
+                                 source_ip='127.0.0.1', input_properties={'handle': 'kryten'},
+                                 properties={'error': 'RuntimeError'})
+        self.assertEqual(self.test_logger.mock.mock_calls, log_entry.get_calls())
+
+    async def test_entity_rate_limited(self):
+        contact_mock = Mock(get_contact_id=AsyncMock())
+        with patch('rdap.views.RATE_LIMITER', new=RateLimiter('default', 1, 0)):
+            with patch('rdap.rdap_rest.whois.ASYNC_CONTACT_CLIENT', new=contact_mock):
+                response = await self.async_client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+        contact_mock.get_contact_id.assert_not_called()
+
+    async def test_entity_overloaded(self):
+        limiter = ConcurrencyLimiter(1)
+        limiter.in_flight = 1
+        contact_mock = Mock(get_contact_id=AsyncMock())
+        with patch('rdap.views.CONCURRENCY_LIMITER', new=limiter):
+            with patch('rdap.rdap_rest.whois.ASYNC_CONTACT_CLIENT', new=contact_mock):
+                with self.assertLogs('root', 'WARNING'):
+                    response = await self.async_client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        contact_mock.get_contact_id.assert_not_called()
+        self.assertEqual(self.test_logger.mock.mock_calls, [])
+
+    async def test_entity_circuit_open_expired(self):
+        contact = Contact(contact_id='2X4B', contact_handle='kryten', sponsoring_registrar='HOLLY')
+        contact_mock = Mock(get_contact_id=AsyncMock(return_value='2X4B'),
+                            get_contact_info=AsyncMock(return_value=contact),
+                            get_contact_state=AsyncMock(return_value={}))
+        with patch('rdap.rdap_rest.whois.ASYNC_CONTACT_CLIENT', new=contact_mock):
+            with patch('rdap.rdap_rest.entity.ASYNC_CONTACT_CLIENT', new=contact_mock):
+                with patch('rdap.views.RESPONSE_CACHE', new=LruCache(10, keep_expired=True)):
+                    with patch('rdap.cache.monotonic', return_value=100) as monotonic_mock:
+                        response = await self.async_client.get('/entity/kryten')
+                        monotonic_mock.return_value = 1000
+                        contact_mock.get_contact_id.side_effect = CircuitOpen(9.2)
+                        with self.assertLogs('root', 'INFO'):
+                            expired_response = await self.async_client.get('/entity/kryten')
+
+        self.assertEqual(expired_response.status_code, 200)
+        self.assertEqual(expired_response.content, response.content)
+
+    async def test_entity_circuit_open(self):
+        contact_mock = Mock(get_contact_id=AsyncMock(side_effect=CircuitOpen(9.2)))
+        with patch('rdap.rdap_rest.whois.ASYNC_CONTACT_CLIENT', new=contact_mock):
+            with patch('rdap.views.RESPONSE_CACHE', new=LruCache(10, keep_expired=True)):
+                response = await self.async_client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '10')
+
+    async def test_entity_not_found_cached(self):
+        contact_mock = Mock(get_contact_id=AsyncMock(side_effect=ContactDoesNotExist))
+        with patch('rdap.rdap_rest.whois.ASYNC_CONTACT_CLIENT', new=contact_mock):
+            with patch('rdap.views.NOT_FOUND_CACHE', new=LruCache(10)):
+                await self.async_client.get('/entity/kryten')
+                response = await self.async_client.get('/entity/kryten')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(contact_mock.get_contact_id.await_count, 1)
+
+    async def test_entity_cached(self):
+        contact = Contact(contact_id='2X4B', contact_handle='kryten', sponsoring_registrar='HOLLY')
+        contact_mock = Mock(get_contact_id=AsyncMock(return_value='2X4B'),
+                            get_contact_info=AsyncMock(return_value=contact),
+                            get_contact_state=AsyncMock(return_value={}))
+        with patch('rdap.rdap_rest.whois.ASYNC_CONTACT_CLIENT', new=contact_mock):
+            with patch('rdap.rdap_rest.entity.ASYNC_CONTACT_CLIENT', new=contact_mock):
+                with patch('rdap.views.RESPONSE_CACHE', new=LruCache(10)) as cache:
+                    with patch('rdap.views._REFRESH_TASKS', new=set()) as tasks:
+                        response = await self.async_client.get('/entity/kryten')
+                        cached_response = await self.async_client.get('/entity/KRYTEN')
+
+        self.assertEqual(cached_response.status_code, 200)
+        self.assertEqual(cached_response.content, response.content)
+        self.assertEqual(contact_mock.get_contact_id.await_count, 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(tasks, set())
+
+    @override_settings(RDAP_RESPONSE_CACHE_STALE_TIMEOUT=60)
+    async def test_entity_stale(self):
+        contact = Contact(contact_id='2X4B', contact_handle='kryten', sponsoring_registrar='HOLLY')
+        contact_mock = Mock(get_contact_id=AsyncMock(return_value='2X4B'),
+                            get_contact_info=AsyncMock(return_value=contact),
+                            get_contact_state=AsyncMock(return_value={}))
+        with patch('rdap.rdap_rest.whois.ASYNC_CONTACT_CLIENT', new=contact_mock):
+            with patch('rdap.rdap_rest.entity.ASYNC_CONTACT_CLIENT', new=contact_mock):
+                with patch('rdap.views.RESPONSE_CACHE', new=LruCache(10)) as cache:
+                    with patch('rdap.views._REFRESH_TASKS', new=set()) as tasks:
+                        with patch('rdap.cache.monotonic', return_value=100) as monotonic_mock:
+                            response = await self.async_client.get('/entity/kryten')
+                            monotonic_mock.return_value = 200
+                            stale_response = await self.async_client.get('/entity/kryten')
+                            # Wait for the refresh
+                            await asyncio.gather(*tasks)
+
+                            self.assertEqual(contact_mock.get_contact_id.await_count, 2)
+                            key = (LogEntryType.ENTITY_LOOKUP, 'kryten', 'http', 'testserver')
+                            self.assertFalse(cache.get_entry(key).stale)
+                            self.assertEqual(tasks, set())
+
+        self.assertEqual(stale_response.status_code, 200)
+        self.assertEqual(stale_response.content, response.content)
+
+    @override_settings(RDAP_RESPONSE_CACHE_STALE_TIMEOUT=60)
+    async def test_entity_stale_failed(self):
+        contact = Contact(contact_id='2X4B', contact_handle='kryten', sponsoring_registrar='HOLLY')
+        contact_mock = Mock(get_contact_id=AsyncMock(return_value='2X4B'),
+                            get_contact_info=AsyncMock(return_value=contact),
+                            get_contact_state=AsyncMock(return_value={}))
+        with patch('rdap.rdap_rest.whois.ASYNC_CONTACT_CLIENT', new=contact_mock):
+            with patch('rdap.rdap_rest.entity.ASYNC_CONTACT_CLIENT', new=contact_mock):
+                with patch('rdap.views.RESPONSE_CACHE', new=LruCache(10)) as cache:
+                    with patch('rdap.views._REFRESH_TASKS', new=set()) as tasks:
+                        with patch('rdap.cache.monotonic', return_value=100) as monotonic_mock:
+                            await self.async_client.get('/entity/kryten')
+                            monotonic_mock.return_value = 200
+                            contact_mock.get_contact_id.side_effect = DeadlineExceeded
+                            with self.assertLogs('root', 'WARNING') as log_catcher:
+                                stale_response = await self.async_client.get('/entity/kryten')
+                                # Wait for the refresh
+                                await asyncio.gather(*tasks, return_exceptions=True)
+
+                            key = (LogEntryType.ENTITY_LOOKUP, 'kryten', 'http', 'testserver')
+                            self.assertTrue(cache.get_entry(key).stale)
+                            self.assertEqual(tasks, set())
+
+        self.assertEqual(stale_response.status_code, 200)
+        self.assertEqual(log_catcher.output, ['WARNING:root:Refresh failed: '])
+
+    async def test_nameserver(self):
+        nsset_mock = Mock(check_dns_host=AsyncMock(return_value=True))
+        with patch('rdap.rdap_rest.whois.ASYNC_NSSET_CLIENT', new=nsset_mock):
+            response = await self.async_client.get('/nameserver/ns.example.org')
+
+        self.assertEqual(response.status_code, 200)
+        result = json.loads(response.content.decode())
+        self.assertEqual(result['handle'], 'ns.example.org')
+        nsset_mock.check_dns_host.assert_awaited_once_with('ns.example.org')
+
+    async def test_post(self):
+        response = await self.async_client.post('/entity/kryten', {})
+
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Allow'], 'GET, HEAD, OPTIONS')
+        self.assertEqual(self.test_logger.mock.mock_calls, [])
+
+    async def test_options(self):
+        response = await self.async_client.options('/entity/kryten')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Allow'], 'GET, HEAD, OPTIONS')
+        self.assertEqual(self.test_logger.mock.mock_calls, [])
+
+    async def test_nameserver_invalid_fqdn(self):
+        response = await self.async_client.get('/nameserver/-invalid')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response['Content-Type'], 'application/rdap+json')
+        self.assertEqual(self.test_logger.mock.mock_calls, [])
+
+
+class RefreshDoneTest(SimpleTestCase):
+    async def test_success(self):
+        task = asyncio.ensure_future(asyncio.sleep(0))
+        with patch('rdap.views._REFRESH_TASKS', new={task}) as tasks:
+            await task
+            _refresh_done(task)
+
+        self.assertEqual(tasks, set())
+
+    async def test_cancelled(self):
+        task = asyncio.ensure_future(asyncio.sleep(1))
+        task.cancel()
+        with patch('rdap.views._REFRESH_TASKS', new={task}) as tasks:
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            _refresh_done(task)
+
+        self.assertEqual(tasks, set())
+
+
 class TestHelpView(SimpleTestCase):
     """
     Test `HelpView` class.
@@ -188,6 +958,7 @@ class TestHelpView(SimpleTestCase):
             "notices": [{"title": "Help", "description": [help_text]}],
         }
         self.assertJSONEqual(response.content.decode(), data)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=86400')
 
     def test_post(self):
         # Test POST returns `Method Not Allowed` response instead of CSRF check failure.
@@ -208,6 +979,7 @@ class TestUnsupportedView(SimpleTestCase):
         self.assertEqual(response.status_code, 501)
         self.assertEqual(response['Content-Type'], 'application/rdap+json')
         self.assertEqual(response.content, b'')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=86400')
 
     def test_post(self):
         # Test POST returns `Method Not Allowed` response instead of CSRF check failure.
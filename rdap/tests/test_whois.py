@@ -17,15 +17,17 @@
 # along with FRED.  If not, see <https://www.gnu.org/licenses/>.
 #
 from datetime import datetime, timezone
-from unittest.mock import call, patch
+from unittest.mock import AsyncMock, Mock, call, patch
 
 from django.test import RequestFactory, SimpleTestCase
 from regal import Contact, Domain, Keyset, Nsset, ObjectEvent, ObjectEvents
 from regal.exceptions import (ContactDoesNotExist, DomainDoesNotExist, KeysetDoesNotExist, NssetDoesNotExist,
                               ObjectDoesNotExist)
 
-from rdap.rdap_rest.whois import (get_contact_by_handle, get_domain_by_handle, get_keyset_by_handle,
-                                  get_nameserver_by_handle, get_nsset_by_handle)
+from rdap.rdap_rest.whois import (get_contact_by_handle, get_contact_by_handle_async, get_domain_by_handle,
+                                  get_domain_by_handle_async, get_keyset_by_handle, get_keyset_by_handle_async,
+                                  get_nameserver_by_handle, get_nameserver_by_handle_async, get_nsset_by_handle,
+                                  get_nsset_by_handle_async)
 
 
 class TestGetContactByHandle(SimpleTestCase):
@@ -76,10 +78,10 @@ class TestGetDomainByHandle(SimpleTestCase):
         patcher = patch('rdap.rdap_rest.whois.DOMAIN_CLIENT', spec=('get_domain_info', 'get_domain_id'))
         self.addCleanup(patcher.stop)
         self.domain_mock = patcher.start()
-        patcher = patch('rdap.rdap_rest.domain.CONTACT_CLIENT', spec=('get_contact_info', ))
+        patcher = patch('rdap.rdap_rest.domain.CONTACT_CLIENT', spec=('get_contact_handle', ))
         self.addCleanup(patcher.stop)
         self.contact_mock = patcher.start()
-        self.contact_mock.get_contact_info.return_value = Contact(contact_id='2X4B', contact_handle='KRYTEN')
+        self.contact_mock.get_contact_handle.return_value = 'KRYTEN'
 
     def test_domain(self):
         events = ObjectEvents(
@@ -195,6 +197,15 @@ class TestGetNameserverByHandle(SimpleTestCase):
         calls = [call.check_dns_host('ns.example.org')]
         self.assertEqual(self.nameserver_mock.mock_calls, calls)
 
+    def test_nameserver_filtered(self):
+        request = RequestFactory().get('/dummy/')
+
+        with patch('rdap.rdap_rest.whois.DNS_HOST_FILTER', new=['ns.example.com']):
+            with self.assertRaises(ObjectDoesNotExist):
+                get_nameserver_by_handle(request, 'ns.example.org')
+
+        self.assertEqual(self.nameserver_mock.mock_calls, [])
+
 
 class TestGetNssetByHandle(SimpleTestCase):
     def setUp(self):
@@ -240,3 +251,110 @@ class TestGetNssetByHandle(SimpleTestCase):
 
         calls = [call.get_nsset_id('KRYTEN')]
         self.assertEqual(self.nsset_mock.mock_calls, calls)
+
+
+class TestGetByHandleAsync(SimpleTestCase):
+    """Test asynchronous getters of objects by handle."""
+
+    def setUp(self):
+        self.request = RequestFactory().get('/dummy/')
+        self.events = ObjectEvents(
+            registered=ObjectEvent(registrar_handle='DIVADROID', timestamp=datetime(1988, 9, 6, tzinfo=timezone.utc)),
+            transferred=ObjectEvent(registrar_handle='QUEEG-500'))
+
+    async def test_contact(self):
+        contact = Contact(contact_id='2X4B', contact_handle='KRYTEN', sponsoring_registrar='HOLLY')
+        contact_mock = Mock(get_contact_id=AsyncMock(return_value='2X4B'),
+                            get_contact_info=AsyncMock(return_value=contact))
+        with patch('rdap.rdap_rest.whois.ASYNC_CONTACT_CLIENT', new=contact_mock):
+            with patch('rdap.rdap_rest.whois.contact_to_dict_async', new=AsyncMock(return_value={})) as to_dict:
+                response = await get_contact_by_handle_async(self.request, 'KRYTEN')
+
+        self.assertEqual(response, {})
+        to_dict.assert_awaited_once_with(contact, self.request)
+        calls = [call.get_contact_id('KRYTEN'), call.get_contact_info('2X4B')]
+        self.assertEqual(contact_mock.mock_calls, calls)
+
+    async def test_domain(self):
+        domain = Domain(domain_id='2X4B', fqdn='example.org', sponsoring_registrar='HOLLY', events=self.events,
+                        registrant='KRYTEN', expires_at=datetime(1999, 4, 5, tzinfo=timezone.utc))
+        domain_mock = Mock(get_domain_id=AsyncMock(return_value='2X4B'), get_domain_info=AsyncMock(return_value=domain))
+        with patch('rdap.rdap_rest.whois.ASYNC_DOMAIN_CLIENT', new=domain_mock):
+            with patch('rdap.rdap_rest.whois.domain_to_dict_async', new=AsyncMock(return_value={})) as to_dict:
+                response = await get_domain_by_handle_async(self.request, 'example.org')
+
+        self.assertEqual(response, {})
+        to_dict.assert_awaited_once_with(domain, self.request)
+        calls = [call.get_domain_id('example.org'), call.get_domain_info('2X4B')]
+        self.assertEqual(domain_mock.mock_calls, calls)
+
+    async def test_domain_id_not_found(self):
+        domain_mock = Mock(get_domain_id=AsyncMock(side_effect=DomainDoesNotExist), get_domain_info=AsyncMock())
+        with patch('rdap.rdap_rest.whois.ASYNC_DOMAIN_CLIENT', new=domain_mock):
+            with self.assertRaises(DomainDoesNotExist):
+                await get_domain_by_handle_async(self.request, 'example.org')
+
+        domain_mock.get_domain_info.assert_not_called()
+
+    async def test_nameserver(self):
+        nsset_mock = Mock(check_dns_host=AsyncMock(return_value=True))
+        with patch('rdap.rdap_rest.whois.ASYNC_NSSET_CLIENT', new=nsset_mock):
+            response = await get_nameserver_by_handle_async(self.request, 'ns.example.org')
+
+        self.assertEqual(response['handle'], 'ns.example.org')
+        self.assertEqual(response['objectClassName'], 'nameserver')
+        nsset_mock.check_dns_host.assert_awaited_once_with('ns.example.org')
+
+    async def test_nameserver_not_found(self):
+        nsset_mock = Mock(check_dns_host=AsyncMock(return_value=False))
+        with patch('rdap.rdap_rest.whois.ASYNC_NSSET_CLIENT', new=nsset_mock):
+            with self.assertRaises(ObjectDoesNotExist):
+                await get_nameserver_by_handle_async(self.request, 'ns.example.org')
+
+    async def test_nameserver_filtered(self):
+        nsset_mock = Mock(check_dns_host=AsyncMock(return_value=True))
+        with patch('rdap.rdap_rest.whois.ASYNC_NSSET_CLIENT', new=nsset_mock):
+            with patch('rdap.rdap_rest.whois.DNS_HOST_FILTER', new=['ns.example.com']):
+                with self.assertRaises(ObjectDoesNotExist):
+                    await get_nameserver_by_handle_async(self.request, 'ns.example.org')
+
+        nsset_mock.check_dns_host.assert_not_called()
+
+    async def test_nsset(self):
+        nsset = Nsset(nsset_id='2X4B', nsset_handle='KRYTEN', sponsoring_registrar='HOLLY', events=self.events)
+        nsset_mock = Mock(get_nsset_id=AsyncMock(return_value='2X4B'), get_nsset_info=AsyncMock(return_value=nsset))
+        with patch('rdap.rdap_rest.whois.ASYNC_NSSET_CLIENT', new=nsset_mock):
+            with patch('rdap.rdap_rest.whois.nsset_to_dict_async', new=AsyncMock(return_value={})) as to_dict:
+                response = await get_nsset_by_handle_async(self.request, 'KRYTEN')
+
+        self.assertEqual(response, {})
+        to_dict.assert_awaited_once_with(nsset, self.request)
+        calls = [call.get_nsset_id('KRYTEN'), call.get_nsset_info('2X4B')]
+        self.assertEqual(nsset_mock.mock_calls, calls)
+
+    async def test_nsset_not_found(self):
+        nsset_mock = Mock(get_nsset_id=AsyncMock(return_value='2X4B'),
+                          get_nsset_info=AsyncMock(side_effect=NssetDoesNotExist))
+        with patch('rdap.rdap_rest.whois.ASYNC_NSSET_CLIENT', new=nsset_mock):
+            with self.assertRaises(NssetDoesNotExist):
+                await get_nsset_by_handle_async(self.request, 'KRYTEN')
+
+    async def test_keyset(self):
+        keyset = Keyset(keyset_id='2X4B', keyset_handle='KRYTEN', sponsoring_registrar='HOLLY', events=self.events)
+        keyset_mock = Mock(get_keyset_id=AsyncMock(return_value='2X4B'),
+                           get_keyset_info=AsyncMock(return_value=keyset))
+        with patch('rdap.rdap_rest.whois.ASYNC_KEYSET_CLIENT', new=keyset_mock):
+            with patch('rdap.rdap_rest.whois.keyset_to_dict_async', new=AsyncMock(return_value={})) as to_dict:
+                response = await get_keyset_by_handle_async(self.request, 'KRYTEN')
+
+        self.assertEqual(response, {})
+        to_dict.assert_awaited_once_with(keyset, self.request)
+        calls = [call.get_keyset_id('KRYTEN'), call.get_keyset_info('2X4B')]
+        self.assertEqual(keyset_mock.mock_calls, calls)
+
+    async def test_keyset_not_found(self):
+        keyset_mock = Mock(get_keyset_id=AsyncMock(return_value='2X4B'),
+                           get_keyset_info=AsyncMock(side_effect=KeysetDoesNotExist))
+        with patch('rdap.rdap_rest.whois.ASYNC_KEYSET_CLIENT', new=keyset_mock):
+            with self.assertRaises(KeysetDoesNotExist):
+                await get_keyset_by_handle_async(self.request, 'KRYTEN')
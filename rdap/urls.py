@@ -17,6 +17,7 @@
 # along with FRED.  If not, see <https://www.gnu.org/licenses/>.
 from django.urls import path, re_path
 
+from rdap.rdap_rest.rdap_utils import ObjectClassName
 from rdap.rdap_rest.whois import (get_contact_by_handle, get_domain_by_handle, get_keyset_by_handle,
                                   get_nameserver_by_handle, get_nsset_by_handle)
 from rdap.views import FqdnObjectView, HelpView, ObjectView, UnsupportedView
@@ -25,19 +26,24 @@ from .constants import LogEntryType
 
 urlpatterns = [
     path('entity/<handle>',
-         ObjectView.as_view(getter=get_contact_by_handle, request_type=LogEntryType.ENTITY_LOOKUP),
+         ObjectView.as_view(getter=get_contact_by_handle, request_type=LogEntryType.ENTITY_LOOKUP,
+                            object_class=ObjectClassName.ENTITY),
          name='entity-detail'),
     path('domain/<handle>',
-         FqdnObjectView.as_view(getter=get_domain_by_handle, request_type=LogEntryType.DOMAIN_LOOKUP),
+         FqdnObjectView.as_view(getter=get_domain_by_handle, request_type=LogEntryType.DOMAIN_LOOKUP,
+                                object_class=ObjectClassName.DOMAIN),
          name='domain-detail'),
     path('nameserver/<handle>',
-         FqdnObjectView.as_view(getter=get_nameserver_by_handle, request_type=LogEntryType.NAMESERVER_LOOKUP),
+         FqdnObjectView.as_view(getter=get_nameserver_by_handle, request_type=LogEntryType.NAMESERVER_LOOKUP,
+                                object_class=ObjectClassName.NAMESERVER),
          name='nameserver-detail'),
     path('fred_nsset/<handle>',
-         ObjectView.as_view(getter=get_nsset_by_handle, request_type=LogEntryType.NSSET_LOOKUP),
+         ObjectView.as_view(getter=get_nsset_by_handle, request_type=LogEntryType.NSSET_LOOKUP,
+                            object_class=ObjectClassName.NSSET),
          name='nsset-detail'),
     path('fred_keyset/<handle>',
-         ObjectView.as_view(getter=get_keyset_by_handle, request_type=LogEntryType.KEYSET_LOOKUP),
+         ObjectView.as_view(getter=get_keyset_by_handle, request_type=LogEntryType.KEYSET_LOOKUP,
+                            object_class=ObjectClassName.KEYSET),
          name='keyset-detail'),
     re_path(r'^autnum/.+$', UnsupportedView.as_view()),
     re_path(r'^ip/.+$', UnsupportedView.as_view()),
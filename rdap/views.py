@@ -17,24 +17,163 @@
 # along with FRED.  If not, see <https://www.gnu.org/licenses/>.
 #
 """RDAP views."""
-from typing import Any, Callable, cast
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from functools import partial
+from math import ceil
+from time import monotonic
+from typing import (Any, AsyncIterator, Callable, ContextManager, Dict, Hashable, Iterator, NamedTuple, Optional,
+                    Sequence, Set, Tuple, cast)
 
+from asgiref.sync import sync_to_async
+from django.core.cache import BaseCache, caches
+from django.core.serializers.json import DjangoJSONEncoder
 from django.http import HttpRequest, HttpResponse, HttpResponseBadRequest, HttpResponseNotFound, JsonResponse
+from django.urls import get_script_prefix, set_script_prefix
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.decorators import classonlymethod
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import quote_etag
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import View
 from grill import Logger, get_logger_client
 from regal.exceptions import ObjectDoesNotExist
 
+from rdap.cache import AsyncSingleFlight, BackgroundRefresher, LruCache, SingleFlight, shared_single_flight
+from rdap.clients import CircuitOpen, DeadlineExceeded, hedge_budget, request_deadline, request_memo
+from rdap.limits import ConcurrencyLimiter, RateLimiter, get_uwsgi_load
+from rdap.logger import QueuedLoggerClient
 from rdap.rdap_rest.rdap_utils import InvalidIdn, preprocess_fqdn
 from rdap.settings import RDAP_SETTINGS
 
-from .constants import LOGGER_SERVICE, LogResult
+from .constants import LOGGER_SERVICE, LogEntryType, LogResult
 
 RDAP_CONTENT_TYPE = 'application/rdap+json'
 RDAP_CONFORMANCE = ['rdap_level_0', 'fred_version_0']
+DEADLINE_EXCEEDED_DESCRIPTION = 'Registry did not respond in time.'
+CIRCUIT_OPEN_DESCRIPTION = 'Registry is temporarily unavailable.'
+OVERLOADED_DESCRIPTION = 'Server is overloaded.'
+RATE_LIMITED_DESCRIPTION = 'Too many requests from the client.'
 
-_LOGGER_CLIENT = get_logger_client(RDAP_SETTINGS.LOGGER, **RDAP_SETTINGS.LOGGER_OPTIONS)
-LOGGER = Logger(_LOGGER_CLIENT, LOGGER_SERVICE, LogResult.INTERNAL_SERVER_ERROR)
+
+def _make_logger() -> Logger:
+    """Create the logger and register the RDAP service in the logger.
+
+    Log entries are sent in a background thread, if the logger queue is enabled.
+    """
+    client = get_logger_client(RDAP_SETTINGS.LOGGER, **RDAP_SETTINGS.LOGGER_OPTIONS)
+    client.register_service(LOGGER_SERVICE, handle='rdap_')
+    client.register_log_entry_types(LOGGER_SERVICE, LogEntryType)
+    client.register_results(LOGGER_SERVICE, LogResult)
+    if RDAP_SETTINGS.LOGGER_QUEUE_SIZE > 0:
+        client = QueuedLoggerClient(client, RDAP_SETTINGS.LOGGER_QUEUE_SIZE, RDAP_SETTINGS.LOGGER_BATCH_SIZE,
+                                    RDAP_SETTINGS.LOGGER_QUEUE_BLOCK, RDAP_SETTINGS.LOGGER_FLUSH_TIMEOUT)
+    return Logger(client, LOGGER_SERVICE, LogResult.INTERNAL_SERVER_ERROR)
+
+
+# Logger is created on its first use, so it's not created in processes which don't log, e.g. management commands.
+LOGGER = cast(Logger, SimpleLazyObject(_make_logger))
+# Expired responses are kept as a fallback, while the registry is unavailable.
+RESPONSE_CACHE = LruCache(RDAP_SETTINGS.RESPONSE_CACHE_SIZE, keep_expired=True)
+NOT_FOUND_CACHE = LruCache(RDAP_SETTINGS.NOT_FOUND_CACHE_SIZE)
+RATE_LIMITER = RateLimiter(RDAP_SETTINGS.RATE_LIMIT_CACHE, RDAP_SETTINGS.RATE_LIMIT, RDAP_SETTINGS.RATE_LIMIT_BURST,
+                           RDAP_SETTINGS.RATE_LIMIT_NETWORK, RDAP_SETTINGS.RATE_LIMIT_NETWORK_BURST,
+                           RDAP_SETTINGS.RATE_LIMIT_IPV4_PREFIX, RDAP_SETTINGS.RATE_LIMIT_IPV6_PREFIX)
+CONCURRENCY_LIMITER = ConcurrencyLimiter(RDAP_SETTINGS.CONCURRENCY_LIMIT, RDAP_SETTINGS.CONCURRENCY_LIMIT_MIN,
+                                         RDAP_SETTINGS.CONCURRENCY_LIMIT_LATENCY,
+                                         RDAP_SETTINGS.CONCURRENCY_LIMIT_BACKOFF, get_load=get_uwsgi_load)
+REFRESHER = BackgroundRefresher(RDAP_SETTINGS.RESPONSE_CACHE_REFRESH_WORKERS)
+SINGLE_FLIGHT = SingleFlight()
+ASYNC_SINGLE_FLIGHT = AsyncSingleFlight()
+# Keep references to background tasks, so they're not garbage collected.
+_REFRESH_TASKS: Set[asyncio.Task] = set()
+
+
+class RenderedResponse(NamedTuple):
+    """Serialized response with its validator.
+
+    @ivar content: Serialized response content.
+    @ivar etag: Quoted strong ETag of the content.
+    @ivar status: RDAP statuses of the object.
+    """
+
+    content: bytes
+    etag: str
+    status: Tuple[str, ...] = ()
+
+
+def get_cache_control(name: Optional[str], status: Sequence[str] = ()) -> Dict[str, Any]:
+    """Return `Cache-Control` directives for a response.
+
+    @param name: Object class name or other response name used in `RDAP_CACHE_CONTROL` setting.
+    @param status: RDAP statuses of the object, which may override the directives.
+    """
+    for key, directives in RDAP_SETTINGS.CACHE_CONTROL_STATUSES.items():
+        if key in status:
+            return cast(Dict[str, Any], directives)
+    return cast(Dict[str, Any], RDAP_SETTINGS.CACHE_CONTROL.get(name, {}))
+
+
+def make_error_response(status: int, title: str, description: Sequence[str]) -> JsonResponse:
+    """Return an RDAP error response."""
+    data = {'rdapConformance': RDAP_CONFORMANCE, 'errorCode': status, 'title': title,
+            'description': list(description)}
+    return JsonResponse(data, status=status, content_type=RDAP_CONTENT_TYPE)
+
+
+@asynccontextmanager
+async def create_log_entry_async(log_entry_type: str, source_ip: str, properties: Dict[str, Any]) -> AsyncIterator[Any]:
+    """Create a log entry without blocking the event loop.
+
+    Logger calls block, so the log entry is created and closed in a thread.
+    """
+    def _enter() -> Tuple[ContextManager, Any]:
+        manager = LOGGER.create(log_entry_type, source_ip=source_ip, properties=properties)
+        return manager, manager.__enter__()
+
+    manager, log_entry = await sync_to_async(_enter, thread_sensitive=False)()
+    exit_ = sync_to_async(manager.__exit__, thread_sensitive=False)
+    try:
+        yield log_entry
+    except BaseException as error:
+        # Logger doesn't suppress exceptions.
+        await exit_(type(error), error, error.__traceback__)
+        raise
+    else:
+        await exit_(None, None, None)
+
+
+@contextmanager
+def lookup_scope() -> Iterator[None]:
+    """Set the request deadline and the hedging budget for an object lookup."""
+    with request_deadline(RDAP_SETTINGS.REQUEST_DEADLINE), hedge_budget(RDAP_SETTINGS.HEDGING_MAX_HEDGES):
+        yield
+
+
+def get_client_address(request: HttpRequest) -> str:
+    """Return an IP address of the client.
+
+    If the application is behind trusted proxies, see `RDAP_RATE_LIMIT_PROXIES`, the address is taken from
+    `X-Forwarded-For` header.
+    """
+    address = cast(str, request.META.get('REMOTE_ADDR', ''))
+    proxies = RDAP_SETTINGS.RATE_LIMIT_PROXIES
+    if proxies > 0:
+        forwarded = [a.strip() for a in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if a.strip()]
+        if len(forwarded) >= proxies:
+            address = forwarded[-proxies]
+    return address
+
+
+def add_cache_control(response: HttpResponse, name: Optional[str], status: Sequence[str] = ()) -> None:
+    """Add `Cache-Control` header to the response, if there are any directives."""
+    directives = get_cache_control(name, status)
+    if directives:
+        patch_cache_control(response, **directives)
 
 
 class ObjectView(View):
@@ -42,34 +181,244 @@ class ObjectView(View):
 
     @cvar getter: Function which returns object data or raises exception.
     @cvar request_type: Request type for logger
+    @cvar object_class: Object class name used to select cache timeouts.
     """
 
     getter: Callable = None  # type: ignore[assignment]  # not ideal, but backward compatible
     request_type = None
+    object_class: Optional[str] = None
 
     @csrf_exempt
     def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
         return super(ObjectView, self).dispatch(request, *args, **kwargs)
 
     def get(self, request: HttpRequest, handle: str, *args: Any, **kwargs: Any) -> HttpResponse:
+        # Requests over the concurrency limit are rejected before any logger or registry calls.
+        if not CONCURRENCY_LIMITER.acquire():
+            return self.make_overloaded_response()
+        start = monotonic()
+        response: Optional[HttpResponse] = None
+        try:
+            response = self.lookup(request, handle)
+        finally:
+            CONCURRENCY_LIMITER.release(monotonic() - start, response is not None and response.status_code < 500)
+        return response
+
+    def lookup(self, request: HttpRequest, handle: str) -> HttpResponse:
+        """Log the request and return a response with the object."""
         with LOGGER.create(cast(str, self.request_type), source_ip=request.META.get('REMOTE_ADDR', ''),
                            properties={'handle': handle}) as log_entry:
+            retry_after = RATE_LIMITER.check(get_client_address(request))
+            if retry_after is not None:
+                return self.make_rate_limited_response(log_entry, retry_after)
             try:
-                data = self.getter(request, handle)
+                with lookup_scope():
+                    rendered = self.get_rendered(request, handle)
+            except Exception as error:
+                return self.make_lookup_error_response(log_entry, error)
+            log_entry.result = LogResult.SUCCESS
+            return self.make_response(request, rendered)
+
+    def make_lookup_error_response(self, log_entry: Any, error: Exception) -> HttpResponse:
+        """Return a response to a failed lookup, unexpected errors are re-raised."""
+        if isinstance(error, ObjectDoesNotExist):
+            log_entry.result = LogResult.NOT_FOUND
+            return HttpResponseNotFound(content_type=RDAP_CONTENT_TYPE)
+        log_entry.properties = {'error': type(error).__name__}
+        if isinstance(error, DeadlineExceeded):
+            return make_error_response(504, 'Gateway Timeout', [DEADLINE_EXCEEDED_DESCRIPTION])
+        if isinstance(error, CircuitOpen):
+            response = make_error_response(503, 'Service Unavailable', [CIRCUIT_OPEN_DESCRIPTION])
+            response['Retry-After'] = str(ceil(error.retry_after))
+            return response
+        raise error
+
+    def make_rate_limited_response(self, log_entry: Any, retry_after: float) -> HttpResponse:
+        """Return a response to a request rejected by the rate limiter."""
+        log_entry.result = LogResult.TOO_MANY_REQUESTS
+        response = make_error_response(429, 'Too Many Requests', [RATE_LIMITED_DESCRIPTION])
+        response['Retry-After'] = str(ceil(retry_after))
+        return response
+
+    def make_overloaded_response(self) -> HttpResponse:
+        """Return a response to a request rejected by the concurrency limiter."""
+        response = make_error_response(503, 'Service Unavailable', [OVERLOADED_DESCRIPTION])
+        response['Retry-After'] = str(RDAP_SETTINGS.CONCURRENCY_LIMIT_RETRY_AFTER)
+        return response
+
+    def get_cache_key(self, request: HttpRequest, handle: str) -> Hashable:
+        """Return a key of the response in the cache.
+
+        Host and scheme are part of the key, since they're used in the links.
+        """
+        return (self.request_type, handle.lower(), request.scheme, request.get_host())
+
+    def get_cache_timeout(self) -> int:
+        """Return a cache timeout for the object class."""
+        return cast(int, RDAP_SETTINGS.RESPONSE_CACHE_TIMEOUTS.get(self.object_class,
+                                                                   RDAP_SETTINGS.RESPONSE_CACHE_TIMEOUT))
+
+    def get_not_found_timeout(self) -> int:
+        """Return a not found cache timeout for the object class."""
+        return cast(int, RDAP_SETTINGS.NOT_FOUND_CACHE_TIMEOUTS.get(self.object_class,
+                                                                    RDAP_SETTINGS.NOT_FOUND_CACHE_TIMEOUT))
+
+    def get_shared_cache_key(self, request: HttpRequest, handle: str) -> str:
+        """Return a key of the response in the shared cache.
+
+        Handle is hashed to produce keys valid in all cache backends.
+        Request type is part of the key, since the object class may not be set.
+        """
+        url = '{}://{}/{}/{}'.format(request.scheme, request.get_host(), self.request_type, handle.lower())
+        return 'rdap:{}:{}'.format(self.object_class, hashlib.sha256(url.encode()).hexdigest())
+
+    def get_shared_cache_timeout(self) -> int:
+        """Return a shared cache timeout for the object class."""
+        if RDAP_SETTINGS.SHARED_CACHE_TIMEOUT is None:
+            return self.get_cache_timeout()
+        return cast(int, RDAP_SETTINGS.SHARED_CACHE_TIMEOUT)
+
+    def get_shared_cache(self) -> Optional[BaseCache]:
+        """Return the shared cache, if it's enabled."""
+        return caches[RDAP_SETTINGS.SHARED_CACHE] if RDAP_SETTINGS.SHARED_CACHE else None
+
+    def get_rendered(self, request: HttpRequest, handle: str) -> RenderedResponse:
+        """Return a serialized response, either from caches or from the getter.
+
+        Stale responses are returned immediately and refreshed in background.
+        """
+        key = self.get_cache_key(request, handle)
+        entry = RESPONSE_CACHE.get_entry(key)
+        if entry is not None:
+            logging.debug('Response cache hit: %s', key)
+            if entry.stale:
+                self.schedule_refresh(request, handle)
+            return cast(RenderedResponse, entry.value)
+        logging.debug('Response cache miss: %s', key)
+        if NOT_FOUND_CACHE.get(key) is not None:
+            logging.debug('Not found cache hit: %s', key)
+            raise ObjectDoesNotExist()
+
+        rendered = self.get_shared(request, handle)
+        if rendered is not None:
+            RESPONSE_CACHE.set(key, rendered, self.get_cache_timeout(), RDAP_SETTINGS.RESPONSE_CACHE_STALE_TIMEOUT)
+            return rendered
+
+        try:
+            return self.coalesced_refresh(request, handle)
+        except CircuitOpen:
+            # Another worker may have fetched the response in the meantime.
+            rendered = self.get_expired(request, handle) or self.get_shared(request, handle)
+            if rendered is None:
+                raise
+            return rendered
 
-                if RDAP_SETTINGS.DISCLAIMER:
-                    notices = data.setdefault('notices', [])
-                    notices.append({'title': 'Disclaimer', 'description': RDAP_SETTINGS.DISCLAIMER})
+    def get_shared(self, request: HttpRequest, handle: str) -> Optional[RenderedResponse]:
+        """Return a serialized response from the shared cache, if it's enabled and the response is cached."""
+        shared_cache = self.get_shared_cache()
+        if shared_cache is None:
+            return None
+        shared_key = self.get_shared_cache_key(request, handle)
+        try:
+            rendered = shared_cache.get(shared_key)
+        except Exception as error:
+            logging.warning('Shared cache get failed: %s', error)
+            return None
+        if rendered is not None:
+            logging.debug('Shared cache hit: %s', shared_key)
+        return cast(Optional[RenderedResponse], rendered)
+
+    def get_expired(self, request: HttpRequest, handle: str) -> Optional[RenderedResponse]:
+        """Return an expired serialized response from the response cache, if it's still kept there."""
+        key = self.get_cache_key(request, handle)
+        rendered = RESPONSE_CACHE.get_expired(key)
+        if rendered is not None:
+            logging.info('Registry is unavailable, expired response returned: %s', key)
+        return cast(Optional[RenderedResponse], rendered)
+
+    def coalesced_refresh(self, request: HttpRequest, handle: str) -> RenderedResponse:
+        """Refresh the response, concurrent refreshes of the same response are coalesced into a single one.
+
+        Refreshes are coalesced within the process and, if the shared cache lock is enabled, across processes.
+        """
+        key = self.get_cache_key(request, handle)
+        return cast(RenderedResponse, SINGLE_FLIGHT.do(key, partial(self._refresh_shared, request, handle)))
 
-                log_entry.result = LogResult.SUCCESS
-                return JsonResponse(data, content_type=RDAP_CONTENT_TYPE)
+    def _refresh_shared(self, request: HttpRequest, handle: str) -> RenderedResponse:
+        shared_cache = self.get_shared_cache()
+        lock_timeout = RDAP_SETTINGS.SHARED_CACHE_LOCK_TIMEOUT
+        if shared_cache is None or lock_timeout <= 0:
+            return self.refresh(request, handle)
+
+        rendered = shared_single_flight(shared_cache, self.get_shared_cache_key(request, handle), lock_timeout,
+                                        partial(self.refresh, request, handle))
+        RESPONSE_CACHE.set(self.get_cache_key(request, handle), rendered, self.get_cache_timeout(),
+                           RDAP_SETTINGS.RESPONSE_CACHE_STALE_TIMEOUT)
+        return cast(RenderedResponse, rendered)
+
+    def refresh(self, request: HttpRequest, handle: str) -> RenderedResponse:
+        """Render a response and store it in caches."""
+        key = self.get_cache_key(request, handle)
+        shared_cache = self.get_shared_cache()
+        shared_key = self.get_shared_cache_key(request, handle)
+        try:
+            rendered = self.render(request, handle)
+        except ObjectDoesNotExist:
+            RESPONSE_CACHE.delete(key)
+            NOT_FOUND_CACHE.set(key, True, self.get_not_found_timeout())
+            if shared_cache is not None:
+                try:
+                    shared_cache.delete(shared_key)
+                except Exception as error:
+                    logging.warning('Shared cache delete failed: %s', error)
+            raise
 
-            except ObjectDoesNotExist:
-                log_entry.result = LogResult.NOT_FOUND
-                return HttpResponseNotFound(content_type=RDAP_CONTENT_TYPE)
+        if shared_cache is not None:
+            try:
+                shared_cache.set(shared_key, rendered, self.get_shared_cache_timeout())
             except Exception as error:
-                log_entry.properties = {'error': type(error).__name__}
-                raise error
+                logging.warning('Shared cache set failed: %s', error)
+        RESPONSE_CACHE.set(key, rendered, self.get_cache_timeout(), RDAP_SETTINGS.RESPONSE_CACHE_STALE_TIMEOUT)
+        return rendered
+
+    def schedule_refresh(self, request: HttpRequest, handle: str) -> None:
+        """Schedule a refresh of the response in background."""
+        # Script prefix is thread local, pass it to the background thread for the links.
+        script_prefix = get_script_prefix()
+
+        def _refresh() -> None:
+            set_script_prefix(script_prefix)
+            with lookup_scope():
+                self.coalesced_refresh(request, handle)
+
+        REFRESHER.submit(self.get_cache_key(request, handle), _refresh)
+
+    def render(self, request: HttpRequest, handle: str) -> RenderedResponse:
+        """Fetch the object data and serialize them."""
+        with request_memo() as memo:
+            data = self.getter(request, handle)
+        logging.debug('Backend calls saved by request memo: %d', memo.saved)
+        return self.serialize(data)
+
+    def serialize(self, data: Dict[str, Any]) -> RenderedResponse:
+        """Serialize the object data."""
+        if RDAP_SETTINGS.DISCLAIMER:
+            notices = data.setdefault('notices', [])
+            notices.append({'title': 'Disclaimer', 'description': RDAP_SETTINGS.DISCLAIMER})
+
+        content = json.dumps(data, cls=DjangoJSONEncoder).encode()
+        return RenderedResponse(content, quote_etag(hashlib.sha256(content).hexdigest()), tuple(data.get('status', ())))
+
+    def make_response(self, request: HttpRequest, rendered: RenderedResponse) -> HttpResponse:
+        """Return a response, or a `304 Not Modified` response to a conditional request.
+
+        `Last-Modified` is not provided, since the response also contains state flags and linked objects,
+        which may change without a change of the object itself. Conditional requests are based on the `ETag` only.
+        """
+        response = HttpResponse(rendered.content, content_type=RDAP_CONTENT_TYPE)
+        response['ETag'] = rendered.etag
+        add_cache_control(response, self.object_class, rendered.status)
+        return get_conditional_response(request, etag=rendered.etag, response=response)
 
 
 # TODO: IDN should be handled by backend. Once its implemented in FRED this view can be removed.
@@ -84,6 +433,140 @@ class FqdnObjectView(ObjectView):
         return super(FqdnObjectView, self).get(request, handle, *args, **kwargs)
 
 
+def _refresh_done(task: asyncio.Task) -> None:
+    _REFRESH_TASKS.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logging.warning('Refresh failed: %s', task.exception())
+
+
+class AsyncObjectView(ObjectView):
+    """Asynchronous view for RDAP protocol objects.
+
+    Responses are cached only in the in-process caches, the shared cache is not used.
+
+    @cvar getter: Coroutine function which returns object data or raises exception.
+    """
+
+    @classonlymethod
+    def as_view(cls, **initkwargs: Any) -> Callable:
+        view = cast(Callable, super().as_view(**initkwargs))
+        if not hasattr(View, 'view_is_async'):
+            # Django < 4.1 doesn't support asynchronous class-based views.
+            # Mark the view as a coroutine function, so Django runs it in the event loop.
+            view._is_coroutine = asyncio.coroutines._is_coroutine  # type: ignore[attr-defined]
+        return view
+
+    async def options(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        response = super().options(request, *args, **kwargs)
+        # Django >= 4.1 returns an awaitable in asynchronous views.
+        if inspect.isawaitable(response):
+            response = await response
+        return response
+
+    async def http_method_not_allowed(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        response = super().http_method_not_allowed(request, *args, **kwargs)
+        # Django >= 4.1 returns an awaitable in asynchronous views.
+        if inspect.isawaitable(response):
+            response = await response
+        return response
+
+    async def get(self, request: HttpRequest, handle: str, *args: Any, **kwargs: Any) -> HttpResponse:
+        # Requests over the concurrency limit are rejected before any logger or registry calls.
+        if not CONCURRENCY_LIMITER.acquire():
+            return self.make_overloaded_response()
+        start = monotonic()
+        response: Optional[HttpResponse] = None
+        try:
+            response = await self.lookup_async(request, handle)
+        finally:
+            CONCURRENCY_LIMITER.release(monotonic() - start, response is not None and response.status_code < 500)
+        return response
+
+    async def lookup_async(self, request: HttpRequest, handle: str) -> HttpResponse:
+        """Log the request and return a response with the object."""
+        async with create_log_entry_async(cast(str, self.request_type), request.META.get('REMOTE_ADDR', ''),
+                                          {'handle': handle}) as log_entry:
+            retry_after = None
+            if RATE_LIMITER.enabled:
+                # Cache may block, check the rate limit in a thread.
+                check = sync_to_async(RATE_LIMITER.check, thread_sensitive=False)
+                retry_after = await check(get_client_address(request))
+            if retry_after is not None:
+                return self.make_rate_limited_response(log_entry, retry_after)
+            try:
+                with lookup_scope():
+                    rendered = await self.get_rendered_async(request, handle)
+            except Exception as error:
+                return self.make_lookup_error_response(log_entry, error)
+            log_entry.result = LogResult.SUCCESS
+            return self.make_response(request, rendered)
+
+    async def get_rendered_async(self, request: HttpRequest, handle: str) -> RenderedResponse:
+        """Return a serialized response, either from caches or from the getter.
+
+        Stale responses are returned immediately and refreshed in a background task.
+        """
+        key = self.get_cache_key(request, handle)
+        entry = RESPONSE_CACHE.get_entry(key)
+        if entry is not None:
+            logging.debug('Response cache hit: %s', key)
+            if entry.stale:
+                self.schedule_refresh_async(request, handle)
+            return cast(RenderedResponse, entry.value)
+        logging.debug('Response cache miss: %s', key)
+        if NOT_FOUND_CACHE.get(key) is not None:
+            logging.debug('Not found cache hit: %s', key)
+            raise ObjectDoesNotExist()
+
+        try:
+            return await self.coalesced_refresh_async(request, handle)
+        except CircuitOpen:
+            rendered = self.get_expired(request, handle)
+            if rendered is None:
+                raise
+            return rendered
+
+    async def coalesced_refresh_async(self, request: HttpRequest, handle: str) -> RenderedResponse:
+        """Refresh the response, concurrent refreshes of the same response are coalesced into a single one."""
+        key = self.get_cache_key(request, handle)
+        return cast(RenderedResponse,
+                    await ASYNC_SINGLE_FLIGHT.do(key, partial(self.refresh_async, request, handle)))
+
+    async def refresh_async(self, request: HttpRequest, handle: str) -> RenderedResponse:
+        """Render a response and store it in caches."""
+        key = self.get_cache_key(request, handle)
+        try:
+            with request_memo() as memo:
+                data = await self.getter(request, handle)
+            logging.debug('Backend calls saved by request memo: %d', memo.saved)
+        except ObjectDoesNotExist:
+            RESPONSE_CACHE.delete(key)
+            NOT_FOUND_CACHE.set(key, True, self.get_not_found_timeout())
+            raise
+
+        rendered = self.serialize(data)
+        RESPONSE_CACHE.set(key, rendered, self.get_cache_timeout(), RDAP_SETTINGS.RESPONSE_CACHE_STALE_TIMEOUT)
+        return rendered
+
+    def schedule_refresh_async(self, request: HttpRequest, handle: str) -> None:
+        """Schedule a refresh of the response in a background task."""
+        # Task runs in a copy of the current context, including the script prefix.
+        task = asyncio.ensure_future(self.coalesced_refresh_async(request, handle))
+        _REFRESH_TASKS.add(task)
+        task.add_done_callback(_refresh_done)
+
+
+class AsyncFqdnObjectView(AsyncObjectView):
+    """Asynchronous view for domains and nameservers."""
+
+    async def get(self, request: HttpRequest, handle: str, *args: Any, **kwargs: Any) -> HttpResponse:
+        try:
+            handle = preprocess_fqdn(handle)
+        except InvalidIdn:
+            return HttpResponseBadRequest(content_type=RDAP_CONTENT_TYPE)
+        return await super(AsyncFqdnObjectView, self).get(request, handle, *args, **kwargs)
+
+
 class HelpView(View):
     """Help view for RDAP protocol.
 
@@ -102,6 +585,7 @@ class HelpView(View):
             'notices': [{'title': 'Help', 'description': [self.help_text]}],
         }
         response = JsonResponse(data, content_type=RDAP_CONTENT_TYPE)
+        add_cache_control(response, 'help')
         return response
 
 
@@ -118,4 +602,6 @@ class UnsupportedView(View):
         return super(UnsupportedView, self).dispatch(request, *args, **kwargs)
 
     def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        return HttpResponse(status=self.status, content_type=RDAP_CONTENT_TYPE)
+        response = HttpResponse(status=self.status, content_type=RDAP_CONTENT_TYPE)
+        add_cache_control(response, 'unsupported')
+        return response